@@ -0,0 +1,252 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# In-memory stand-in for the parts of the boto3 CloudFormation client demiurge uses. Every call
+# sleeps for `latency` seconds, and a `throttle_rate` fraction of calls fail with Throttling.
+# Stacks finish creating or deleting `build_time` seconds after the operation started, with a
+# stack event for every status.
+
+import os
+import random
+import threading
+import time
+import urllib
+import urlparse
+import uuid
+
+from botocore.exceptions import ClientError
+
+STACK_NAME = 'TAP-Kubernetes-{}'
+
+# Share of seeded stacks in each state.
+STATES = [
+    ('CREATE_COMPLETE', 0.80),
+    ('UPDATE_COMPLETE', 0.05),
+    ('CREATE_IN_PROGRESS', 0.05),
+    ('ROLLBACK_COMPLETE', 0.05),
+    ('DELETE_IN_PROGRESS', 0.05),
+    ]
+
+def _error(code, message, operation):
+    return ClientError({'Error': {'Code': code, 'Message': message}}, operation)
+
+class FakeCloudFormation(object):
+    def __init__(self, latency=0.02, page_size=100, throttle_rate=0.0, vpc='vpc-benchmark',
+                 build_time=30.0):
+        self.latency = latency
+        self.page_size = page_size
+        self.throttle_rate = throttle_rate
+        self.vpc = vpc
+        self.build_time = build_time
+
+        self.calls = {}
+        # Bytes of TemplateBody or TemplateURL sent with create_stack.
+        self.template_bytes = 0
+        self._stacks = {}
+        self._ids = {}
+        self._events = {}
+        self._building = {}
+        self._lock = threading.Lock()
+
+    # Seeding is deterministic, so fakes in separate processes start with the same stacks.
+    def seed(self, count):
+        generator = random.Random(count)
+
+        for index in xrange(count):
+            state = generator.random()
+            for status, share in STATES:
+                state -= share
+                if state < 0:
+                    break
+
+            name = 'seed-{}'.format(index)
+            self._add(name, status, [
+                {'ParameterKey': 'ClusterName', 'ParameterValue': name},
+                {'ParameterKey': 'Username', 'ParameterValue': 'admin'},
+                {'ParameterKey': 'Password', 'ParameterValue': 'password'},
+                {'ParameterKey': 'VPC', 'ParameterValue': self.vpc},
+                {'ParameterKey': 'KubernetesServiceNetwork',
+                 'ParameterValue': '10.{}.{}.0/24'.format(index // 256 + 1, index % 256)},
+                ])
+
+    def _add(self, name, status, parameters):
+        stack_name = STACK_NAME.format(name)
+        stack = {
+            'StackId': 'arn:aws:cloudformation:us-west-2:123456789012:stack/{}/{}'.format(
+                stack_name, uuid.uuid4()),
+            'StackName': stack_name,
+            'StackStatus': status,
+            'CreationTime': time.time(),
+            'Parameters': parameters,
+            }
+
+        with self._lock:
+            self._stacks[stack_name] = stack
+            self._ids[stack['StackId']] = stack
+            self._events[stack['StackId']] = []
+            self._set_status(stack, status)
+
+    def _set_status(self, stack, status):
+        stack['StackStatus'] = status
+
+        if status.endswith('_COMPLETE') and not status.startswith('DELETE_'):
+            name = stack['StackName'][len(STACK_NAME.format('')):]
+            stack['Outputs'] = [
+                {'OutputKey': 'APIServer', 'OutputValue': 'https://{}.elb'.format(name)},
+                {'OutputKey': 'ConsulHTTPAPI', 'OutputValue': 'http://{}.elb:8500'.format(name)},
+                ]
+
+        if status.endswith('_IN_PROGRESS'):
+            self._building[stack['StackId']] = time.time() + self.build_time
+        else:
+            self._building.pop(stack['StackId'], None)
+
+        self._events[stack['StackId']].insert(0, {
+            'EventId': uuid.uuid4().hex,
+            'StackId': stack['StackId'],
+            'StackName': stack['StackName'],
+            'LogicalResourceId': stack['StackName'],
+            'ResourceType': 'AWS::CloudFormation::Stack',
+            'ResourceStatus': status,
+            'Timestamp': time.time(),
+            })
+
+    # Moves stacks whose build time is up to their final status.
+    def _build(self):
+        now = time.time()
+
+        for stack_id, done in self._building.items():
+            if done > now:
+                continue
+
+            stack = self._ids[stack_id]
+            status = stack['StackStatus']
+
+            if status == 'DELETE_IN_PROGRESS':
+                self._set_status(stack, 'DELETE_COMPLETE')
+                self._stacks.pop(stack['StackName'], None)
+            else:
+                self._set_status(stack, status.replace('_IN_PROGRESS', '_COMPLETE'))
+
+    def _call(self, operation):
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+            self._build()
+
+        time.sleep(self.latency)
+
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            raise _error('Throttling', 'Rate exceeded', operation)
+
+    def describe_stacks(self, StackName=None, NextToken=None): # pylint: disable=invalid-name
+        self._call('DescribeStacks')
+
+        with self._lock:
+            if StackName is not None:
+                stack = self._stacks.get(StackName) or self._ids.get(StackName)
+                if stack is None:
+                    raise _error('ValidationError',
+                                 'Stack with id {} does not exist'.format(StackName),
+                                 'DescribeStacks')
+                return {'Stacks': [dict(stack)]}
+
+            names = sorted(self._stacks)
+            start = int(NextToken or 0)
+            response = {'Stacks': [dict(self._stacks[name])
+                                   for name in names[start:start + self.page_size]]}
+
+        if start + self.page_size < len(names):
+            response['NextToken'] = str(start + self.page_size)
+
+        return response
+
+    # TemplateURLs are only followed for file://, as written by demiurge.templates.LocalStore.
+    def create_stack(self, StackName, Parameters, TemplateBody=None, TemplateURL=None,
+                     **kwargs): # pylint: disable=invalid-name,unused-argument
+        self._call('CreateStack')
+
+        if (TemplateBody is None) == (TemplateURL is None):
+            raise _error('ValidationError', 'Specify exactly one of TemplateBody or TemplateURL',
+                         'CreateStack')
+
+        if TemplateURL is not None:
+            url = urlparse.urlparse(TemplateURL)
+            if url.scheme == 'file' and not os.path.exists(urllib.url2pathname(url.path)):
+                raise _error('ValidationError', 'TemplateURL must reference a valid S3 object',
+                             'CreateStack')
+
+        with self._lock:
+            self.template_bytes += len(TemplateBody or TemplateURL)
+
+        with self._lock:
+            if StackName in self._stacks:
+                raise _error('AlreadyExistsException',
+                             'Stack [{}] already exists'.format(StackName), 'CreateStack')
+
+        self._add(StackName[len(STACK_NAME.format('')):], 'CREATE_IN_PROGRESS', Parameters)
+
+        return {'StackId': self._stacks[StackName]['StackId']}
+
+    def delete_stack(self, StackName): # pylint: disable=invalid-name
+        self._call('DeleteStack')
+
+        with self._lock:
+            stack = self._stacks.get(StackName)
+            if stack is not None and stack['StackStatus'] != 'DELETE_IN_PROGRESS':
+                self._set_status(stack, 'DELETE_IN_PROGRESS')
+
+        return {}
+
+    def describe_stack_events(self, StackName, NextToken=None): # pylint: disable=invalid-name
+        self._call('DescribeStackEvents')
+
+        with self._lock:
+            stack = self._stacks.get(StackName) or self._ids.get(StackName)
+            if stack is None:
+                raise _error('ValidationError',
+                             'Stack [{}] does not exist'.format(StackName),
+                             'DescribeStackEvents')
+
+            events = self._events[stack['StackId']]
+            start = int(NextToken or 0)
+            response = {'StackEvents': [dict(event)
+                                        for event in events[start:start + self.page_size]]}
+
+        if start + self.page_size < len(events):
+            response['NextToken'] = str(start + self.page_size)
+
+        return response
+
+    def get_paginator(self, operation):
+        assert operation == 'describe_stacks'
+        return FakePaginator(self)
+
+class FakePaginator(object):
+    def __init__(self, client):
+        self.client = client
+
+    def paginate(self, **kwargs):
+        token = None
+
+        while True:
+            page = self.client.describe_stacks(NextToken=token, **kwargs)
+            yield page
+
+            token = page.get('NextToken')
+            if token is None:
+                return
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
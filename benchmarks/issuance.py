@@ -0,0 +1,58 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Time to issue the PKI of a cluster, a CA and an API server certificate with their keys, with
+# each algorithm demiurge.cert can generate keys for, in a single process and without the key
+# pool:
+#
+#     python -m benchmarks.issuance --clusters 20
+#
+# Only the algorithms in KEY_ALGORITHMS are usable by real clusters.
+
+import time
+
+import click
+
+from demiurge.cert import KEY_ALGORITHMS
+from demiurge.pki import KeyPool, create_pki
+
+ALGORITHMS = ['rsa-2048', 'rsa-4096', 'ecdsa-p256']
+
+@click.command()
+@click.option('--clusters', 'count', default=20, help='Clusters issued with each algorithm.')
+@click.option('--algorithm', 'algorithms', multiple=True, type=click.Choice(ALGORITHMS),
+              default=ALGORITHMS, help='Algorithm to measure; may be given more than once.')
+def main(count, algorithms):
+    click.echo('{:<12} {:>14} {:>16}  {}'.format('algorithm', 'ms/cluster', 'clusters/min',
+                                               'usable'))
+
+    for algorithm in algorithms:
+        # Without a pool, take() generates every key inline.
+        keys = KeyPool(0, algorithm)
+
+        started = time.time()
+        for index in xrange(count):
+            create_pki(keys, '10.3.{}.1'.format(index % 256))
+        elapsed = (time.time() - started) / count
+
+        click.echo('{:<12} {:>14.1f} {:>16,.0f}  {}'.format(
+            algorithm, elapsed * 1000, 60 / elapsed,
+            'yes' if algorithm in KEY_ALGORITHMS else 'no'))
+
+if __name__ == '__main__':
+    main() # pylint: disable=no-value-for-parameter
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
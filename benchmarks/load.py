@@ -0,0 +1,279 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Offline load test of the clusters API against an in-memory CloudFormation:
+#
+#     python -m benchmarks.load --stacks 1000 --concurrency 16 --duration 30
+#
+# or, with --url, of a server started by benchmarks.serve:
+#
+#     python -m benchmarks.load --url http://127.0.0.1:8080 --concurrency 16 --duration 30
+#
+# Exits non-zero when more than --max-errors requests fail or the p99 latency of any operation
+# exceeds --max-p99, so it can gate a release.
+
+import base64
+from collections import namedtuple
+import httplib
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import urlparse
+import uuid
+
+import click
+
+from demiurge.cloudformation import CALL_RETRIES, CALL_THROTTLED
+
+from .fake_cloudformation import FakeCloudFormation
+
+# No kube ever verifies the certificates of fake clusters, so they get keys that are cheap to
+# generate instead of the RSA keys of real ones.
+KEY_ALGORITHM = 'ecdsa-p256'
+
+USERNAME = 'benchmark'
+PASSWORD = 'benchmark'
+
+OPERATIONS = ['search', 'get', 'put', 'delete']
+
+# Configures demiurge as the command line would, against the fake. Templates are stored in the
+# local directory template_store, if given, rather than in S3.
+def configure(fake, template_store=None, **config):
+    from demiurge import APPLICATION
+
+    APPLICATION.config['USERS'][USERNAME] = PASSWORD
+    APPLICATION.config.update({
+        'AWS_DEFAULT_REGION_NAME': 'us-west-2',
+        'AWS_ACCESS_KEY_ID': 'benchmark',
+        'AWS_SECRET_ACCESS_KEY': 'benchmark',
+        'VPC': fake.vpc,
+        'SUBNET': 'subnet-benchmark',
+        'KEY_NAME': 'benchmark',
+        'CONSUL_DC': 'dc1',
+        'CONSUL_JOIN': '127.0.0.1',
+        'SERVICE_SUPERNET': '10.0.0.0/8',
+        'NETWORK_STATE': None,
+        })
+    APPLICATION.config.update(config)
+
+    from demiurge.api import clusters
+    from demiurge.templates import LocalStore, Templates
+    clusters.CLIENT.client = fake
+    if template_store:
+        clusters.TEMPLATES = Templates(LocalStore(template_store))
+
+def create_app(fake, template_store=None, **config):
+    from demiurge import APP, warm_up
+    from connexion.resolver import RestyResolver
+
+    configure(fake, template_store, **config)
+
+    APP.add_api('clusters.yaml', resolver=RestyResolver('demiurge.api'))
+
+    from demiurge.api import clusters
+    clusters.start()
+    warm_up()
+
+    return APP.app
+
+HttpResponse = namedtuple('HttpResponse', ['status_code'])
+
+# The parts of the Flask test client used by Workload, over HTTP.
+class HttpClient(object):
+    def __init__(self, url):
+        url = urlparse.urlparse(url)
+        self.host = url.hostname
+        self.port = url.port or 80
+
+    def request(self, method, path, headers):
+        connection = httplib.HTTPConnection(self.host, self.port, timeout=60)
+
+        try:
+            connection.request(method, path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        finally:
+            connection.close()
+
+        return HttpResponse(response.status)
+
+    def get(self, path, headers):
+        return self.request('GET', path, headers)
+
+    def put(self, path, headers):
+        return self.request('PUT', path, headers)
+
+    def delete(self, path, headers):
+        return self.request('DELETE', path, headers)
+
+def percentile(latencies, fraction):
+    if not latencies:
+        return 0.0
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+class Workload(object):
+    def __init__(self, client, names, weights):
+        self.client = client
+        self.names = names
+        self.weights = weights
+
+        self.results = dict((operation, []) for operation in OPERATIONS)
+        self.errors = dict((operation, 0) for operation in OPERATIONS)
+        self._lock = threading.Lock()
+        self._headers = {
+            'Authorization': 'Basic ' + base64.b64encode('{}:{}'.format(USERNAME, PASSWORD)),
+            }
+
+    def __choose(self):
+        point = random.uniform(0, sum(self.weights.values()))
+        for operation in OPERATIONS:
+            point -= self.weights[operation]
+            if point <= 0:
+                return operation
+        return OPERATIONS[-1]
+
+    def request(self, client, operation):
+        if operation == 'search':
+            method, path = client.get, '/clusters'
+        elif operation == 'get':
+            method, path = client.get, '/clusters/' + random.choice(self.names)
+        elif operation == 'put':
+            method, path = client.put, '/clusters/bench-' + uuid.uuid4().hex[:12]
+        else:
+            with self._lock:
+                if self.names:
+                    name = self.names.pop(random.randrange(len(self.names)))
+                else:
+                    name = 'missing-' + uuid.uuid4().hex[:12]
+            method, path = client.delete, '/clusters/' + name
+
+        started = time.time()
+        response = method(path, headers=self._headers)
+        latency = time.time() - started
+
+        with self._lock:
+            self.results[operation].append(latency)
+            if response.status_code >= 500:
+                self.errors[operation] += 1
+
+    def run(self, concurrency, duration):
+        deadline = time.time() + duration
+
+        def worker():
+            client = self.client()
+            while time.time() < deadline:
+                self.request(client, self.__choose())
+
+        threads = [threading.Thread(target=worker) for _ in xrange(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+@click.command()
+@click.option('--url', default=None, help='Load a running server instead of an in-process one.')
+@click.option('--stacks', default=1000, help='Stacks seeded into the fake account.')
+@click.option('--concurrency', default=16, help='Concurrent clients.')
+@click.option('--duration', default=30.0, help='Seconds to run the load for.')
+@click.option('--latency', default=0.02, help='Seconds each CloudFormation call takes.')
+@click.option('--build-time', default=30.0, help='Seconds a stack takes to create or delete.')
+@click.option('--page-size', default=100, help='Stacks per describe_stacks page.')
+@click.option('--throttle-rate', default=0.0, help='Share of CloudFormation calls throttled.')
+@click.option('--rate', default=0.0,
+              help='Client-side CloudFormation rate limit in calls per second, 0 for none.')
+@click.option('--template-store', default=None,
+              help='Directory in which the template is stored and referenced by URL, instead of '
+                   'being sent inline.')
+@click.option('--mix', default='search=1,get=6,put=2,delete=1',
+              help='Relative weights of the operations.')
+@click.option('--max-errors', default=0, help='Failed requests tolerated.')
+@click.option('--max-p99', default=None, type=float, help='Highest p99 latency tolerated, in ms.')
+def main(url, stacks, concurrency, duration, latency, build_time, page_size, throttle_rate, rate,
+         template_store, mix, max_errors, max_p99):
+    logging.basicConfig(level=logging.WARNING)
+    # Seeded ROLLBACK_COMPLETE stacks are logged as errors on every GET.
+    logging.getLogger('clusters.api').setLevel(logging.CRITICAL)
+
+    if url:
+        fake = None
+        client = lambda: HttpClient(url)
+    else:
+        fake = FakeCloudFormation(latency=latency, page_size=page_size,
+                                  throttle_rate=throttle_rate, build_time=build_time)
+        fake.seed(stacks)
+
+        app = create_app(fake, KEY_ALGORITHM=KEY_ALGORITHM, CLOUDFORMATION_RATE=rate,
+                         template_store=template_store)
+        client = app.test_client
+
+    weights = dict((operation, float(weight)) for operation, weight in
+                   (item.split('=') for item in mix.split(',')))
+    workload = Workload(client, ['seed-{}'.format(index) for index in xrange(stacks)],
+                        dict((operation, weights.get(operation, 0.0)) for operation in OPERATIONS))
+
+    # Prime the stack index so the first requests do not all pay for the initial scan.
+    workload.request(client(), 'search')
+    workload.results['search'] = []
+
+    started = time.time()
+    workload.run(concurrency, duration)
+    elapsed = time.time() - started
+
+    if fake:
+        # Let queued creates finish so their daemon threads are not cut off at interpreter exit.
+        from demiurge.api.clusters import JOBS
+        JOBS.join()
+
+    total = sum(len(latencies) for latencies in workload.results.values())
+    failed = False
+
+    click.echo('{} stacks, {} clients, {:.1f}s, {:.1f} req/s overall'.format(
+        stacks, concurrency, elapsed, total / elapsed))
+    click.echo('{:<8} {:>8} {:>7} {:>9} {:>9} {:>9}'.format(
+        'op', 'requests', 'errors', 'req/s', 'p50 ms', 'p99 ms'))
+
+    for operation in OPERATIONS:
+        latencies = sorted(workload.results[operation])
+        p99 = percentile(latencies, 0.99) * 1000
+        click.echo('{:<8} {:>8} {:>7} {:>9.1f} {:>9.1f} {:>9.1f}'.format(
+            operation, len(latencies), workload.errors[operation], len(latencies) / elapsed,
+            percentile(latencies, 0.50) * 1000, p99))
+
+        if max_p99 is not None and p99 > max_p99:
+            failed = True
+
+    if fake:
+        click.echo('CloudFormation calls: {}'.format(
+            ', '.join('{}={}'.format(name, count) for name, count in sorted(fake.calls.items()))))
+        click.echo('CloudFormation calls throttled: {}, retried: {}'.format(
+            CALL_THROTTLED.total(), CALL_RETRIES.total()))
+        click.echo('Template bytes sent with CreateStack: {}'.format(fake.template_bytes))
+
+    if sum(workload.errors.values()) > max_errors:
+        failed = True
+
+    # The stack index and reconciler threads are still running; tearing the interpreter down
+    # under them only produces noise.
+    sys.stdout.flush()
+    os._exit(1 if failed else 0) # pylint: disable=protected-access
+
+if __name__ == '__main__':
+    main() # pylint: disable=no-value-for-parameter
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
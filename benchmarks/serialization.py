@@ -0,0 +1,95 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Serialization time and bytes on the wire of GET /clusters bodies, as connexion serializes them
+# and as demiurge.responses does, with and without gzip:
+#
+#     python -m benchmarks.serialization --clusters 1000 --clusters 10000
+
+import json
+import time
+
+import click
+from flask import Flask
+from werkzeug.datastructures import Accept
+
+from demiurge import responses
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+def clusters(count):
+    return [{
+        'cluster_name': 'seed-{}'.format(index),
+        'username': 'admin',
+        'password': 'Zx81QaLm02NdPw7k',
+        'kubernetes_service_network': '10.{}.{}.0/24'.format(index // 256 + 1, index % 256),
+        'api_server': 'https://seed-{}-1234567890.us-west-2.elb.amazonaws.com'.format(index),
+        'consul_http_api': 'http://seed-{}-1234567890.us-west-2.elb.amazonaws.com:8500'.format(
+            index),
+        } for index in xrange(count)]
+
+# The fastest of `repeat` runs, in milliseconds.
+def best(function, repeat):
+    timings = []
+    result = None
+
+    for _ in xrange(repeat):
+        started = time.time()
+        result = function()
+        timings.append(time.time() - started)
+
+    return min(timings) * 1000, result
+
+ENCODERS = [
+    ('connexion', lambda body: json.dumps(body, indent=2) + '\n'),
+    ('demiurge', lambda body: responses.dumps(body) + '\n'),
+    ]
+
+# For comparison, when installed.
+if ujson is not None:
+    ENCODERS.append(('ujson', lambda body: ujson.dumps(body) + '\n'))
+
+@click.command()
+@click.option('--clusters', 'counts', multiple=True, type=int, default=[1000, 10000],
+              help='Clusters in the listing; may be given more than once.')
+@click.option('--repeat', default=5, help='Runs of each measurement; the fastest is reported.')
+def main(counts, repeat):
+    app = Flask(__name__)
+    accept = Accept([('gzip', 1)])
+
+    click.echo('{:>8} {:<10} {:>10} {:>11} {:>10} {:>11}'.format(
+        'clusters', 'encoder', 'dumps ms', 'bytes', 'gzip ms', 'gzip bytes'))
+
+    for count in counts:
+        body = clusters(count)
+
+        for name, encode in ENCODERS:
+            dumps_ms, data = best(lambda: encode(body), repeat)
+
+            with app.app_context():
+                gzip_ms, response = best(lambda: responses.compress(
+                    app.response_class(data, mimetype='application/json'), accept, 1), repeat)
+
+            click.echo('{:>8} {:<10} {:>10.1f} {:>11} {:>10.1f} {:>11}'.format(
+                count, name, dumps_ms, len(data), gzip_ms, response.content_length))
+
+if __name__ == '__main__':
+    main() # pylint: disable=no-value-for-parameter
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,66 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Runs demiurge against an in-memory CloudFormation, for benchmarks.load --url:
+#
+#     python -m benchmarks.serve --server gunicorn --workers 4 --threads 8
+#
+# Every worker process gets its own fake seeded with the same stacks, so clusters created or
+# deleted through one worker are not seen by the others.
+
+import logging
+import os
+import tempfile
+
+import click
+
+from demiurge import APP, SERVERS
+from demiurge.server import run
+
+from .fake_cloudformation import FakeCloudFormation
+from .load import KEY_ALGORITHM, create_app
+
+@click.command()
+@click.option('--port', default=8080)
+@click.option('--server', default='gunicorn', type=click.Choice(SERVERS))
+@click.option('--workers', default=4, help='Number of gunicorn worker processes.')
+@click.option('--threads', default=8, help='Number of threads per gunicorn worker process.')
+@click.option('--stacks', default=1000, help='Stacks seeded into the fake account.')
+@click.option('--latency', default=0.02, help='Seconds each CloudFormation call takes.')
+def serve(port, server, workers, threads, stacks, latency):
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('clusters.api').setLevel(logging.CRITICAL)
+
+    state_dir = tempfile.mkdtemp(prefix='demiurge-benchmark-')
+
+    def load():
+        fake = FakeCloudFormation(latency=latency)
+        fake.seed(stacks)
+        return create_app(fake, KEY_ALGORITHM=KEY_ALGORITHM, CLOUDFORMATION_RATE=0,
+                          STATE_DIR=state_dir,
+                          template_store=os.path.join(state_dir, 'templates'),
+                          NETWORK_STATE=os.path.join(state_dir, 'networks.json'))
+
+    if server == 'gunicorn':
+        run(load, port, workers, threads)
+    else:
+        load()
+        APP.run(port=port, threaded=server == 'threaded')
+
+if __name__ == '__main__':
+    serve() # pylint: disable=no-value-for-parameter
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,104 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Peak memory of a stack index refresh against an in-memory CloudFormation whose stacks carry the
+# keys and certificates of real clusters, with the index keeping whole stacks and summaries:
+#
+#     python -m benchmarks.stack_memory --stacks 1000 --stacks 5000
+#
+# Each measurement runs in a process of its own, since the peak RSS of a process never decreases.
+
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+
+import click
+
+from demiurge.stacks import StackIndex
+
+from .fake_cloudformation import FakeCloudFormation
+
+# Sizes of the PEM parameters and outputs of an rsa-2048 cluster.
+PEMS = [('CAKey', 1704), ('CACert', 1216), ('APIServerKey', 1704), ('APIServerCert', 1280)]
+
+PARAMETERS = ('ClusterName', 'Username', 'Password', 'KubernetesServiceNetwork', 'VPC')
+OUTPUTS = ('APIServer', 'ConsulHTTPAPI')
+
+# Parses every page afresh, as botocore does, instead of sharing the fake's objects.
+class ParsingClient(object):
+    def __init__(self, fake):
+        self.fake = fake
+
+    def get_paginator(self, operation):
+        paginator = self.fake.get_paginator(operation)
+        paginator.client = self
+        return paginator
+
+    def describe_stacks(self, **kwargs):
+        return json.loads(json.dumps(self.fake.describe_stacks(**kwargs)))
+
+def peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def measure(count, summarize):
+    fake = FakeCloudFormation(latency=0)
+    fake.seed(count)
+
+    for stack in fake._stacks.values(): # pylint: disable=protected-access
+        stack['Parameters'].extend({'ParameterKey': key, 'ParameterValue': os.urandom(size // 2)
+                                    .encode('hex')} for key, size in PEMS)
+        stack.setdefault('Outputs', []).extend(
+            {'OutputKey': key, 'OutputValue': parameter['ParameterValue']}
+            for key in ('CACert',) for parameter in stack['Parameters']
+            if parameter['ParameterKey'] == key)
+
+    index = StackIndex(ParsingClient(fake), 30, 5, parameters=PARAMETERS if summarize else None,
+                       outputs=OUTPUTS if summarize else None)
+
+    gc.collect()
+    baseline = peak_rss_kb()
+    index.refresh()
+
+    return peak_rss_kb() - baseline
+
+@click.command()
+@click.option('--stacks', 'counts', multiple=True, type=int, default=[1000, 5000],
+              help='Stacks in the account; may be given more than once.')
+@click.option('--measure', 'mode', type=click.Choice(['stacks', 'summaries']),
+              help='Measure one index in this process; used by the other runs.')
+def main(counts, mode):
+    if mode:
+        click.echo(measure(counts[0], mode == 'summaries'))
+        return
+
+    click.echo('{:>8} {:<10} {:>12} {:>14}'.format('stacks', 'index', 'peak MiB', 'KiB per stack'))
+
+    for count in counts:
+        for mode in ('stacks', 'summaries'):
+            growth = int(subprocess.check_output([
+                sys.executable, '-m', 'benchmarks.stack_memory', '--stacks', str(count),
+                '--measure', mode]))
+
+            click.echo('{:>8} {:<10} {:>12.1f} {:>14.2f}'.format(
+                count, mode, growth / 1024.0, float(growth) / count))
+
+if __name__ == '__main__':
+    main() # pylint: disable=no-value-for-parameter
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,97 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Cold start of demiurge against an in-memory CloudFormation: the time to import it, for load() to
+# return so the server can bind its port, for /healthz to report ready after the warm-up, and for
+# the first GET /clusters:
+#
+#     python -m benchmarks.startup --runs 5 --stacks 1000
+#
+# Each run starts a process of its own, so that nothing is imported yet.
+
+import base64
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import click
+
+STAGES = ['import', 'load', 'ready', 'first request']
+
+def measure(stacks):
+    started = time.time()
+    import demiurge.cli # pylint: disable=unused-variable
+    imported = time.time()
+
+    # The fake and its stacks stand in for CloudFormation, so they are not part of the startup.
+    from .fake_cloudformation import FakeCloudFormation
+    from .load import USERNAME, PASSWORD, configure
+    fake = FakeCloudFormation(latency=0)
+    fake.seed(stacks)
+
+    from demiurge import load
+    configure_started = time.time()
+    configure(fake, CLOUDFORMATION_RATE=0)
+    application = load()
+    loaded = time.time()
+
+    client = application.test_client()
+    while client.get('/healthz').status_code != 200:
+        time.sleep(0.005)
+    ready = time.time()
+
+    response = client.get('/clusters', headers={
+        'Authorization': 'Basic ' + base64.b64encode(USERNAME + ':' + PASSWORD)})
+    assert response.status_code == 200, response.status_code
+    answered = time.time()
+
+    return dict(zip(STAGES, [
+        imported - started, loaded - configure_started, ready - loaded, answered - ready]))
+
+@click.command()
+@click.option('--runs', type=click.IntRange(1), default=5, help='Cold starts to measure.')
+@click.option('--stacks', type=click.IntRange(0), default=1000,
+              help='Stacks seeded into the fake account.')
+@click.option('--measure', 'single', is_flag=True,
+              help='Measure one start in this process; used by the other runs.')
+def main(runs, stacks, single):
+    if single:
+        click.echo(json.dumps(measure(stacks)))
+        sys.stdout.flush()
+        # Stops the key pool processes and skips the interpreter teardown, which the background
+        # threads of demiurge do not expect.
+        for process in multiprocessing.active_children():
+            process.terminate()
+        os._exit(0) # pylint: disable=protected-access
+
+    click.echo(' '.join('{:>14}'.format(stage + ' ms') for stage in ['run'] + STAGES))
+
+    for run in xrange(runs):
+        output = subprocess.check_output([
+            sys.executable, '-m', 'benchmarks.startup', '--stacks', str(stacks), '--measure'])
+        # The last line, since connexion may print to stdout as well.
+        times = json.loads(output.strip().splitlines()[-1])
+
+        click.echo('{:>14} '.format(run + 1) + ' '.join(
+            '{:>14.1f}'.format(times[stage] * 1000.0) for stage in STAGES))
+
+if __name__ == '__main__':
+    main() # pylint: disable=no-value-for-parameter
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,66 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Time and bytes per create of the template argument of create_stack, serializing the template for
+# every create as before and reusing the body serialized once at import:
+#
+#     python -m benchmarks.template --creates 1000
+
+import shutil
+import tempfile
+import time
+
+import click
+
+from demiurge.aws import TEMPLATE, TEMPLATE_BODY, TEMPLATE_DIGEST
+from demiurge.templates import LocalStore, Templates
+
+def measure(arguments, creates):
+    start = time.time()
+    for _ in xrange(creates):
+        result = arguments()
+    elapsed = time.time() - start
+
+    return elapsed * 1000.0 / creates, len(result.values()[0])
+
+@click.command()
+@click.option('--creates', type=click.IntRange(1), default=1000,
+              help='create_stack arguments to build per method.')
+def main(creates):
+    directory = tempfile.mkdtemp()
+
+    try:
+        inline = Templates()
+        stored = Templates(LocalStore(directory))
+
+        methods = [
+            ('to_json per create', lambda: {'TemplateBody': TEMPLATE.to_json()}),
+            ('TEMPLATE_BODY', lambda: inline.arguments(TEMPLATE_BODY, TEMPLATE_DIGEST)),
+            ('TemplateURL', lambda: stored.arguments(TEMPLATE_BODY, TEMPLATE_DIGEST)),
+            ]
+
+        click.echo('{:<20} {:>14} {:>10}'.format('method', 'ms per create', 'bytes'))
+
+        for name, arguments in methods:
+            elapsed, size = measure(arguments, creates)
+            click.echo('{:<20} {:>14.3f} {:>10}'.format(name, elapsed, size))
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    main() # pylint: disable=no-value-for-parameter
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -14,10 +14,16 @@
 # limitations under the License.
 #
 
+import threading
+
 import connexion
 from connexion.resolver import RestyResolver
+from flask import Response, request
 from flask_httpauth import HTTPBasicAuth
 
+from .metrics import CONTENT_TYPE, REGISTRY
+from .responses import compress
+
 __version__ = '0.8.3'
 
 APP = connexion.App(__name__, specification_dir='swagger/', arguments={'version': __version__})
@@ -26,13 +32,50 @@ AUTH = HTTPBasicAuth()
 
 APPLICATION.config['USERS'] = {}
 
+READY = threading.Event()
+
 @AUTH.get_password
 def get_password(username):
     return APPLICATION.config['USERS'].get(username)
 
-def main():
+@APPLICATION.route('/healthz')
+def healthz():
+    return ('', 200) if READY.is_set() else ('', 503)
+
+@APPLICATION.route('/metrics')
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+@APPLICATION.after_request
+def gzip_response(response):
+    return compress(response, request.accept_encodings,
+                    APPLICATION.config.get('GZIP_MIN_SIZE', 1024))
+
+def warm_up():
+    # Building the template generates the cluster certificates, so it is kept off the import path.
+    from . import aws # pylint: disable=unused-variable
+    from .api import clusters
+    clusters.warm_up()
+    READY.set()
+
+def load():
     APP.add_api('clusters.yaml', resolver=RestyResolver(__name__ + '.api'))
-    APP.run()
+
+    from .api import clusters
+    clusters.start()
+    threading.Thread(target=warm_up, name='warm-up').start()
+
+    return APPLICATION
+
+SERVERS = ['development', 'threaded', 'gunicorn']
+
+def main(server='development', workers=1, threads=1):
+    if server == 'gunicorn':
+        from .server import run
+        run(load, APP.port, workers, threads)
+    else:
+        load()
+        APP.run(threaded=server == 'threaded')
 
 if __name__ == '__main__':
     main()
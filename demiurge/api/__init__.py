@@ -15,5 +15,6 @@
 #
 
 from . import clusters
+from . import operations
 
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
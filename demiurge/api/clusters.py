@@ -14,30 +14,143 @@
 # limitations under the License.
 #
 
+import base64
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
 import re
-from time import sleep
+import threading
+import time
 
 import boto3
 from botocore.exceptions import ClientError
 import fauxfactory
 from connexion import NoContent
+import flask
+from werkzeug.http import unquote_etag
 import logging
 
 from .. import APP, APPLICATION, AUTH
-from ..aws import TEMPLATE
+from ..cloudformation import Client, backoff
+from ..jobs import JobQueue, Operation, OperationError
+from ..metrics import Callback, Histogram
+from ..network import NetworkAllocator, network_address
+from ..notifier import Notifier
+from ..parameters import check_length
+from ..pki import KeyPool, create_pki
+from ..reconciler import Reconciler
+from ..registry import Registry
+from ..responses import json_response
+from ..singleflight import Group
+from ..stacks import StackIndex, describe_stack
+from ..templates import Templates, open_store
+from ..userdata import gzip_base64
 
 logger = logging.getLogger('clusters.api')
 
-CLIENT = boto3.client(
-    'cloudformation',
+CLIENT = Client(
+    boto3.client(
+        'cloudformation',
+        region_name=APPLICATION.config.get('AWS_DEFAULT_REGION_NAME'),
+        aws_access_key_id=APPLICATION.config.get('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=APPLICATION.config.get('AWS_SECRET_ACCESS_KEY'),
+        ),
+    rate=APPLICATION.config.get('CLOUDFORMATION_RATE', 5),
+    burst=APPLICATION.config.get('CLOUDFORMATION_BURST', 10),
+    max_attempts=APPLICATION.config.get('CLOUDFORMATION_MAX_ATTEMPTS', 5),
+    )
+
+# Worker processes of a production server share their stack index and operations through files
+# in STATE_DIR.
+STATE_DIR = APPLICATION.config.get('STATE_DIR')
+
+# Only the parameters and outputs read by __cluster() are indexed.
+STACKS = StackIndex(CLIENT, APPLICATION.config.get('STACK_CACHE_TTL', 30),
+                    APPLICATION.config.get('STACK_LOOKUP_TTL', 5),
+                    os.path.join(STATE_DIR, 'stacks.json') if STATE_DIR else None,
+                    parameters=('ClusterName', 'Username', 'Password', 'KubernetesServiceNetwork',
+                                'VPC'),
+                    outputs=('APIServer', 'ConsulHTTPAPI'))
+
+# One of the worker processes reads stack events on behalf of all of them.
+RECONCILER = Reconciler(CLIENT, STACKS, APPLICATION.config.get('RECONCILE_INTERVAL', 5),
+                        os.path.join(STATE_DIR, 'reconciler.json') if STATE_DIR else None)
+
+# Wakes up GET ?watch=true requests when the stack of their cluster changes.
+NOTIFIER = Notifier()
+
+REGISTRY = Registry(APPLICATION.config.get('REGISTRY', ':memory:'))
+
+JOBS = JobQueue(APPLICATION.config.get('JOB_WORKERS', 4),
+                path=os.path.join(STATE_DIR, 'operations') if STATE_DIR else None)
+
+NETWORKS = NetworkAllocator(APPLICATION.config.get('SERVICE_SUPERNET', '10.3.0.0/16'),
+                            APPLICATION.config.get('SERVICE_PREFIX_LEN', 24),
+                            APPLICATION.config.get('NETWORK_STATE'))
+
+# Stacks are created from a TemplateURL in TEMPLATE_STORE if it is set, from an inline TemplateBody
+# otherwise.
+TEMPLATES = Templates(open_store(
+    APPLICATION.config['TEMPLATE_STORE'],
     region_name=APPLICATION.config.get('AWS_DEFAULT_REGION_NAME'),
     aws_access_key_id=APPLICATION.config.get('AWS_ACCESS_KEY_ID'),
     aws_secret_access_key=APPLICATION.config.get('AWS_SECRET_ACCESS_KEY'),
-    )
+    ) if APPLICATION.config.get('TEMPLATE_STORE') else None)
+
+KEYS = KeyPool(APPLICATION.config.get('KEY_POOL_SIZE', 8),
+               APPLICATION.config.get('KEY_ALGORITHM', 'rsa-2048'))
+CREATE_LOCK = threading.Lock()
+
+# Identical requests in flight at the same time share one response.
+FLIGHTS = Group()
 
 STACK_NAME = 'TAP-Kubernetes-{}'
+CLUSTER_FIELDS = ['cluster_name', 'username', 'password', 'kubernetes_service_network',
+                  'api_server', 'consul_http_api']
+COMPLETE = ['CREATE_COMPLETE', 'UPDATE_COMPLETE']
 MAX_RETRIES = 10
 
+REQUEST_SECONDS = Histogram('demiurge_request_seconds', 'Latency of cluster API requests.',
+                            ['operation'])
+CREATE_WAIT_SECONDS = Histogram('demiurge_create_wait_seconds',
+                                'Time spent waiting for a new stack to be in progress.')
+
+Callback('demiurge_stack_index_stacks', 'Stacks in the stack index.',
+         lambda: STACKS.stats()['stacks'])
+Callback('demiurge_stack_index_age_seconds', 'Age of the last full stack index refresh.',
+         lambda: STACKS.stats()['age'])
+Callback('demiurge_stack_index_lookups_total', 'Stack index reads, by result.',
+         lambda: dict(((result,), STACKS.stats()[result]) for result in ('hits', 'misses')),
+         kind='counter', labels=['result'])
+Callback('demiurge_stack_index_stale_total', 'Reads that found the stack index stale.',
+         lambda: STACKS.stats()['stale'], kind='counter')
+Callback('demiurge_reconciler_stacks', 'In-flight stacks followed through their events.',
+         lambda: RECONCILER.stats()['stacks'])
+Callback('demiurge_reconciler_events_total', 'Stack events read by the reconciler.',
+         lambda: RECONCILER.stats()['events'], kind='counter')
+Callback('demiurge_reconciler_transitions_total', 'Stack status changes seen by the reconciler.',
+         lambda: RECONCILER.stats()['transitions'], kind='counter')
+Callback('demiurge_watchers', 'Requests waiting for a cluster to change.',
+         lambda: NOTIFIER.stats()['waiters'])
+Callback('demiurge_watch_notifications_total', 'Cluster changes announced to watchers.',
+         lambda: NOTIFIER.stats()['notifications'], kind='counter')
+Callback('demiurge_registry_clusters', 'Clusters in the cluster registry.',
+         lambda: REGISTRY.stats()['clusters'])
+Callback('demiurge_service_networks', 'Service networks in the pool.',
+         lambda: NETWORKS.stats()['size'])
+Callback('demiurge_service_networks_reserved', 'Service networks reserved by clusters.',
+         lambda: NETWORKS.stats()['reserved'])
+Callback('demiurge_key_pool_depth', 'Pre-generated keys ready to be used.',
+         lambda: KEYS.stats()['depth'])
+Callback('demiurge_key_pool_generated_total', 'Keys generated by the key pool.',
+         lambda: KEYS.stats()['generated'], kind='counter')
+Callback('demiurge_key_pool_misses_total', 'Keys generated inline because the pool was empty.',
+         lambda: KEYS.stats()['misses'], kind='counter')
+Callback('demiurge_key_pool_refill_rate', 'Keys generated per second since the pool started.',
+         lambda: KEYS.stats()['refill_rate'])
+Callback('demiurge_operations_active', 'Operations queued or running.',
+         lambda: len(JOBS.active()))
+
 def __cluster(stack):
     cluster = {}
 
@@ -66,84 +179,247 @@ def __cluster(stack):
 
     return cluster
 
+def __record(stack):
+    cluster = __cluster(stack)
+
+    if cluster is None:
+        return None
+
+    return dict(cluster, stack_name=stack['StackName'], stack_id=stack.get('StackId'),
+                status=stack['StackStatus'], last_updated=__last_updated(stack))
+
+def __last_updated(stack):
+    updated = stack.get('LastUpdatedTime', stack.get('CreationTime'))
+    return str(updated) if updated is not None else None
+
+# Weak, since the same cluster may be sent with different content encodings.
+def __etag(*parts):
+    return 'W/"{}"'.format(hashlib.sha1(
+        '\0'.join(unicode(part) for part in parts).encode('utf-8')).hexdigest())
+
+# Answers 304 if the response of a successful request has not changed since the client fetched it.
+def __conditional(response):
+    headers = response[2] if len(response) > 2 else {}
+
+    if response[1] == 200 and 'ETag' in headers and flask.request.if_none_match.contains_weak(
+            unquote_etag(headers['ETag'])[0]):
+        return NoContent, 304, {'ETag': headers['ETag']}
+
+    return response
+
+# Bodies are serialized by json_response() rather than by connexion, unless FAST_JSON is off.
+def __respond(response):
+    if response[0] is NoContent or not APPLICATION.config.get('FAST_JSON', True):
+        return response
+
+    return json_response(*response)
+
+def __public(record, fields=CLUSTER_FIELDS):
+    return dict((field, record[field]) for field in fields if record[field] is not None)
+
 @AUTH.login_required
+@REQUEST_SECONDS.time(operation='search')
 def search():
-    clusters = []
+    limit = flask.request.args.get('limit', type=int)
+    fields = flask.request.args.get('fields')
+    fields = fields.split(',') if fields else CLUSTER_FIELDS
+
+    if not set(fields) <= set(CLUSTER_FIELDS):
+        return NoContent, 400
+
+    try:
+        after = (__decode_cursor(str(flask.request.args['cursor']))
+                 if 'cursor' in flask.request.args else None)
+    except (TypeError, ValueError):
+        return NoContent, 400
+
+    return __respond(__conditional(FLIGHTS.do('search', (limit, after, tuple(fields)), __search,
+                                               limit, after, fields)))
+
+# urlsafe_b64decode() skips characters outside of its alphabet, so a cursor is only taken if it is
+# what __search() would have sent for the name it decodes to.
+def __decode_cursor(cursor):
+    after = base64.urlsafe_b64decode(cursor).decode('utf-8')
+
+    if not after or base64.urlsafe_b64encode(after.encode('utf-8')) != cursor:
+        raise ValueError('Invalid cursor {}'.format(cursor))
+
+    return after
 
-    response = CLIENT.describe_stacks()
+# Clusters are returned by name. With a limit, the X-Next-Cursor header of a page that is not the
+# last one is the cursor of the next page: the last name on this one.
+def __search(limit, after, fields):
+    records = REGISTRY.clusters(COMPLETE, after, limit + 1 if limit else None,
+                                fields + ['cluster_name', 'stack_id', 'status', 'last_updated'])
+    headers = {}
 
-    for stack in response['Stacks']:
-        if re.match(r'(CREATE|UPDATE)_COMPLETE', stack['StackStatus']):
-            cluster = __cluster(stack)
+    if limit and len(records) > limit:
+        records = records[:limit]
+        headers['X-Next-Cursor'] = base64.urlsafe_b64encode(
+            records[-1]['cluster_name'].encode('utf-8'))
 
-            if cluster:
-                clusters.append(cluster)
+    headers['ETag'] = __etag(','.join(fields), *(
+        '{cluster_name}|{stack_id}|{status}|{last_updated}'.format(**record)
+        for record in records))
 
-    return clusters, 200
+    return [__public(record, fields) for record in records], 200, headers
 
+# With ?watch=true, a cluster that is still being created is only returned once its stack
+# changes, or after ?timeout seconds.
 @AUTH.login_required
 def get(cluster_name):
-    response = CLIENT.describe_stacks()
-
-    for stack in response['Stacks']:
-        if stack['StackName'] == STACK_NAME.format(cluster_name):
-            if re.match(r'(CREATE|UPDATE)_COMPLETE', stack['StackStatus']):
-                return __cluster(stack), 200
-            elif re.match(r'(CREATE|UPDATE)_IN_PROGRESS', stack['StackStatus']):
-                return NoContent, 204
-            elif re.match(r'DELETE_(IN_PROGRESS|COMPLETE)', stack['StackStatus']):
-                return NoContent, 404
+    # connexion validates the boolean but passes the query string on as it was sent, e.g. True.
+    if flask.request.args.get('watch', 'false').lower() not in ('true', '1'):
+        with REQUEST_SECONDS.timer(operation='get'):
+            return __respond(__conditional(FLIGHTS.do('get', cluster_name, __get, cluster_name)))
+
+    with REQUEST_SECONDS.timer(operation='watch'):
+        deadline = time.time() + int(flask.request.args.get('timeout', 30))
+
+        while True:
+            version = NOTIFIER.version(STACK_NAME.format(cluster_name))
+            response = FLIGHTS.do('get', cluster_name, __get, cluster_name)
+            remaining = deadline - time.time()
+
+            if response[1] != 204 or remaining <= 0:
+                return __respond(__conditional(response))
+
+            NOTIFIER.wait(STACK_NAME.format(cluster_name), version, remaining)
+
+def __get(cluster_name):
+    stack = STACKS.lookup(STACK_NAME.format(cluster_name))
+
+    if stack is None:
+        return NoContent, 204 if __creating(cluster_name) else 404
+
+    if re.match(r'(CREATE|UPDATE)_COMPLETE', stack['StackStatus']):
+        return __cluster(stack), 200, {'ETag': __etag(
+            stack.get('StackId'), stack['StackStatus'], __last_updated(stack))}
+    elif re.match(r'(CREATE|UPDATE)_IN_PROGRESS', stack['StackStatus']):
+        # Clients polling a cluster are told about its progress by the reconciler.
+        RECONCILER.watch(stack)
+        return NoContent, 204
+    elif re.match(r'DELETE_(IN_PROGRESS|COMPLETE)', stack['StackStatus']):
+        return NoContent, 404
+    else:
+        error_msg = stack['StackName'] + ': ' + stack['StackStatus']
+        if 'StackStatusReason' in stack:
+            error_msg += ': ' + stack['StackStatusReason']
+        logger.error(error_msg)
+        return NoContent, 404
+
+def __creating(cluster_name):
+    return any(operation.cluster_name == cluster_name for operation in JOBS.active('create'))
+
+def __register(stacks, started):
+    REGISTRY.sync([record for record in (__record(stack) for stack in stacks) if record], started)
+
+def __reserve_networks(records):
+    for record in records:
+        if record['kubernetes_service_network']:
+            if record['status'].startswith('DELETE_'):
+                NETWORKS.release(record['cluster_name'])
             else:
-                error_msg = stack['StackName'] + ': ' + stack['StackStatus']
-                if 'StackStatusReason' in stack:
-                    error_msg += ': ' + stack['StackStatusReason']
-                logger.error(error_msg)
-                return NoContent, 404
-
-    return NoContent, 404
-
-def __get_next_network():
-    clusters = []
-    networks = []
-    response = CLIENT.describe_stacks()
-    stacks = response['Stacks']
+                NETWORKS.reserve(record['cluster_name'], record['kubernetes_service_network'])
+
+def __watch(stacks, started): # pylint: disable=unused-argument
     for stack in stacks:
-        if stack is not None:
-            cluster = (__cluster(stack))
-            if cluster:
-                clusters.append(cluster)
+        RECONCILER.watch(stack)
+
+STACKS.listeners.append(__register)
+STACKS.listeners.append(lambda stacks, started: __reserve_networks(REGISTRY.clusters()))
+STACKS.listeners.append(__watch)
+
+# Reservations of clusters the registry already knows about hold before the first listing.
+__reserve_networks(REGISTRY.clusters())
+
+# Run by demiurge.load() rather than on import, so that importing the API starts no process pool
+# or thread. Each of them only starts once.
+def start():
+    KEYS.start()
+    STACKS.start()
+
+# Run by demiurge.warm_up() once the application is loaded. Clusters are listed and network
+# reservations seeded from the registry, so a registry that no process sharing it has synced yet is
+# rebuilt from a first listing of the stacks before the server is ready. A registry synced before a
+# restart answers while the stack index refreshes in the background.
+def warm_up():
+    while REGISTRY.synced is None:
+        try:
+            STACKS.refresh()
+        except Exception: # pylint: disable=broad-except
+            logger.exception('Unable to rebuild the cluster registry')
+            time.sleep(STACKS.ttl / 2.0)
+
+def __record_stack(stack):
+    record = __record(stack)
+
+    # A deleted cluster is dropped at once rather than by the next full sync.
+    if record and record['status'] == 'DELETE_COMPLETE':
+        REGISTRY.remove(record['cluster_name'])
+    elif record:
+        REGISTRY.sync([record])
+
+    NOTIFIER.notify(stack['StackName'])
+
+RECONCILER.listeners.append(__record_stack)
+
+# A watcher of a cluster whose create failed is waiting for the operation to finish.
+JOBS.listeners.append(lambda operation: NOTIFIER.notify(STACK_NAME.format(operation.cluster_name)))
+
+def __update(stack):
+    STACKS.update(stack)
+    __record_stack(stack)
+
+# Whether network was reserved for the existing stack of the cluster rather than allocated for its
+# create. If the stack cannot be described, the reservation is kept: a network leaked until the next
+# refresh of the stack index is better than one handed out twice.
+def __reserved_by_stack(cluster_name, network):
+    try:
+        stack = describe_stack(CLIENT, STACK_NAME.format(cluster_name))
+    except Exception: # pylint: disable=broad-except
+        logger.exception('Unable to describe the existing stack of %s', cluster_name)
+        return True
 
-    for cluster in clusters:
-        if 'kubernetes_service_network' in cluster:
-            networks.append(cluster['kubernetes_service_network'])
+    if stack is None:
+        return False
 
-    for subnet_no in range(1, 254):
-        subnet = '10.3.{}.0/24'.format(subnet_no)
-        if not subnet in networks:
-            return subnet_no
+    __update(stack)
+    cluster = __cluster(stack)
 
-@AUTH.login_required
-def put(cluster_name):
-    subnet_no = __get_next_network()
-    if subnet_no is None:
-        return NoContent, 409
+    return cluster is not None and cluster.get('kubernetes_service_network') == network
+
+def __create(operation, network, workers):
+    from ..aws import TEMPLATE_BODY, TEMPLATE_DIGEST
 
+    cluster_name = operation.cluster_name
+
+    # Until the stack is created, the network is only reserved by this operation.
     try:
+        (ca_key, ca_cert, api_server_key, api_server_cert) = create_pki(
+            KEYS, network_address(network, 1))
+
+        # Written to the nodes by write_files, which decodes them.
+        ca_cert, api_server_key, api_server_cert = [
+            check_length(parameter, gzip_base64(pem)) for parameter, pem in [
+                ('CACert', ca_cert), ('APIServerKey', api_server_key),
+                ('APIServerCert', api_server_cert)]]
+        template = TEMPLATES.arguments(TEMPLATE_BODY, TEMPLATE_DIGEST)
+
         CLIENT.create_stack(
             StackName=STACK_NAME.format(cluster_name),
-            TemplateBody=TEMPLATE.to_json(),
             Parameters=[
                 {
                     'ParameterKey': 'KubernetesServiceNetwork',
-                    'ParameterValue': '10.3.{}.0/24'.format(subnet_no),
+                    'ParameterValue': network,
                 },
                 {
                     'ParameterKey': 'KubernetesServiceNetworkMin',
-                    'ParameterValue': '10.3.{}.0'.format(subnet_no),
+                    'ParameterValue': network_address(network),
                 },
                 {
                     'ParameterKey': 'KubernetesServiceNetworkMax',
-                    'ParameterValue': '10.3.{}.0'.format(subnet_no),
+                    'ParameterValue': network_address(network),
                 },
                 {
                     'ParameterKey': 'VPC',
@@ -172,40 +448,212 @@ def put(cluster_name):
                     'ParameterKey': 'ConsulJoin',
                     'ParameterValue': APPLICATION.config['CONSUL_JOIN'],
                 },
+                {
+                    'ParameterKey': 'CAKey',
+                    'ParameterValue': ca_key,
+                },
+                {
+                    'ParameterKey': 'CACert',
+                    'ParameterValue': ca_cert,
+                },
+                {
+                    'ParameterKey': 'APIServerKey',
+                    'ParameterValue': api_server_key,
+                },
+                {
+                    'ParameterKey': 'APIServerCert',
+                    'ParameterValue': api_server_cert,
+                },
+                {
+                    'ParameterKey': 'WorkerCount',
+                    'ParameterValue': str(workers['worker_count']),
+                },
+                {
+                    'ParameterKey': 'WorkerMaxCount',
+                    'ParameterValue': str(workers['worker_max_count']),
+                },
+                {
+                    'ParameterKey': 'WorkerInstanceType',
+                    'ParameterValue': workers['worker_instance_type'],
+                },
                 ],
             DisableRollback=APP.debug,
             Capabilities=[
                 'CAPABILITY_IAM',
                 ],
+            **template
             )
     except ClientError as exception:
-        if exception.response['Error']['Code'] == 'AlreadyExistsException':
-            return NoContent, 409
-        else:
+        if exception.response['Error']['Code'] != 'AlreadyExistsException':
+            NETWORKS.release(cluster_name)
             raise
 
+        if not __reserved_by_stack(cluster_name, network):
+            NETWORKS.release(cluster_name)
+        raise OperationError('Cluster already exists')
+    except BaseException:
+        NETWORKS.release(cluster_name)
+        raise
+
     in_progress = False
     retries = 0
+    waiting = time.time()
 
     while not in_progress and retries < MAX_RETRIES:
         response = CLIENT.describe_stacks(StackName=STACK_NAME.format(cluster_name))
 
         for stack in response['Stacks']:
+            __update(stack)
             in_progress = bool(re.match(r'(CREATE|UPDATE)_IN_PROGRESS', stack['StackStatus']))
 
-        # SEE: http://docs.aws.amazon.com/general/latest/gr/api-retries.html
-        secs = 2**retries*0.1
-        sleep(secs)
+            if in_progress:
+                RECONCILER.watch(stack)
+
         retries += 1
+        time.sleep(backoff(retries, cap=30.0))
+
+    CREATE_WAIT_SECONDS.observe(time.time() - waiting)
+
+    if not in_progress:
+        NETWORKS.release(cluster_name)
+        raise OperationError('Stack did not reach CREATE_IN_PROGRESS')
+
+# Worker nodes of a new cluster, from the body of its PUT or its entry in a batch. Their
+# autoscaling group may grow up to worker_max_count, by default worker_count.
+def __workers(cluster):
+    count = cluster.get('worker_count', APPLICATION.config.get('WORKER_COUNT', 0))
+    max_count = cluster.get('worker_max_count', count)
+
+    return {
+        'worker_count': count,
+        'worker_max_count': max_count,
+        'worker_instance_type': cluster.get(
+            'worker_instance_type', APPLICATION.config.get('WORKER_INSTANCE_TYPE', 'm4.large')),
+        }
+
+# Why the workers of a new cluster cannot be created, None if they can. The template only creates
+# the worker autoscaling group of a cluster that starts with workers.
+def __workers_error(workers):
+    if workers['worker_max_count'] < workers['worker_count']:
+        return 'worker_max_count is below worker_count'
+    if workers['worker_max_count'] and not workers['worker_count']:
+        return 'worker_max_count is above 0 without a worker_count'
+
+    return None
 
-    return NoContent, 202 if in_progress else 500
+@AUTH.login_required
+@REQUEST_SECONDS.time(operation='put')
+def put(cluster_name):
+    workers = __workers(flask.request.get_json(silent=True) or {})
+    if __workers_error(workers):
+        return NoContent, 400
+
+    # Concurrent PUTs of one cluster with the same workers are all answered with the operation
+    # that creates it; a PUT with other workers gets 409 like any later one.
+    return FLIGHTS.do('put', (cluster_name, tuple(sorted(workers.items()))), __put, cluster_name,
+                      workers)
+
+def __put(cluster_name, workers):
+    with CREATE_LOCK:
+        if STACKS.lookup(STACK_NAME.format(cluster_name)) or __creating(cluster_name):
+            return NoContent, 409
+
+        network = NETWORKS.allocate(cluster_name)
+        if network is None:
+            return NoContent, 409
+
+        operation = JOBS.submit(
+            Operation('create', cluster_name, kubernetes_service_network=network, **workers),
+            __create, network, workers)
+
+    return operation.to_dict(), 202, {'Location': '/operations/' + operation.operation_id}
 
 @AUTH.login_required
+@REQUEST_SECONDS.time(operation='delete')
 def delete(cluster_name):
+    __delete(cluster_name)
+
+    return NoContent, 204
+
+def __delete(cluster_name):
     CLIENT.delete_stack(
         StackName=STACK_NAME.format(cluster_name),
         )
+    STACKS.mark(STACK_NAME.format(cluster_name), 'DELETE_IN_PROGRESS')
+    REGISTRY.mark(cluster_name, 'DELETE_IN_PROGRESS')
+    NOTIFIER.notify(STACK_NAME.format(cluster_name))
 
-    return NoContent, 204
+    stack = STACKS.lookup(STACK_NAME.format(cluster_name))
+    if stack:
+        RECONCILER.watch(stack)
+    NETWORKS.release(cluster_name)
+
+def __names(body):
+    names = []
+
+    for cluster in body['clusters']:
+        if cluster['cluster_name'] not in names:
+            names.append(cluster['cluster_name'])
+
+    return names
+
+# Creates up to 100 clusters. Existing clusters are checked against the registry and networks are
+# allocated in one pass; the creates then run on the job workers, JOB_WORKERS at a time. Every
+# cluster gets a result with the status PUT /clusters/{cluster_name} would have returned.
+@AUTH.login_required
+@REQUEST_SECONDS.time(operation='batch_create')
+def batch_create():
+    names = __names(flask.request.json)
+    results = dict((name, {'cluster_name': name, 'status': 409}) for name in names)
+
+    # The first entry of a cluster named more than once is the one created.
+    workers = {}
+    for cluster in reversed(flask.request.json['clusters']):
+        workers[cluster['cluster_name']] = __workers(cluster)
+
+    with CREATE_LOCK:
+        available = []
+        for name in names:
+            error = __workers_error(workers[name])
+            if error:
+                results[name].update(status=400, error=error)
+                continue
+
+            record = REGISTRY.get(name)
+            if (record is None or record['status'] == 'DELETE_COMPLETE') and not __creating(name):
+                available.append(name)
+
+        for name, network in NETWORKS.allocate_all(available).items():
+            if network is None:
+                results[name]['error'] = 'No service network available'
+                continue
+
+            operation = JOBS.submit(
+                Operation('create', name, kubernetes_service_network=network, **workers[name]),
+                __create, network, workers[name])
+            results[name].update(status=202, operation=operation.to_dict())
+
+    return {'results': [results[name] for name in names]}, 200
+
+# Deletes up to 100 clusters, JOB_WORKERS at a time.
+@AUTH.login_required
+@REQUEST_SECONDS.time(operation='batch_delete')
+def batch_delete():
+    def delete_one(name):
+        try:
+            __delete(name)
+        except ClientError as exception:
+            return {'cluster_name': name, 'status': 500,
+                    'error': exception.response['Error']['Message']}
+
+        return {'cluster_name': name, 'status': 204}
+
+    names = __names(flask.request.json)
+    executor = ThreadPoolExecutor(max_workers=min(len(names), JOBS.workers))
+
+    try:
+        return {'results': list(executor.map(delete_one, names))}, 200
+    finally:
+        executor.shutdown(wait=False)
 
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
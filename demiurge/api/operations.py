@@ -0,0 +1,31 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from connexion import NoContent
+
+from .. import AUTH
+from .clusters import JOBS
+
+@AUTH.login_required
+def get(operation_id):
+    operation = JOBS.get(operation_id)
+
+    if operation is None:
+        return NoContent, 404
+
+    return operation.to_dict(), 200
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
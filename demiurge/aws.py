@@ -17,18 +17,23 @@
 
 # SEE: https://coreos.com/kubernetes/docs/latest/getting-started.html
 
+import hashlib
+
 # pylint: disable=wildcard-import, unused-wildcard-import
 from troposphere.constants import *
 # pylint: enable=wildcard-import, unused-wildcard-import
 
-from troposphere import (AWS_REGION, ec2, iam, Base64, FindInMap, Join, Parameter, Ref, Template,
-                         autoscaling, policies, elasticloadbalancing, GetAtt, Output)
-from cert import create_cert
+from troposphere import (AWS_REGION, ec2, iam, Base64, Equals, FindInMap, If, Join, Not, Parameter,
+                         Ref, Template, autoscaling, policies, elasticloadbalancing, GetAtt, Output)
 
 import awacs.ec2
 import awacs.iam
 import awacs.sts
 
+from .cloudconfig import CloudConfig, DropIn, File, Unit, gzipped, memoized
+from .parameters import INSTANCE_TYPES, MAX_LENGTHS, MAX_WORKERS
+from .userdata import check_size
+
 TEMPLATE = Template()
 
 TEMPLATE.add_version('2010-09-09')
@@ -60,42 +65,49 @@ SUBNET = TEMPLATE.add_parameter(Parameter(
 KUBERNETES_SERVICE_NETWORK = TEMPLATE.add_parameter(Parameter(
     'KubernetesServiceNetwork',
     Type=STRING,
+    MaxLength=str(MAX_LENGTHS['KubernetesServiceNetwork']),
     Default='10.3.0.0/24',
     ))
 
 KUBERNETES_SERVICE_NETWORK_MIN = TEMPLATE.add_parameter(Parameter(
     'KubernetesServiceNetworkMin',
     Type=STRING,
+    MaxLength=str(MAX_LENGTHS['KubernetesServiceNetworkMin']),
     Default='10.3.0.0',
     ))
 
 KUBERNETES_SERVICE_NETWORK_MAX = TEMPLATE.add_parameter(Parameter(
     'KubernetesServiceNetworkMax',
     Type=STRING,
+    MaxLength=str(MAX_LENGTHS['KubernetesServiceNetworkMax']),
     Default='10.3.0.0',
     ))
 
 FLANNEL_NETWORK = TEMPLATE.add_parameter(Parameter(
     'FlannelNetwork',
     Type=STRING,
+    MaxLength=str(MAX_LENGTHS['FlannelNetwork']),
     Default='10.1.0.0/16',
     ))
 
 FLANNEL_SUBNET_LEN = TEMPLATE.add_parameter(Parameter(
     'FlannelSubnetLen',
     Type=NUMBER,
+    MaxValue='32',
     Default='24',
     ))
 
 FLANNEL_SUBNET_MIN = TEMPLATE.add_parameter(Parameter(
     'FlannelSubnetMin',
     Type=STRING,
+    MaxLength=str(MAX_LENGTHS['FlannelSubnetMin']),
     Default='10.1.0.0',
     ))
 
 FLANNEL_SUBNET_MAX = TEMPLATE.add_parameter(Parameter(
     'FlannelSubnetMax',
     Type=STRING,
+    MaxLength=str(MAX_LENGTHS['FlannelSubnetMax']),
     Default='10.1.24.0',
     ))
 
@@ -108,24 +120,28 @@ CLUSTER_NAME = TEMPLATE.add_parameter(Parameter(
 USERNAME = TEMPLATE.add_parameter(Parameter(
     'Username',
     Type=STRING,
+    MaxLength=str(MAX_LENGTHS['Username']),
     Default='admin',
     ))
 
 PASSWORD = TEMPLATE.add_parameter(Parameter(
     'Password',
     Type=STRING,
+    MaxLength=str(MAX_LENGTHS['Password']),
     Default='admin',
     ))
 
 CONSUL_DC = TEMPLATE.add_parameter(Parameter(
     'ConsulDC',
     Type=STRING,
+    MaxLength=str(MAX_LENGTHS['ConsulDC']),
     Default='dc1',
     ))
 
 CONSUL_JOIN = TEMPLATE.add_parameter(Parameter(
     'ConsulJoin',
     Type=STRING,
+    MaxLength=str(MAX_LENGTHS['ConsulJoin']),
     ))
 
 DOCKER_GRAPH_SIZE = TEMPLATE.add_parameter(Parameter(
@@ -134,6 +150,35 @@ DOCKER_GRAPH_SIZE = TEMPLATE.add_parameter(Parameter(
     Default='120',
     ))
 
+# Every cluster gets its own CA and API server certificate, generated by demiurge.pki. The
+# certificates and the API server key are written to the nodes, so they are passed gzipped and
+# base64 encoded, as write_files decodes them, rather than base64 encoded from their PEM text.
+CA_KEY = TEMPLATE.add_parameter(Parameter(
+    'CAKey',
+    Type=STRING,
+    NoEcho=True,
+    MaxLength=str(MAX_LENGTHS['CAKey']),
+    ))
+
+CA_CERT = TEMPLATE.add_parameter(Parameter(
+    'CACert',
+    Type=STRING,
+    MaxLength=str(MAX_LENGTHS['CACert']),
+    ))
+
+API_SERVER_KEY = TEMPLATE.add_parameter(Parameter(
+    'APIServerKey',
+    Type=STRING,
+    NoEcho=True,
+    MaxLength=str(MAX_LENGTHS['APIServerKey']),
+    ))
+
+API_SERVER_CERT = TEMPLATE.add_parameter(Parameter(
+    'APIServerCert',
+    Type=STRING,
+    MaxLength=str(MAX_LENGTHS['APIServerCert']),
+    ))
+
 ROLE = TEMPLATE.add_resource(iam.Role(
     'Role',
     AssumeRolePolicyDocument=awacs.aws.Policy(
@@ -191,9 +236,38 @@ INSTANCE_TYPE = TEMPLATE.add_parameter(Parameter(
     'InstanceType',
     Type=STRING,
     Default=M4_LARGE,
-    AllowedValues=[M4_LARGE, M4_XLARGE, M4_2XLARGE, M4_4XLARGE, M4_10XLARGE],
+    AllowedValues=INSTANCE_TYPES,
+    ))
+
+# Workers run the pods of the cluster in an autoscaling group of their own, so that they do not
+# starve its control plane. A cluster without workers schedules pods on its masters.
+WORKER_INSTANCE_TYPE = TEMPLATE.add_parameter(Parameter(
+    'WorkerInstanceType',
+    Type=STRING,
+    Default=M4_LARGE,
+    AllowedValues=INSTANCE_TYPES,
+    ))
+
+WORKER_COUNT = TEMPLATE.add_parameter(Parameter(
+    'WorkerCount',
+    Type=NUMBER,
+    MinValue='0',
+    MaxValue=str(MAX_WORKERS),
+    Default='0',
+    ))
+
+WORKER_MAX_COUNT = TEMPLATE.add_parameter(Parameter(
+    'WorkerMaxCount',
+    Type=NUMBER,
+    MinValue='0',
+    MaxValue=str(MAX_WORKERS),
+    Default='0',
     ))
 
+HAS_WORKERS = 'HasWorkers'
+
+TEMPLATE.add_condition(HAS_WORKERS, Not(Equals(Ref(WORKER_COUNT), '0')))
+
 KEY_NAME = TEMPLATE.add_parameter(Parameter(
     'KeyName',
     Type=KEY_PAIR_NAME,
@@ -284,6 +358,16 @@ TEMPLATE.add_resource(ec2.SecurityGroupIngress(
     GroupId=Ref(SECURITY_GROUP),
     ))
 
+# For logs and exec, the API server connects to the kubelet of the node running the pod.
+TEMPLATE.add_resource(ec2.SecurityGroupIngress(
+    'kubeletSecurityGroupIngress',
+    IpProtocol='tcp',
+    FromPort='10250',
+    ToPort='10250',
+    SourceSecurityGroupId=Ref(SECURITY_GROUP),
+    GroupId=Ref(SECURITY_GROUP),
+    ))
+
 API_SERVER_SECURITY_GROUP = TEMPLATE.add_resource(ec2.SecurityGroup(
     'ServerSecurityGroup',
     GroupDescription='Kubernetes API Server Security Group',
@@ -354,19 +438,473 @@ CONSUL_HTTP_API_LOAD_BALANCER = TEMPLATE.add_resource(elasticloadbalancing.LoadB
     Subnets=[Ref(SUBNET)],
     ))
 
-(CA_KEY_PEM, CA_CERT_PEM, CA_KEY, CA_CERT) = create_cert('kube-ca')
-api_san_list = [
-    'DNS:kubernetes',
-    'DNS:kubernetes.default',
-    'DNS:kubernetes.default.svc',
-    'DNS:kubernetes.default.svc.cluster.local',
-    'DNS:*.*.elb.amazonaws.com',
-    'DNS:*.*.compute.internal',
-    'DNS:*.ec2.internal',
-    'IP:10.3.0.1',
-    ]
-(API_KEY_PEM, API_CERT_PEM, API_KEY, API_CERT) = create_cert('kube-apiserver',
-        san_list=api_san_list, sign_key=CA_KEY, sign_cert=CA_CERT)
+# Pod manifests without parameters, written gzipped.
+
+KUBE_PROXY_MANIFEST = '''\
+apiVersion: v1
+kind: Pod
+metadata:
+  name: kube-proxy
+  namespace: kube-system
+spec:
+  hostNetwork: true
+  containers:
+  - name: kube-proxy
+    image: quay.io/coreos/hyperkube:v1.2.2_coreos.0
+    command:
+    - /hyperkube
+    - proxy
+    - --master=http://127.0.0.1:8080
+    - --proxy-mode=iptables
+    securityContext:
+      privileged: true
+    volumeMounts:
+    - mountPath: /etc/ssl/certs
+      name: ssl-certs-host
+      readOnly: true
+  volumes:
+  - hostPath:
+      path: /usr/share/ca-certificates
+    name: ssl-certs-host
+'''
+
+KUBE_CONTROLLER_MANAGER_MANIFEST = '''\
+apiVersion: v1
+kind: Pod
+metadata:
+  name: kube-controller-manager
+  namespace: kube-system
+spec:
+  hostNetwork: true
+  containers:
+  - name: kube-controller-manager
+    image: quay.io/coreos/hyperkube:v1.2.2_coreos.0
+    command:
+    - /hyperkube
+    - controller-manager
+    - --master=http://127.0.0.1:8080
+    - --leader-elect=true
+    - --service-sync-period=10m
+    - --node-sync-period=5m
+    - --cloud-provider=aws
+    - --service-account-private-key-file=/etc/kubernetes/ssl/apiserver-key.pem
+    - --root-ca-file=/etc/kubernetes/ssl/ca.pem
+    livenessProbe:
+      httpGet:
+        host: 127.0.0.1
+        path: /healthz
+        port: 10252
+      initialDelaySeconds: 15
+      timeoutSeconds: 1
+    volumeMounts:
+    - mountPath: /etc/kubernetes/ssl
+      name: ssl-certs-generated
+      readOnly: true
+    - mountPath: /etc/ssl/certs
+      name: ssl-certs-host
+      readOnly: true
+  volumes:
+  - hostPath:
+      path: /etc/kubernetes/ssl
+    name: ssl-certs-generated
+  - hostPath:
+      path: /usr/share/ca-certificates
+    name: ssl-certs-host
+'''
+
+KUBE_SCHEDULER_MANIFEST = '''\
+apiVersion: v1
+kind: Pod
+metadata:
+  name: kube-scheduler
+  namespace: kube-system
+spec:
+  hostNetwork: true
+  containers:
+  - name: kube-scheduler
+    image: quay.io/coreos/hyperkube:v1.2.2_coreos.0
+    command:
+    - /hyperkube
+    - scheduler
+    - --master=http://127.0.0.1:8080
+    - --leader-elect=true
+    livenessProbe:
+      httpGet:
+        host: 127.0.0.1
+        path: /healthz
+        port: 10251
+      initialDelaySeconds: 15
+      timeoutSeconds: 1
+'''
+
+# Workers reach the API server through its load balancer, as set in their kubeconfig.
+WORKER_KUBE_PROXY_MANIFEST = '''\
+apiVersion: v1
+kind: Pod
+metadata:
+  name: kube-proxy
+  namespace: kube-system
+spec:
+  hostNetwork: true
+  containers:
+  - name: kube-proxy
+    image: quay.io/coreos/hyperkube:v1.2.2_coreos.0
+    command:
+    - /hyperkube
+    - proxy
+    - --kubeconfig=/etc/kubernetes/worker-kubeconfig.yaml
+    - --proxy-mode=iptables
+    securityContext:
+      privileged: true
+    volumeMounts:
+    - mountPath: /etc/ssl/certs
+      name: ssl-certs-host
+      readOnly: true
+    - mountPath: /etc/kubernetes/worker-kubeconfig.yaml
+      name: kubeconfig
+      readOnly: true
+    - mountPath: /etc/kubernetes/ssl
+      name: etc-kube-ssl
+      readOnly: true
+  volumes:
+  - hostPath:
+      path: /usr/share/ca-certificates
+    name: ssl-certs-host
+  - hostPath:
+      path: /etc/kubernetes/worker-kubeconfig.yaml
+    name: kubeconfig
+  - hostPath:
+      path: /etc/kubernetes/ssl
+    name: etc-kube-ssl
+'''
+
+MASTER = 'master'
+WORKER = 'worker'
+
+# Cloud-config of the masters of a cluster, or of its workers.
+@memoized
+def cloud_config(role):
+    if role == MASTER:
+        etcd2 = [
+            ('advertise-client-urls', 'http://$private_ipv4:2379'),
+            ('initial-advertise-peer-urls', 'http://$private_ipv4:2380'),
+            ('listen-client-urls', 'http://0.0.0.0:2379'),
+            ('listen-peer-urls', 'http://$private_ipv4:2380'),
+            ]
+        etcd_peers = []
+        network_config = [
+            'ExecStartPre=/usr/bin/etcdctl set /coreos.com/network/flannel/config \'{ ',
+            '"Network": "', Ref(FLANNEL_NETWORK), '", "SubnetLen": ',
+            Ref(FLANNEL_SUBNET_LEN), ', "SubnetMin": "', Ref(FLANNEL_SUBNET_MIN),
+            '", "SubnetMax": "', Ref(FLANNEL_SUBNET_MAX), '" }\'\n',
+            'ExecStartPre=/usr/bin/etcdctl set /coreos.com/network/k8s/config \'{ ',
+            '"Network": "', Ref(KUBERNETES_SERVICE_NETWORK),
+            '", "SubnetLen": 24, "SubnetMin": "', Ref(KUBERNETES_SERVICE_NETWORK_MIN),
+            '", "SubnetMax": "', Ref(KUBERNETES_SERVICE_NETWORK_MAX),
+            '", "Backend": {"Type": "aws-vpc"}}\'\n',
+            ]
+        # Pods go to the workers of a cluster that has some.
+        kubelet = [
+            '  --api-servers=http://127.0.0.1:8080 \\\n',
+            '  --register-schedulable=', If(HAS_WORKERS, 'false', 'true'), ' \\\n',
+            ]
+    else:
+        # Workers proxy etcd to the masters, whose autoscaling group etcd-aws-cluster looks up,
+        # and leave the network config to them.
+        etcd2 = [
+            ('proxy', 'on'),
+            ('listen-client-urls', 'http://127.0.0.1:2379'),
+            ]
+        etcd_peers = ['-e PROXY_ASG=', Ref(AUTO_SCALING_GROUP), ' ']
+        network_config = []
+        kubelet = [
+            '  --api-servers=https://', GetAtt(API_SERVER_LOAD_BALANCER, 'DNSName'), ' \\\n',
+            '  --kubeconfig=/etc/kubernetes/worker-kubeconfig.yaml \\\n',
+            ]
+
+    units = [
+        Unit('update-engine.service', command='stop'),
+        Unit('locksmithd.service', command='stop'),
+        Unit('format-ephemeral.service', command='start', content=[
+            '[Unit]\n',
+            'Description=Formats the ephemeral drive\n',
+            'After=dev-xvdb.device\n',
+            'Requires=dev-xvdb.device\n',
+            '[Service]\n',
+            'Type=oneshot\n',
+            'RemainAfterExit=yes\n',
+            'ExecStart=/usr/sbin/wipefs -f /dev/xvdb\n',
+            'ExecStart=/usr/sbin/mkfs.ext4 -F /dev/xvdb\n',
+            ]),
+        Unit('var-lib-docker.mount', command='start', content=[
+            '[Unit]\n',
+            'Description=Mount ephemeral to /var/lib/docker\n',
+            'Requires=format-ephemeral.service\n',
+            'After=format-ephemeral.service\n',
+            '[Mount]\n',
+            'What=/dev/xvdb\n',
+            'Where=/var/lib/docker\n',
+            'Type=ext4\n',
+            ]),
+        Unit('docker.service', drop_ins=[
+            DropIn('10-wait-docker.conf', [
+                '[Unit]\n',
+                'After=var-lib-docker.mount\n',
+                'Requires=var-lib-docker.mount\n',
+                ]),
+            ]),
+        Unit('etcd-peers.service', command='start', content=[
+            '[Unit]\n',
+            'Description=Write a file with the etcd peers that we should bootstrap to\n',
+            'After=docker.service\n',
+            'Requires=docker.service\n',
+            '\n',
+            '[Service]\n',
+            'Type=oneshot\n',
+            'RemainAfterExit=yes\n',
+            'ExecStart=/usr/bin/docker pull monsantoco/etcd-aws-cluster:latest\n',
+            'ExecStart=/usr/bin/docker run --rm=true -v /etc/sysconfig/:/etc/sysconfig/ ',
+            ] + etcd_peers + [
+            'monsantoco/etcd-aws-cluster:latest\n',
+            ]),
+        Unit('etcd2.service', command='start', drop_ins=[
+            DropIn('30-etcd_peers.conf', [
+                '[Unit]\n',
+                'After=etcd-peers.service\n',
+                'Requires=etcd-peers.service\n',
+                '\n',
+                '[Service]\n',
+                '# Load the other hosts in the etcd leader autoscaling group from file\n',
+                'EnvironmentFile=/etc/sysconfig/etcd-peers\n',
+                ]),
+            ]),
+        Unit('fleet.service', command='start'),
+        Unit('docker-flannel.service', content=[
+            '[Unit]\n',
+            '\n',
+            '[Service]\n',
+            'Type=oneshot\n',
+            'RemainAfterExit=yes\n',
+            'Environment="DOCKER_HOST=unix:///var/run/early-docker.sock"\n',
+            'Environment="FLANNEL_VER=0.5.5"\n',
+            'Environment="FLANNEL_IMG=quay.io/coreos/flannel"\n',
+            'ExecStart=/usr/bin/docker run --net=host --rm --volume=/run:/run \\\n',
+            '  ${FLANNEL_IMG}:${FLANNEL_VER} \\\n',
+            '  /opt/bin/mk-docker-opts.sh -d /run/flannel_docker_opts.env \\\n',
+            '  -f /run/flannel/networks/flannel.env -i\n',
+            'ExecStart=/usr/bin/systemctl restart docker.service\n',
+            ]),
+        Unit('docker-flannel.path', command='start', content=[
+            '[Unit]\n',
+            '\n',
+            '[Path]\n',
+            'PathExists=/run/flannel/networks/flannel.env\n',
+            'PathModified=/run/flannel/networks/flannel.env\n',
+            '\n',
+            '[Install]\n',
+            'WantedBy=multi-user.target\n',
+            ]),
+        Unit('flanneld.service', command='start', drop_ins=[
+            DropIn('50-network-config.conf', [
+                '[Service]\n',
+                'Type=simple\n',
+                ] + network_config + [
+                'ExecStart=\n',
+                'ExecStart=/usr/bin/docker run --net=host --privileged=true --rm \\\n',
+                '  --volume=/run/flannel:/run/flannel \\\n',
+                '  --env=AWS_ACCESS_KEY_ID=${AWS_ACCESS_KEY_ID} \\\n',
+                '  --env=AWS_SECRET_ACCESS_KEY=${AWS_SECRET_ACCESS_KEY} \\\n',
+                '  --env-file=${FLANNEL_ENV_FILE} \\\n',
+                '  --volume=/usr/share/ca-certificates:/etc/ssl/certs:ro \\\n',
+                '  --volume=${ETCD_SSL_DIR}:${ETCD_SSL_DIR}:ro \\\n',
+                '  ${FLANNEL_IMG}:${FLANNEL_VER} /opt/bin/flanneld --ip-masq=true \\\n',
+                '  --networks=flannel,k8s\n',
+                '\n',
+                'ExecStartPost=\n',
+                ]),
+            ]),
+        Unit('kubelet.service', command='start', drop_ins=[
+            DropIn('local.conf', [
+                '[Service]\n',
+                'Environment="RKT_OPTS=--volume=resolv,kind=host,source=/etc/resolv.conf ',
+                '--mount volume=resolv,target=/etc/resolv.conf"\n',
+                'Environment=KUBELET_VERSION=v1.2.2_coreos.0\n',
+                'ExecStartPre=/usr/bin/mkdir -p /etc/kubernetes/manifests\n',
+                '\n',
+                'ExecStart=\n',
+                'ExecStart=/usr/lib/coreos/kubelet-wrapper \\\n',
+                ] + kubelet + [
+                '  --allow-privileged=true \\\n',
+                '  --cluster-dns=', Ref(CONSUL_JOIN), ' \\\n',
+                '  --cloud-provider=aws \\\n',
+                '  --config=/etc/kubernetes/manifests\n',
+                'Restart=always\n',
+                'RestartSec=10\n',
+                ]),
+            ]),
+        ]
+
+    if role == MASTER:
+        units.append(Unit('kube-system.service', command='start', content=[
+            '[Unit]\n',
+            'After=kubelet.service\n',
+            'Requires=kubelet.service\n',
+            '\n',
+            '[Service]\n',
+            'Type=oneshot\n',
+            'ExecStart=/bin/sh -c \'while true; do curl -H "Content-Type: application/json" ',
+            '-XPOST -d\\\'{"apiVersion":"v1","kind":"Namespace",',
+            '"metadata":{"name":"kube-system"}}\\\' -sS ',
+            '"http://127.0.0.1:8080/api/v1/namespaces" && break || sleep 20; done\'\n',
+            ]))
+
+        write_files = [
+            File('/etc/kubernetes/ssl/ca.pem', Ref(CA_CERT), '0600', 'gzip+base64'),
+            File('/etc/kubernetes/ssl/apiserver.pem', Ref(API_SERVER_CERT), '0600', 'gzip+base64'),
+            File('/etc/kubernetes/ssl/apiserver-key.pem', Ref(API_SERVER_KEY), '0600',
+                 'gzip+base64'),
+            File('/etc/kubernetes/manifests/kube-apiserver.yaml', [
+                'apiVersion: v1\n',
+                'kind: Pod\n',
+                'metadata:\n',
+                '  name: kube-apiserver\n',
+                '  namespace: kube-system\n',
+                'spec:\n',
+                '  hostNetwork: true\n',
+                '  containers:\n',
+                '  - name: kube-apiserver\n',
+                '    image: quay.io/coreos/hyperkube:v1.2.2_coreos.0\n',
+                '    command:\n',
+                '    - /hyperkube\n',
+                '    - apiserver\n',
+                '    - --etcd-servers=http://127.0.0.1:2379\n',
+                '    - --allow-privileged=true\n',
+                '    - --service-cluster-ip-range=', Ref(KUBERNETES_SERVICE_NETWORK), '\n',
+                '    - --secure-port=443\n',
+                '    - --admission-control=NamespaceLifecycle,LimitRanger,SecurityContextDeny,',
+                'ResourceQuota,ServiceAccount\n',
+                '    - --runtime-config=extensions/v1beta1/deployments=true,',
+                'extensions/v1beta1/daemonsets=true\n',
+                '    - --external-hostname=', GetAtt(API_SERVER_LOAD_BALANCER, 'DNSName'), '\n',
+                '    - --basic-auth-file=/srv/kubernetes/basic_auth.csv\n',
+                '    - --cloud-provider=aws\n',
+                '    - --tls-cert-file=/etc/kubernetes/ssl/apiserver.pem\n',
+                '    - --tls-private-key-file=/etc/kubernetes/ssl/apiserver-key.pem\n',
+                '    - --client-ca-file=/etc/kubernetes/ssl/ca.pem\n',
+                '    - --service-account-key-file=/etc/kubernetes/ssl/apiserver-key.pem\n',
+                '    ports:\n',
+                '    - containerPort: 443\n',
+                '      hostPort: 443\n',
+                '      name: https\n',
+                '    - containerPort: 8080\n',
+                '      hostPort: 8080\n',
+                '      name: local\n',
+                '    volumeMounts:\n',
+                '    - mountPath: /etc/kubernetes/ssl\n',
+                '      name: ssl-certs-generated\n',
+                '      readOnly: true\n',
+                '    - mountPath: /etc/ssl/certs\n',
+                '      name: ssl-certs-host\n',
+                '      readOnly: true\n',
+                '    - mountPath: /srv/kubernetes/basic_auth.csv\n',
+                '      name: basic-auth-file\n',
+                '      readOnly: true\n',
+                '  volumes:\n',
+                '  - hostPath:\n',
+                '      path: /etc/kubernetes/ssl\n',
+                '    name: ssl-certs-generated\n',
+                '  - hostPath:\n',
+                '      path: /usr/share/ca-certificates\n',
+                '    name: ssl-certs-host\n',
+                '  - hostPath:\n',
+                '      path: /srv/kubernetes/basic_auth.csv\n',
+                '    name: basic-auth-file\n',
+                ]),
+            gzipped('/etc/kubernetes/manifests/kube-proxy.yaml', KUBE_PROXY_MANIFEST),
+            gzipped('/etc/kubernetes/manifests/kube-controller-manager.yaml',
+                    KUBE_CONTROLLER_MANAGER_MANIFEST),
+            gzipped('/etc/kubernetes/manifests/kube-scheduler.yaml', KUBE_SCHEDULER_MANIFEST),
+            File('/srv/kubernetes/basic_auth.csv', [
+                Ref(PASSWORD), ',', Ref(USERNAME), ',admin\n',
+                ]),
+            File('/etc/kubernetes/manifests/kube2consul.yaml', [
+                'apiVersion: v1\n',
+                'kind: Pod\n',
+                'metadata:\n',
+                '  name: kube2consul\n',
+                '  namespace: kube-system\n',
+                'spec:\n',
+                '  hostNetwork: true\n',
+                '  containers:\n',
+                '  - name: consul-agent\n',
+                '    image: gliderlabs/consul-agent:0.6\n',
+                '    args:\n',
+                '    - -advertise=$private_ipv4\n',
+                '    - -dc=', Ref(CONSUL_DC), '\n',
+                '    - -join=', Ref(CONSUL_JOIN), '\n',
+                '    ports:\n',
+                '    - hostPort: 8301\n',
+                '      containerPort: 8301\n',
+                '      protocol: TCP\n',
+                '      hostIP: $private_ipv4\n',
+                '    - hostPort: 8301\n',
+                '      containerPort: 8301\n',
+                '      protocol: UDP\n',
+                '      hostIP: $private_ipv4\n',
+                '    - hostPort: 8500\n',
+                '      containerPort: 8500\n',
+                '      protocol: TCP\n',
+                '      hostIP: $private_ipv4\n',
+                '  - name: kube2consul\n',
+                '    image: jmccarty3/kube2consul:latest\n',
+                '    command:\n',
+                '    - /kube2consul\n',
+                '    - -consul-agent=http://127.0.0.1:8500\n',
+                '    - -kube_master_url=http://127.0.0.1:8080\n',
+                ]),
+            ]
+    else:
+        write_files = [
+            File('/etc/kubernetes/ssl/ca.pem', Ref(CA_CERT), '0600', 'gzip+base64'),
+            File('/etc/kubernetes/worker-kubeconfig.yaml', [
+                'apiVersion: v1\n',
+                'kind: Config\n',
+                'clusters:\n',
+                '- name: local\n',
+                '  cluster:\n',
+                '    server: https://', GetAtt(API_SERVER_LOAD_BALANCER, 'DNSName'), '\n',
+                '    certificate-authority: /etc/kubernetes/ssl/ca.pem\n',
+                'users:\n',
+                '- name: kubelet\n',
+                '  user:\n',
+                '    username: ', Ref(USERNAME), '\n',
+                '    password: ', Ref(PASSWORD), '\n',
+                'contexts:\n',
+                '- name: kubelet-context\n',
+                '  context:\n',
+                '    cluster: local\n',
+                '    user: kubelet\n',
+                'current-context: kubelet-context\n',
+                ], '0600'),
+            gzipped('/etc/kubernetes/manifests/kube-proxy.yaml', WORKER_KUBE_PROXY_MANIFEST),
+            ]
+
+    return CloudConfig(
+        coreos=[
+            ('update', [
+                ('reboot-strategy', 'off'),
+                ]),
+            ('etcd2', etcd2),
+            ],
+        units=units,
+        write_files=write_files,
+        )
+
+USER_DATA = cloud_config(MASTER).render()
+
+# Checked against the largest parameters, so a template that builds cannot produce an instance
+# EC2 refuses to launch.
+USER_DATA_SIZE = check_size(USER_DATA, TEMPLATE)
 
 LAUNCH_CONFIGURATION = TEMPLATE.add_resource(autoscaling.LaunchConfiguration(
     'LaunchConfiguration',
@@ -387,361 +925,7 @@ LAUNCH_CONFIGURATION = TEMPLATE.add_resource(autoscaling.LaunchConfiguration(
         Ref(API_SERVER_SECURITY_GROUP),
         Ref(CONSUL_HTTP_API_SECURITY_GROUP)
         ],
-    UserData=Base64(Join('', [
-        '#cloud-config\n\n',
-        'coreos:\n',
-        '  update:\n',
-        '    reboot-strategy: off\n',
-        '  etcd2:\n',
-        '    advertise-client-urls: http://$private_ipv4:2379\n',
-        '    initial-advertise-peer-urls: http://$private_ipv4:2380\n',
-        '    listen-client-urls: http://0.0.0.0:2379\n',
-        '    listen-peer-urls: http://$private_ipv4:2380\n',
-        '  units:\n',
-        '    - name: update-engine.service\n',
-        '      command: stop\n',
-        '    - name: locksmithd.service\n',
-        '      command: stop\n',
-        '    - name: format-ephemeral.service\n',
-        '      command: start\n',
-        '      content: |\n',
-        '        [Unit]\n',
-        '        Description=Formats the ephemeral drive\n',
-        '        After=dev-xvdb.device\n',
-        '        Requires=dev-xvdb.device\n',
-        '        [Service]\n',
-        '        Type=oneshot\n',
-        '        RemainAfterExit=yes\n',
-        '        ExecStart=/usr/sbin/wipefs -f /dev/xvdb\n',
-        '        ExecStart=/usr/sbin/mkfs.ext4 -F /dev/xvdb\n',
-        '    - name: var-lib-docker.mount\n',
-        '      command: start\n',
-        '      content: |\n',
-        '        [Unit]\n',
-        '        Description=Mount ephemeral to /var/lib/docker\n',
-        '        Requires=format-ephemeral.service\n',
-        '        After=format-ephemeral.service\n',
-        '        [Mount]\n',
-        '        What=/dev/xvdb\n',
-        '        Where=/var/lib/docker\n',
-        '        Type=ext4\n',
-        '    - name: docker.service\n',
-        '      drop-ins:\n',
-        '        - name: 10-wait-docker.conf\n',
-        '          content: |\n',
-        '            [Unit]\n',
-        '            After=var-lib-docker.mount\n',
-        '            Requires=var-lib-docker.mount\n',
-        '    - name: etcd-peers.service\n',
-        '      command: start\n',
-        '      content: |\n',
-        '        [Unit]\n',
-        '        Description=Write a file with the etcd peers that we should bootstrap to\n',
-        '        After=docker.service\n'
-        '        Requires=docker.service\n\n',
-        '        [Service]\n',
-        '        Type=oneshot\n',
-        '        RemainAfterExit=yes\n',
-        '        ExecStart=/usr/bin/docker pull monsantoco/etcd-aws-cluster:latest\n',
-        '        ExecStart=/usr/bin/docker run --rm=true -v /etc/sysconfig/:/etc/sysconfig/ ',
-        'monsantoco/etcd-aws-cluster:latest\n',
-        '    - name: etcd2.service\n'
-        '      command: start\n',
-        '      drop-ins:\n'
-        '        - name: 30-etcd_peers.conf\n',
-        '          content: |\n',
-        '            [Unit]\n',
-        '            After=etcd-peers.service\n'
-        '            Requires=etcd-peers.service\n\n',
-        '            [Service]\n',
-        '            # Load the other hosts in the etcd leader autoscaling group from file\n',
-        '            EnvironmentFile=/etc/sysconfig/etcd-peers\n',
-        '    - name: fleet.service\n',
-        '      command: start\n',
-        '    - name: docker-flannel.service\n',
-        '      content: |\n',
-        '        [Unit]\n\n',
-        '        [Service]\n',
-        '        Type=oneshot\n',
-        '        RemainAfterExit=yes\n',
-        '        Environment="DOCKER_HOST=unix:///var/run/early-docker.sock"\n',
-        '        Environment="FLANNEL_VER=0.5.5"\n',
-        '        Environment="FLANNEL_IMG=quay.io/coreos/flannel"\n',
-        '        ExecStart=/usr/bin/docker run --net=host --rm --volume=/run:/run \\\n',
-        '          ${FLANNEL_IMG}:${FLANNEL_VER} \\\n',
-        '          /opt/bin/mk-docker-opts.sh -d /run/flannel_docker_opts.env \\\n',
-        '          -f /run/flannel/networks/flannel.env -i\n',
-        '        ExecStart=/usr/bin/systemctl restart docker.service\n',
-        '    - name: docker-flannel.path\n',
-        '      command: start\n',
-        '      content: |\n',
-        '        [Unit]\n\n',
-        '        [Path]\n',
-        '        PathExists=/run/flannel/networks/flannel.env\n',
-        '        PathModified=/run/flannel/networks/flannel.env\n\n',
-        '        [Install]\n',
-        '        WantedBy=multi-user.target\n',
-        '    - name: flanneld.service\n',
-        '      command: start\n',
-        '      drop-ins:\n',
-        '        - name: 50-network-config.conf\n',
-        '          content: |\n',
-        '            [Service]\n',
-        '            Type=simple\n',
-        '            ExecStartPre=/usr/bin/etcdctl set /coreos.com/network/flannel/config \'{ "Network": "',
-        Ref(FLANNEL_NETWORK), '", "SubnetLen": ', Ref(FLANNEL_SUBNET_LEN), ', "SubnetMin": "',
-        Ref(FLANNEL_SUBNET_MIN), '", "SubnetMax": "', Ref(FLANNEL_SUBNET_MAX), '" }\'\n',
-        '            ExecStartPre=/usr/bin/etcdctl set /coreos.com/network/k8s/config \'{ "Network": "',
-        Ref(KUBERNETES_SERVICE_NETWORK), '", "SubnetLen": 24, "SubnetMin": "',
-        Ref(KUBERNETES_SERVICE_NETWORK_MIN), '", "SubnetMax": "', Ref(KUBERNETES_SERVICE_NETWORK_MAX), 
-        '", "Backend": {"Type": "aws-vpc"}}\'\n',
-        '            ExecStart=\n',
-        '            ExecStart=/usr/bin/docker run --net=host --privileged=true --rm \\\n',
-        '              --volume=/run/flannel:/run/flannel \\\n',
-        '              --env=AWS_ACCESS_KEY_ID=${AWS_ACCESS_KEY_ID} \\\n',
-        '              --env=AWS_SECRET_ACCESS_KEY=${AWS_SECRET_ACCESS_KEY} \\\n',
-        '              --env-file=${FLANNEL_ENV_FILE} \\\n',
-        '              --volume=/usr/share/ca-certificates:/etc/ssl/certs:ro \\\n',
-        '              --volume=${ETCD_SSL_DIR}:${ETCD_SSL_DIR}:ro \\\n',
-        '              ${FLANNEL_IMG}:${FLANNEL_VER} /opt/bin/flanneld --ip-masq=true \\\n',
-        '              --networks=flannel,k8s\n\n',
-        '            ExecStartPost=\n',
-        '    - name: kubelet.service\n',
-        '      command: start\n',
-        '      drop-ins:\n',
-        '        - name: local.conf\n',
-        '          content: |\n',
-        '            [Service]\n',
-        '            Environment="RKT_OPTS=--volume=resolv,kind=host,source=/etc/resolv.conf ',
-        '--mount volume=resolv,target=/etc/resolv.conf"\n',
-        '            Environment=KUBELET_VERSION=v1.2.2_coreos.0\n',
-        '            ExecStartPre=/usr/bin/mkdir -p /etc/kubernetes/manifests\n\n',
-        '            ExecStart=\n',
-        '            ExecStart=/usr/lib/coreos/kubelet-wrapper \\\n',
-        '              --api-servers=http://127.0.0.1:8080 \\\n',
-        '              --allow-privileged=true \\\n',
-        '              --cluster-dns=', Ref(CONSUL_JOIN), ' \\\n',
-        '              --cloud-provider=aws \\\n',
-        '              --config=/etc/kubernetes/manifests\n',
-        '            Restart=always\n',
-        '            RestartSec=10\n',
-        '    - name: kube-system.service\n',
-        '      command: start\n',
-        '      content: |\n',
-        '        [Unit]\n',
-        '        After=kubelet.service\n',
-        '        Requires=kubelet.service\n\n',
-        '        [Service]\n',
-        '        Type=oneshot\n',
-        '        ExecStart=/bin/sh -c \'while true; do curl -H "Content-Type: application/json" ',
-        '-XPOST -d\\\'{"apiVersion":"v1","kind":"Namespace","metadata":{"name":"kube-system"}}\\\'',
-        ' -sS "http://127.0.0.1:8080/api/v1/namespaces" && break || sleep 20; done\'\n',
-        'write_files:\n',
-        '  - path: /etc/kubernetes/ssl/ca.pem\n',
-        '    permissions: \'0600\'\n',
-        '    content: |\n',
-        ''.join(['      {}\n'.format(line) for line in CA_CERT_PEM.split('\n')]).rstrip('\n '),
-        '\n',
-        '  - path: /etc/kubernetes/ssl/apiserver.pem\n',
-        '    permissions: \'0600\'\n',
-        '    content: |\n',
-        ''.join(['      {}\n'.format(line) for line in API_CERT_PEM.split('\n')]).rstrip('\n '),
-        '\n',
-        '  - path: /etc/kubernetes/ssl/apiserver-key.pem\n',
-        '    permissions: \'0600\'\n',
-        '    content: |\n',
-        ''.join(['      {}\n'.format(line) for line in API_KEY_PEM.split('\n')]).rstrip('\n '),
-        '\n',
-        '  - path: /etc/kubernetes/manifests/kube-apiserver.yaml\n',
-        '    content: |\n',
-        '      apiVersion: v1\n',
-        '      kind: Pod\n',
-        '      metadata:\n',
-        '        name: kube-apiserver\n',
-        '        namespace: kube-system\n',
-        '      spec:\n',
-        '        hostNetwork: true\n',
-        '        containers:\n',
-        '        - name: kube-apiserver\n',
-        '          image: quay.io/coreos/hyperkube:v1.2.2_coreos.0\n',
-        '          command:\n',
-        '          - /hyperkube\n',
-        '          - apiserver\n',
-        '          - --etcd-servers=http://127.0.0.1:2379\n',
-        '          - --allow-privileged=true\n',
-        '          - --service-cluster-ip-range=', Ref(KUBERNETES_SERVICE_NETWORK), '\n',
-        '          - --secure-port=443\n',
-        '          - --admission-control=NamespaceLifecycle,LimitRanger,SecurityContextDeny,',
-        'ResourceQuota,ServiceAccount\n',
-        '          - --runtime-config=extensions/v1beta1/deployments=true,',
-        'extensions/v1beta1/daemonsets=true\n',
-        '          - --external-hostname=', GetAtt(API_SERVER_LOAD_BALANCER, 'DNSName'), '\n',
-        '          - --basic-auth-file=/srv/kubernetes/basic_auth.csv\n',
-        '          - --cloud-provider=aws\n',
-        '          - --tls-cert-file=/etc/kubernetes/ssl/apiserver.pem\n',
-        '          - --tls-private-key-file=/etc/kubernetes/ssl/apiserver-key.pem\n',
-        '          - --client-ca-file=/etc/kubernetes/ssl/ca.pem\n',
-        '          - --service-account-key-file=/etc/kubernetes/ssl/apiserver-key.pem\n',
-        '          ports:\n',
-        '          - containerPort: 443\n',
-        '            hostPort: 443\n',
-        '            name: https\n',
-        '          - containerPort: 8080\n',
-        '            hostPort: 8080\n',
-        '            name: local\n',
-        '          volumeMounts:\n',
-        '          - mountPath: /etc/kubernetes/ssl\n',
-        '            name: ssl-certs-generated\n',
-        '            readOnly: true\n',
-        '          - mountPath: /etc/ssl/certs\n',
-        '            name: ssl-certs-host\n',
-        '            readOnly: true\n',
-        '          - mountPath: /srv/kubernetes/basic_auth.csv\n',
-        '            name: basic-auth-file\n',
-        '            readOnly: true\n',
-        '        volumes:\n',
-        '        - hostPath:\n',
-        '            path: /etc/kubernetes/ssl\n',
-        '          name: ssl-certs-generated\n',
-        '        - hostPath:\n',
-        '            path: /usr/share/ca-certificates\n',
-        '          name: ssl-certs-host\n',
-        '        - hostPath:\n',
-        '            path: /srv/kubernetes/basic_auth.csv\n',
-        '          name: basic-auth-file\n',
-        '  - path: /etc/kubernetes/manifests/kube-proxy.yaml\n',
-        '    content: |\n',
-        '      apiVersion: v1\n',
-        '      kind: Pod\n',
-        '      metadata:\n',
-        '        name: kube-proxy\n',
-        '        namespace: kube-system\n',
-        '      spec:\n',
-        '        hostNetwork: true\n',
-        '        containers:\n',
-        '        - name: kube-proxy\n',
-        '          image: quay.io/coreos/hyperkube:v1.2.2_coreos.0\n',
-        '          command:\n',
-        '          - /hyperkube\n',
-        '          - proxy\n',
-        '          - --master=http://127.0.0.1:8080\n',
-        '          - --proxy-mode=iptables\n',
-        '          securityContext:\n',
-        '            privileged: true\n',
-        '          volumeMounts:\n',
-        '          - mountPath: /etc/ssl/certs\n',
-        '            name: ssl-certs-host\n',
-        '            readOnly: true\n',
-        '        volumes:\n',
-        '        - hostPath:\n',
-        '            path: /usr/share/ca-certificates\n',
-        '          name: ssl-certs-host\n',
-        '  - path: /etc/kubernetes/manifests/kube-controller-manager.yaml\n',
-        '    content: |\n',
-        '      apiVersion: v1\n',
-        '      kind: Pod\n',
-        '      metadata:\n',
-        '        name: kube-controller-manager\n',
-        '        namespace: kube-system\n',
-        '      spec:\n',
-        '        hostNetwork: true\n',
-        '        containers:\n',
-        '        - name: kube-controller-manager\n',
-        '          image: quay.io/coreos/hyperkube:v1.2.2_coreos.0\n',
-        '          command:\n',
-        '          - /hyperkube\n',
-        '          - controller-manager\n',
-        '          - --master=http://127.0.0.1:8080\n',
-        '          - --leader-elect=true\n',
-        '          - --service-sync-period=10m\n',
-        '          - --node-sync-period=5m\n',
-        '          - --cloud-provider=aws\n',
-        '          - --service-account-private-key-file=/etc/kubernetes/ssl/apiserver-key.pem\n',
-        '          - --root-ca-file=/etc/kubernetes/ssl/ca.pem\n',
-        '          livenessProbe:\n',
-        '            httpGet:\n',
-        '              host: 127.0.0.1\n',
-        '              path: /healthz\n',
-        '              port: 10252\n',
-        '            initialDelaySeconds: 15\n',
-        '            timeoutSeconds: 1\n',
-        '          volumeMounts:\n',
-        '          - mountPath: /etc/kubernetes/ssl\n',
-        '            name: ssl-certs-generated\n',
-        '            readOnly: true\n',
-        '          - mountPath: /etc/ssl/certs\n',
-        '            name: ssl-certs-host\n',
-        '            readOnly: true\n',
-        '        volumes:\n',
-        '        - hostPath:\n',
-        '            path: /etc/kubernetes/ssl\n',
-        '          name: ssl-certs-generated\n',
-        '        - hostPath:\n',
-        '            path: /usr/share/ca-certificates\n',
-        '          name: ssl-certs-host\n',
-        '  - path: /etc/kubernetes/manifests/kube-scheduler.yaml\n',
-        '    content: |\n',
-        '      apiVersion: v1\n',
-        '      kind: Pod\n',
-        '      metadata:\n',
-        '        name: kube-scheduler\n',
-        '        namespace: kube-system\n',
-        '      spec:\n',
-        '        hostNetwork: true\n',
-        '        containers:\n',
-        '        - name: kube-scheduler\n',
-        '          image: quay.io/coreos/hyperkube:v1.2.2_coreos.0\n',
-        '          command:\n',
-        '          - /hyperkube\n',
-        '          - scheduler\n',
-        '          - --master=http://127.0.0.1:8080\n',
-        '          - --leader-elect=true\n',
-        '          livenessProbe:\n',
-        '            httpGet:\n',
-        '              host: 127.0.0.1\n',
-        '              path: /healthz\n',
-        '              port: 10251\n',
-        '            initialDelaySeconds: 15\n',
-        '            timeoutSeconds: 1\n',
-        '  - path: /srv/kubernetes/basic_auth.csv\n',
-        '    content: |\n',
-        '      ', Ref(PASSWORD), ',', Ref(USERNAME), ',admin\n',
-        '  - path: /etc/kubernetes/manifests/kube2consul.yaml\n',
-        '    content: |\n',
-        '      apiVersion: v1\n',
-        '      kind: Pod\n',
-        '      metadata:\n',
-        '        name: kube2consul\n',
-        '        namespace: kube-system\n',
-        '      spec:\n',
-        '        hostNetwork: true\n',
-        '        containers:\n',
-        '        - name: consul-agent\n',
-        '          image: gliderlabs/consul-agent:0.6\n',
-        '          args:\n',
-        '          - -advertise=$private_ipv4\n',
-        '          - -dc=', Ref(CONSUL_DC), '\n',
-        '          - -join=', Ref(CONSUL_JOIN), '\n',
-        '          ports:\n',
-        '          - hostPort: 8301\n',
-        '            containerPort: 8301\n',
-        '            protocol: TCP\n',
-        '            hostIP: $private_ipv4\n',
-        '          - hostPort: 8301\n',
-        '            containerPort: 8301\n',
-        '            protocol: UDP\n',
-        '            hostIP: $private_ipv4\n',
-        '          - hostPort: 8500\n',
-        '            containerPort: 8500\n',
-        '            protocol: TCP\n',
-        '            hostIP: $private_ipv4\n',
-        '        - name: kube2consul\n',
-        '          image: jmccarty3/kube2consul:latest\n',
-        '          command:\n',
-        '          - /kube2consul\n',
-        '          - -consul-agent=http://127.0.0.1:8500\n',
-        '          - -kube_master_url=http://127.0.0.1:8080\n',
-        ])),
+    UserData=Base64(USER_DATA),
     ))
 
 AUTO_SCALING_GROUP = TEMPLATE.add_resource(autoscaling.AutoScalingGroup(
@@ -764,6 +948,47 @@ AUTO_SCALING_GROUP = TEMPLATE.add_resource(autoscaling.AutoScalingGroup(
         ),
     ))
 
+WORKER_USER_DATA = cloud_config(WORKER).render()
+WORKER_USER_DATA_SIZE = check_size(WORKER_USER_DATA, TEMPLATE)
+
+WORKER_LAUNCH_CONFIGURATION = TEMPLATE.add_resource(autoscaling.LaunchConfiguration(
+    'WorkerLaunchConfiguration',
+    Condition=HAS_WORKERS,
+    BlockDeviceMappings=[
+        ec2.BlockDeviceMapping(
+            DeviceName='/dev/sdb',
+            Ebs=ec2.EBSBlockDevice(
+                VolumeSize=Ref(DOCKER_GRAPH_SIZE),
+                )
+            ),
+        ],
+    IamInstanceProfile=Ref(INSTANCE_PROFILE),
+    ImageId=FindInMap('RegionMap', Ref(AWS_REGION), 'AMI'),
+    InstanceType=Ref(WORKER_INSTANCE_TYPE),
+    KeyName=Ref(KEY_NAME),
+    SecurityGroups=[
+        Ref(SECURITY_GROUP),
+        ],
+    UserData=Base64(WORKER_USER_DATA),
+    ))
+
+WORKER_AUTO_SCALING_GROUP = TEMPLATE.add_resource(autoscaling.AutoScalingGroup(
+    'WorkerAutoScalingGroup',
+    Condition=HAS_WORKERS,
+    DesiredCapacity=Ref(WORKER_COUNT),
+    Tags=[autoscaling.Tag('Name', 'Kubernetes Worker', True)],
+    LaunchConfigurationName=Ref(WORKER_LAUNCH_CONFIGURATION),
+    MinSize=Ref(WORKER_COUNT),
+    MaxSize=Ref(WORKER_MAX_COUNT),
+    VPCZoneIdentifier=[Ref(SUBNET)],
+    UpdatePolicy=policies.UpdatePolicy(
+        AutoScalingRollingUpdate=policies.AutoScalingRollingUpdate(
+            MinInstancesInService='0',
+            MaxBatchSize='1',
+            ),
+        ),
+    ))
+
 TEMPLATE.add_output(Output(
     'APIServer',
     Value=Join('', ['https://', GetAtt(API_SERVER_LOAD_BALANCER, 'DNSName')]),
@@ -774,16 +999,17 @@ TEMPLATE.add_output(Output(
     Value=Join('', ['http://', GetAtt(CONSUL_HTTP_API_LOAD_BALANCER, 'DNSName'), ':8500']),
     ))
 
-TEMPLATE.add_output(Output(
-    'CAKey',
-    Value=CA_KEY_PEM,
-    ))
-
 TEMPLATE.add_output(Output(
     'CACert',
-    Value=CA_CERT_PEM,
+    Description='CA certificate of the cluster, gzipped and base64 encoded.',
+    Value=Ref(CA_CERT),
     ))
 
+# The template does not change between stacks, so it is serialized once and shared by every
+# create_stack call.
+TEMPLATE_BODY = TEMPLATE.to_json(indent=None, separators=(',', ':')).encode('utf-8')
+TEMPLATE_DIGEST = hashlib.sha256(TEMPLATE_BODY).hexdigest()
+
 if __name__ == '__main__':
     print TEMPLATE.to_json()
 
@@ -1,15 +1,40 @@
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
 from OpenSSL import crypto, SSL
 
 VALIDITY = 60*60*24*365*5
+DIGEST = 'sha256'
 
-def create_cert(cn, san_list=None, sign_key=None, sign_cert=None, ca=False):
-    generated_key = crypto.PKey()
-    generated_key.generate_key(crypto.TYPE_RSA, 2048)
+# Algorithms of the keys of cluster certificates. rsa-4096 keys can still be generated, but the
+# certificates no longer fit in the UserData of the template. ecdsa-p256 keys can be generated
+# too, but the API server key also signs service account tokens, which hyperkube v1.2.2 only
+# verifies with RSA keys.
+KEY_ALGORITHMS = ['rsa-2048']
+
+def generate_key(algorithm='rsa-2048'):
+    if algorithm == 'ecdsa-p256':
+        # pyOpenSSL cannot generate EC keys itself, but it can load and sign with them.
+        private_key = ec.generate_private_key(ec.SECP256R1(), default_backend())
+        return crypto.load_privatekey(crypto.FILETYPE_PEM, private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption()))
+    elif algorithm in ('rsa-2048', 'rsa-4096'):
+        generated_key = crypto.PKey()
+        generated_key.generate_key(crypto.TYPE_RSA, int(algorithm[len('rsa-'):]))
+        return generated_key
+    else:
+        raise ValueError('Unsupported key algorithm: {}'.format(algorithm))
+
+def create_cert(cn, san_list=None, sign_key=None, sign_cert=None, ca=False, key=None,
+                algorithm='rsa-2048'):
+    generated_key = key if key else generate_key(algorithm)
 
     generated_req = crypto.X509Req()
     generated_req.get_subject().CN = cn
     generated_req.set_pubkey(generated_key)
-    generated_req.sign(generated_key, 'sha1')
+    generated_req.sign(generated_key, DIGEST)
 
     generated_cert = crypto.X509()
 
@@ -26,7 +51,7 @@ def create_cert(cn, san_list=None, sign_key=None, sign_cert=None, ca=False):
     issuer_cert = sign_cert if sign_cert else generated_cert
     generated_cert.set_issuer(issuer_cert.get_subject())
 
-    generated_cert.sign(sign_key if sign_key else generated_key, 'sha1')
+    generated_cert.sign(sign_key if sign_key else generated_key, DIGEST)
 
     if ca:
         generated_cert.add_extensions([
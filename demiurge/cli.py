@@ -18,11 +18,39 @@ import logging
 
 import click
 
-from . import __version__, APP, APPLICATION, main
+from . import __version__, APP, APPLICATION, SERVERS, main
+from .cert import KEY_ALGORITHMS
+from .parameters import INSTANCE_TYPES, MAX_WORKERS, check_length
+from .templates import check_location
+
+# Checks an option that is given with check(*args + (value,)), which raises ValueError for a value
+# that would only fail once the server runs.
+def checked(check, *args):
+    def callback(ctx, param, value): # pylint: disable=unused-argument
+        try:
+            return value if value is None else check(*(args + (value,)))
+        except ValueError as exception:
+            raise click.BadParameter(str(exception))
+
+    return callback
 
 @click.command()
 @click.option('--debug/--no-debug', '-d', default=False)
 @click.option('--port', '-p', envvar='PORT', default=8080)
+@click.option('--server', envvar='SERVER', default='development', type=click.Choice(SERVERS),
+              help='Serve with the single-threaded development server, the threaded development '
+                   'server, or gunicorn.')
+@click.option('--workers', envvar='WORKERS', default=2,
+              help='Number of gunicorn worker processes.')
+@click.option('--threads', envvar='THREADS', default=4,
+              help='Number of threads per gunicorn worker process.')
+@click.option('--state-dir', envvar='STATE_DIR', default='demiurge-state',
+              help='Directory through which worker processes share the stack index and '
+                   'operations.')
+@click.option('--fast-json/--no-fast-json', envvar='FAST_JSON', default=True,
+              help='Serialize clusters with the compact JSON encoder instead of the indented one.')
+@click.option('--gzip-min-size', envvar='GZIP_MIN_SIZE', default=1024,
+              help='Smallest response in bytes gzipped for clients accepting it, 0 for none.')
 
 @click.option('--username', envvar='USERNAME', required=True,
               help='Username for basic authentication.')
@@ -51,10 +79,58 @@ from . import __version__, APP, APPLICATION, main
               help='Name of an existing EC2 Key Pair. Kubernetes instances will launch with '
                    'this Key Pair.')
 @click.option('--consul-dc', envvar='CONSUL_DC', required=True,
+              callback=checked(check_length, 'ConsulDC'),
               help='The datacenter in which the Consul agent is running.')
 @click.option('--consul-join', envvar='CONSUL_JOIN', required=True,
+              callback=checked(check_length, 'ConsulJoin'),
               help='Address of another Consul agent to join.')
-def cli(debug, port, username, password, **kwargs):
+@click.option('--worker-count', envvar='WORKER_COUNT', default=0,
+              type=click.IntRange(0, MAX_WORKERS),
+              help='Worker nodes of a cluster created without a worker_count; with none, pods '
+                   'run on the masters.')
+@click.option('--worker-instance-type', envvar='WORKER_INSTANCE_TYPE', default='m4.large',
+              type=click.Choice(INSTANCE_TYPES),
+              help='Instance type of worker nodes created without a worker_instance_type.')
+
+@click.option('--template-store', envvar='TEMPLATE_STORE',
+              callback=checked(check_location),
+              help='s3://bucket/prefix/ under which the CloudFormation template is uploaded once '
+                   'and referenced by URL, instead of being sent with every create.')
+@click.option('--registry', envvar='REGISTRY', default='demiurge.db',
+              help='SQLite database in which the clusters are recorded.')
+@click.option('--stack-cache-ttl', envvar='STACK_CACHE_TTL', default=30,
+              help='Seconds after which the in-memory stack index is refreshed.')
+@click.option('--stack-lookup-ttl', envvar='STACK_LOOKUP_TTL', default=5,
+              help='Seconds for which a single cluster lookup is answered from memory.')
+@click.option('--reconcile-interval', envvar='RECONCILE_INTERVAL', default=5,
+              help='Seconds between reads of the events of stacks being created or deleted.')
+@click.option('--job-workers', envvar='JOB_WORKERS', default=4,
+              help='Number of background workers creating clusters.')
+
+@click.option('--cloudformation-rate', envvar='CLOUDFORMATION_RATE', default=5.0,
+              help='CloudFormation API calls per second, 0 for no limit. Shared by the '
+                   'gunicorn worker processes.')
+@click.option('--cloudformation-burst', envvar='CLOUDFORMATION_BURST', default=10,
+              help='CloudFormation API calls allowed in a burst above the rate. Shared by the '
+                   'gunicorn worker processes.')
+@click.option('--cloudformation-max-attempts', envvar='CLOUDFORMATION_MAX_ATTEMPTS', default=5,
+              help='Attempts at a throttled or failed CloudFormation API call.')
+
+@click.option('--service-supernet', envvar='SERVICE_SUPERNET', default='10.3.0.0/16',
+              help='Address pool from which Kubernetes service networks are allocated.')
+@click.option('--service-prefix-len', envvar='SERVICE_PREFIX_LEN', default=24,
+              type=click.IntRange(1, 24),
+              help='Prefix length of a single Kubernetes service network, at most 24 since '
+                   'flannel gives each cluster a /24 of it.')
+@click.option('--network-state', envvar='NETWORK_STATE', default='demiurge-networks.json',
+              help='File in which service network reservations are persisted.')
+
+@click.option('--key-pool-size', envvar='KEY_POOL_SIZE', default=8,
+              help='Number of private keys generated ahead of cluster creation.')
+@click.option('--key-algorithm', envvar='KEY_ALGORITHM', default='rsa-2048',
+              type=click.Choice(KEY_ALGORITHMS),
+              help='Algorithm of the keys issued to cluster CAs and API servers.')
+def cli(debug, port, server, workers, threads, username, password, **kwargs):
     logging.basicConfig(level=logging.DEBUG if debug else logging.INFO)
 
     APP.debug = debug
@@ -71,7 +147,34 @@ def cli(debug, port, username, password, **kwargs):
     APPLICATION.config['KEY_NAME'] = kwargs['key_name']
     APPLICATION.config['CONSUL_DC'] = kwargs['consul_dc']
     APPLICATION.config['CONSUL_JOIN'] = kwargs['consul_join']
+    APPLICATION.config['WORKER_COUNT'] = kwargs['worker_count']
+    APPLICATION.config['WORKER_INSTANCE_TYPE'] = kwargs['worker_instance_type']
+
+    APPLICATION.config['FAST_JSON'] = kwargs['fast_json']
+    APPLICATION.config['GZIP_MIN_SIZE'] = kwargs['gzip_min_size']
+
+    APPLICATION.config['STATE_DIR'] = kwargs['state_dir']
+    APPLICATION.config['TEMPLATE_STORE'] = kwargs['template_store']
+    APPLICATION.config['REGISTRY'] = kwargs['registry']
+    APPLICATION.config['STACK_CACHE_TTL'] = kwargs['stack_cache_ttl']
+    APPLICATION.config['STACK_LOOKUP_TTL'] = kwargs['stack_lookup_ttl']
+    APPLICATION.config['RECONCILE_INTERVAL'] = kwargs['reconcile_interval']
+    APPLICATION.config['JOB_WORKERS'] = kwargs['job_workers']
+
+    # Each gunicorn worker process rate limits its own client, so they split the budget.
+    processes = workers if server == 'gunicorn' else 1
+    APPLICATION.config['CLOUDFORMATION_RATE'] = kwargs['cloudformation_rate'] / float(processes)
+    APPLICATION.config['CLOUDFORMATION_BURST'] = max(
+        1.0, kwargs['cloudformation_burst'] / float(processes))
+    APPLICATION.config['CLOUDFORMATION_MAX_ATTEMPTS'] = kwargs['cloudformation_max_attempts']
+
+    APPLICATION.config['SERVICE_SUPERNET'] = kwargs['service_supernet']
+    APPLICATION.config['SERVICE_PREFIX_LEN'] = kwargs['service_prefix_len']
+    APPLICATION.config['NETWORK_STATE'] = kwargs['network_state']
+
+    APPLICATION.config['KEY_POOL_SIZE'] = kwargs['key_pool_size']
+    APPLICATION.config['KEY_ALGORITHM'] = kwargs['key_algorithm']
 
-    main()
+    main(server, workers, threads)
 
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,168 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# CoreOS cloud-config as data, rendered to the Join of a template.
+#
+# Contents of units, drop-ins and files are lists of strings and CloudFormation functions, such as
+# Ref(), which are substituted on a single line. Rendering indents them into YAML literal blocks
+# and merges adjacent strings, so the Join has as few parts as possible.
+# SEE: https://coreos.com/os/docs/latest/cloud-config.html
+
+import functools
+import threading
+
+from troposphere import Join
+
+from .userdata import gzip_base64
+
+class DropIn(object):
+    def __init__(self, name, content):
+        self.name = name
+        self.content = content
+
+class Unit(object):
+    def __init__(self, name, command=None, content=None, drop_ins=()):
+        self.name = name
+        self.command = command
+        self.content = content
+        self.drop_ins = drop_ins
+
+# Without an encoding, content is written as it is. With one, it is a single value, already
+# encoded.
+class File(object):
+    def __init__(self, path, content, permissions=None, encoding=None):
+        self.path = path
+        self.content = content
+        self.permissions = permissions
+        self.encoding = encoding
+
+# A file with static content, gzipped when the template is built.
+def gzipped(path, content, permissions=None):
+    return File(path, gzip_base64(content), permissions, 'gzip+base64')
+
+class CloudConfig(object):
+    # coreos is a list of (section, [(key, value)]), such as ('etcd2', [('name', ...)]).
+    def __init__(self, coreos=(), units=(), write_files=()):
+        self.coreos = coreos
+        self.units = units
+        self.write_files = write_files
+
+        self._rendered = None
+        self._lock = threading.Lock()
+
+    def render(self):
+        with self._lock:
+            if self._rendered is None:
+                self._rendered = Join('', _merge(self.__render()))
+
+            return self._rendered
+
+    def __render(self):
+        parts = ['#cloud-config\n\n', 'coreos:\n']
+
+        for section, values in self.coreos:
+            parts.append('  {}:\n'.format(section))
+            parts.extend('    {}: {}\n'.format(key, value) for key, value in values)
+
+        parts.append('  units:\n')
+        for unit in self.units:
+            parts.append('    - name: {}\n'.format(unit.name))
+
+            if unit.command:
+                parts.append('      command: {}\n'.format(unit.command))
+
+            if unit.content is not None:
+                parts.append('      content: |\n')
+                parts.extend(_block(unit.content, 8))
+
+            if unit.drop_ins:
+                parts.append('      drop-ins:\n')
+
+            for drop_in in unit.drop_ins:
+                parts.append('        - name: {}\n'.format(drop_in.name))
+                parts.append('          content: |\n')
+                parts.extend(_block(drop_in.content, 12))
+
+        parts.append('write_files:\n')
+        for entry in self.write_files:
+            parts.append('  - path: {}\n'.format(entry.path))
+
+            if entry.permissions:
+                parts.append('    permissions: \'{}\'\n'.format(entry.permissions))
+
+            if entry.encoding:
+                parts.append('    encoding: {}\n'.format(entry.encoding))
+                parts.extend(['    content: ', entry.content, '\n'])
+            else:
+                parts.append('    content: |\n')
+                parts.extend(_block(entry.content, 6))
+
+        return parts
+
+# Indents every line of content that is not empty.
+def _block(content, indent):
+    if isinstance(content, basestring):
+        content = [content]
+
+    parts = []
+    line_start = True
+
+    for part in content:
+        if not isinstance(part, basestring):
+            if line_start:
+                parts.append(' ' * indent)
+            parts.append(part)
+            line_start = False
+            continue
+
+        for line in part.splitlines(True):
+            if line_start and line != '\n':
+                parts.append(' ' * indent)
+            parts.append(line)
+            line_start = line.endswith('\n')
+
+    return parts
+
+def _merge(parts):
+    merged = []
+
+    for part in parts:
+        if isinstance(part, basestring) and merged and isinstance(merged[-1], basestring):
+            merged[-1] += part
+        else:
+            merged.append(part)
+
+    return merged
+
+# Caches the cloud-config built for each distinct set of arguments, so that its rendering is only
+# paid for once however many launch configurations share it.
+def memoized(function):
+    cache = {}
+    lock = threading.Lock()
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+
+        with lock:
+            if key not in cache:
+                cache[key] = function(*args, **kwargs)
+
+            return cache[key]
+
+    return wrapper
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,156 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import logging
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+from .metrics import Counter, Histogram
+
+logger = logging.getLogger('cloudformation')
+
+# SEE: http://docs.aws.amazon.com/general/latest/gr/api-retries.html
+THROTTLING_CODES = frozenset(['Throttling', 'ThrottlingException', 'RequestLimitExceeded'])
+RETRYABLE_CODES = THROTTLING_CODES | frozenset(['InternalFailure', 'ServiceUnavailable'])
+
+CALL_SECONDS = Histogram('demiurge_cloudformation_call_seconds',
+                         'Latency of CloudFormation API calls.', ['operation'])
+CALL_ERRORS = Counter('demiurge_cloudformation_errors_total',
+                      'CloudFormation API calls that failed, by error code.',
+                      ['operation', 'code'])
+CALL_RETRIES = Counter('demiurge_cloudformation_retries_total',
+                       'CloudFormation API calls retried, by error code.', ['operation', 'code'])
+CALL_THROTTLED = Counter('demiurge_cloudformation_throttled_total',
+                         'CloudFormation API calls rejected by AWS for exceeding the rate limit.',
+                         ['operation'])
+RATE_LIMIT_SECONDS = Counter('demiurge_cloudformation_rate_limit_seconds_total',
+                             'Time spent waiting for the client-side rate limit.')
+
+# Exponential backoff with full jitter: a random delay between 0 and base * 2^attempt, capped.
+# SEE: https://www.awsarchitectureblog.com/2015/03/backoff.html
+def backoff(attempt, base=0.1, cap=5.0):
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+# Token bucket refilled at `rate` tokens per second and holding at most `burst` tokens. acquire()
+# blocks until a token is available and returns the time it waited.
+class TokenBucket(object):
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+
+        self._tokens = self.burst
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            # Take the token now, even if it is only available in the future, so that concurrent
+            # callers queue up behind each other instead of all waking at the same time.
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait:
+            time.sleep(wait)
+
+        return wait
+
+# Wraps a boto3 CloudFormation client so that every call, including the ones made while
+# paginating, goes through call(): calls are rate limited client-side to `rate` per second (no
+# limit if falsy), and throttled or failed calls are retried up to `max_attempts` times in total.
+class Client(object):
+    def __init__(self, client, rate=None, burst=None, max_attempts=5):
+        self.client = client
+        self.max_attempts = max_attempts
+
+        self._bucket = TokenBucket(rate, burst or rate) if rate else None
+
+        # botocore retries throttled calls on its own; leave that to call() so retries are
+        # jittered, counted, and go through the rate limit.
+        endpoint_prefix = client.meta.service_model.endpoint_prefix
+        client.meta.events.unregister('needs-retry.{}'.format(endpoint_prefix),
+                                      unique_id='retry-config-{}'.format(endpoint_prefix))
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+
+        if not callable(attribute):
+            return attribute
+
+        return lambda **kwargs: self.call(name, attribute, **kwargs)
+
+    def call(self, operation, method, **kwargs):
+        attempt = 0
+
+        while True:
+            if self._bucket:
+                RATE_LIMIT_SECONDS.inc(self._bucket.acquire())
+
+            started = time.time()
+
+            try:
+                result = method(**kwargs)
+            except ClientError as exception:
+                CALL_SECONDS.observe(time.time() - started, operation=operation)
+                code = exception.response['Error']['Code']
+                CALL_ERRORS.inc(operation=operation, code=code)
+
+                if code in THROTTLING_CODES:
+                    CALL_THROTTLED.inc(operation=operation)
+
+                attempt += 1
+                if code not in RETRYABLE_CODES or attempt >= self.max_attempts:
+                    raise
+
+                delay = backoff(attempt)
+                logger.debug('%s failed with %s, retrying in %.2fs', operation, code, delay)
+                CALL_RETRIES.inc(operation=operation, code=code)
+                time.sleep(delay)
+                continue
+
+            CALL_SECONDS.observe(time.time() - started, operation=operation)
+            return result
+
+    def get_paginator(self, operation):
+        return Paginator(self, operation)
+
+# Follows NextToken, which every CloudFormation list operation uses, instead of using a botocore
+# paginator: each page is fetched through call() and retried on its own, so a throttled page
+# resumes from the last token rather than restarting the listing.
+class Paginator(object):
+    def __init__(self, client, operation):
+        self.client = client
+        self.operation = operation
+
+    def paginate(self, **kwargs):
+        method = getattr(self.client.client, self.operation)
+
+        while True:
+            page = self.client.call(self.operation, method, **kwargs)
+            yield page
+
+            if not page.get('NextToken'):
+                return
+
+            kwargs['NextToken'] = page['NextToken']
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,230 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import errno
+import logging
+import os
+import threading
+import time
+import uuid
+from Queue import Queue
+
+from . import state
+
+logger = logging.getLogger('jobs')
+
+PENDING = 'PENDING'
+RUNNING = 'RUNNING'
+SUCCEEDED = 'SUCCEEDED'
+FAILED = 'FAILED'
+
+class OperationError(Exception):
+    pass
+
+class Operation(object):
+    def __init__(self, action, cluster_name, **data):
+        self.operation_id = uuid.uuid4().hex
+        self.action = action
+        self.cluster_name = cluster_name
+        self.data = data
+        self.status = PENDING
+        self.error = None
+        self.created = time.time()
+        self.updated = self.created
+        self.pid = os.getpid()
+
+    @property
+    def active(self):
+        return self.status in (PENDING, RUNNING)
+
+    def to_dict(self):
+        operation = {
+            'operation_id': self.operation_id,
+            'action': self.action,
+            'cluster_name': self.cluster_name,
+            'status': self.status,
+            }
+
+        if self.error:
+            operation['error'] = self.error
+
+        return operation
+
+    def to_state(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_state(cls, values):
+        operation = cls.__new__(cls)
+        operation.__dict__.update(values)
+
+        # The process running it exited before the operation finished.
+        if operation.active and not _alive(operation.pid):
+            operation.status = FAILED
+            operation.error = 'Interrupted'
+
+        return operation
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as exception:
+        return exception.errno != errno.ESRCH
+
+    return True
+
+# Runs operations on a fixed pool of daemon threads, started on first submit(). Finished operations
+# are kept for `retention` seconds so their status can still be fetched.
+#
+# With a path, every operation is also written to a file in that directory, so that processes
+# sharing it can see each other's operations. Each file is only written by the process running
+# the operation.
+#
+# Listeners are called with the operation after each change of its status.
+class JobQueue(object):
+    def __init__(self, workers, retention=3600, path=None):
+        self.workers = workers
+        self.retention = retention
+        self.path = path
+        self.listeners = []
+
+        if path and not os.path.isdir(path):
+            os.makedirs(path)
+
+        self._queue = Queue()
+        self._operations = {}
+        self._finished = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self.__work,
+                                          name='job-worker-{}'.format(len(self._threads)))
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def __work(self):
+        while True:
+            operation, target, args = self._queue.get()
+
+            self.__set_status(operation, RUNNING)
+
+            try:
+                target(operation, *args)
+            except OperationError as exception:
+                self.__set_status(operation, FAILED, str(exception))
+            except Exception as exception: # pylint: disable=broad-except
+                logger.exception('%s %s failed', operation.action, operation.cluster_name)
+                self.__set_status(operation, FAILED, str(exception))
+            else:
+                self.__set_status(operation, SUCCEEDED)
+            finally:
+                self._queue.task_done()
+
+    def __set_status(self, operation, status, error=None):
+        with self._lock:
+            operation.status = status
+            operation.error = error
+            operation.updated = time.time()
+
+            self.__store(operation)
+
+        for listener in self.listeners:
+            listener(operation)
+
+    def __store(self, operation):
+        if self.path:
+            state.write_json(os.path.join(self.path, operation.operation_id + '.json'),
+                             operation.to_state())
+
+    def __load(self, filename):
+        values = state.read_json(os.path.join(self.path, filename))
+        return Operation.from_state(values) if values else None
+
+    # Operations of the other processes sharing path. Finished operations do not change any more
+    # and are only read once.
+    def __shared(self):
+        if not self.path:
+            return []
+
+        operations = []
+        finished = {}
+
+        for filename in os.listdir(self.path):
+            operation_id = filename[:-len('.json')]
+
+            if not filename.endswith('.json') or operation_id in self._operations:
+                continue
+
+            operation = self._finished.get(operation_id) or self.__load(filename)
+
+            if operation is not None:
+                operations.append(operation)
+
+                if not operation.active:
+                    finished[operation_id] = operation
+
+        self._finished = finished
+        return operations
+
+    def __expire(self):
+        expired = time.time() - self.retention
+
+        for operation_id, operation in self._operations.items():
+            if not operation.active and operation.updated < expired:
+                del self._operations[operation_id]
+
+        for operation in self.__shared():
+            if not operation.active and operation.updated < expired:
+                try:
+                    os.remove(os.path.join(self.path, operation.operation_id + '.json'))
+                except OSError:
+                    pass
+
+    def submit(self, operation, target, *args):
+        self.start()
+
+        with self._lock:
+            self.__expire()
+            self._operations[operation.operation_id] = operation
+            self.__store(operation)
+
+        self._queue.put((operation, target, args))
+
+        return operation
+
+    def join(self):
+        self._queue.join()
+
+    def get(self, operation_id):
+        with self._lock:
+            if operation_id in self._operations:
+                return self._operations[operation_id]
+
+            if self.path and operation_id.isalnum():
+                return self.__load(operation_id + '.json')
+
+        return None
+
+    def active(self, action=None):
+        with self._lock:
+            return [operation for operation in self._operations.values() + self.__shared()
+                    if operation.active and (action is None or operation.action == action)]
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,205 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from collections import deque
+from contextlib import contextmanager
+import logging
+import socket
+import struct
+import threading
+
+from . import state
+
+logger = logging.getLogger('network')
+
+def _parse_address(address):
+    return struct.unpack('!I', socket.inet_aton(address))[0]
+
+def _format_address(address):
+    return socket.inet_ntoa(struct.pack('!I', address))
+
+def network_address(network, offset=0):
+    return _format_address(_parse_address(network.split('/')[0]) + offset)
+
+# Hands out the /prefix_len subnets of supernet, e.g. 10.3.1.0/24, 10.3.2.0/24, ... for
+# 10.3.0.0/16. The first and the last subnet are never handed out. A bitmap records which
+# subnets are taken and a free-list of candidates makes allocate() and release() O(1);
+# reserve() only sets the bit, so allocate() skips free-list entries that are already taken.
+#
+# With a path, reservations are persisted there and shared by every process using the same file:
+# each change is made under a file lock, after reloading the file if another process wrote it.
+class NetworkAllocator(object):
+    def __init__(self, supernet, prefix_len, path=None):
+        address, supernet_len = supernet.split('/')
+        supernet_len = int(supernet_len)
+
+        if not supernet_len <= prefix_len <= 32:
+            raise ValueError('Prefix length {} does not fit in {}'.format(prefix_len, supernet))
+
+        self.prefix_len = prefix_len
+        self.path = path
+        self.size = 1 << (prefix_len - supernet_len)
+
+        self._base = _parse_address(address) & ~((1 << (32 - supernet_len)) - 1) & 0xffffffff
+        self._lock = threading.Lock()
+        self._version = None
+
+        self.__reset()
+
+        if self.path:
+            with state.locked(self.path):
+                self.__load()
+
+    def __reset(self):
+        self._bitmap = bytearray((self.size + 7) // 8)
+        self._free = deque(xrange(1, self.size - 1))
+        self._owners = {}
+        self._indexes = {}
+        self._networks = {}
+
+    def network(self, index):
+        address = self._base + (index << (32 - self.prefix_len))
+        return '{}/{}'.format(_format_address(address), self.prefix_len)
+
+    def __index(self, network):
+        address, prefix_len = network.split('/')
+        index = (_parse_address(address) - self._base) >> (32 - self.prefix_len)
+
+        if int(prefix_len) != self.prefix_len or not 0 <= index < self.size:
+            return None
+
+        return index
+
+    def __taken(self, index):
+        return self._bitmap[index >> 3] & (1 << (index & 7))
+
+    def __take(self, owner, index):
+        self._bitmap[index >> 3] |= 1 << (index & 7)
+        self._owners[owner] = index
+        self._indexes[index] = owner
+        self._networks[owner] = self.network(index)
+
+    def __free(self, owner):
+        index = self._owners.pop(owner)
+        del self._indexes[index]
+        del self._networks[owner]
+
+        self._bitmap[index >> 3] &= ~(1 << (index & 7)) & 0xff
+        if 0 < index < self.size - 1:
+            self._free.append(index)
+
+    def __allocate(self, owner):
+        if owner in self._owners:
+            return self.network(self._owners[owner])
+
+        while self._free:
+            index = self._free.popleft()
+
+            if not self.__taken(index):
+                self.__take(owner, index)
+                return self.network(index)
+
+        return None
+
+    def allocate(self, owner):
+        with self.__shared():
+            network = self.__allocate(owner)
+            if network is not None:
+                self.__save()
+
+        return network
+
+    # Allocates a network to each of owners under one lock and with one write of the state,
+    # returning them by owner. Owners that did not get one map to None.
+    def allocate_all(self, owners):
+        with self.__shared():
+            networks = dict((owner, self.__allocate(owner)) for owner in owners)
+            self.__save()
+
+        return networks
+
+    def reserve(self, owner, network):
+        index = self.__index(network)
+
+        if index is None:
+            logger.warning('%s: %s is outside of the service network pool', owner, network)
+            return
+
+        with self.__shared():
+            if self._owners.get(owner) == index:
+                return
+
+            if index in self._indexes:
+                logger.warning('%s: %s is already reserved by %s', owner, network,
+                               self._indexes[index])
+                return
+
+            if owner in self._owners:
+                self.__free(owner)
+
+            self.__take(owner, index)
+            self.__save()
+
+    def release(self, owner):
+        with self.__shared():
+            if owner not in self._owners:
+                return
+
+            self.__free(owner)
+            self.__save()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size - 2,
+                'reserved': len(self._owners),
+                }
+
+    @contextmanager
+    def __shared(self):
+        with self._lock:
+            if not self.path:
+                yield
+                return
+
+            with state.locked(self.path):
+                if state.version(self.path) != self._version:
+                    self.__load()
+
+                yield
+
+    def __load(self):
+        self.__reset()
+
+        for owner, network in (state.read_json(self.path) or {}).items():
+            index = self.__index(network)
+
+            if index is None or index in self._indexes:
+                logger.warning('%s: ignoring persisted reservation of %s', owner, network)
+                continue
+
+            self.__take(owner, index)
+
+        self._version = state.version(self.path)
+
+    def __save(self):
+        if not self.path:
+            return
+
+        state.write_json(self.path, self._networks)
+        self._version = state.version(self.path)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,71 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Lets request threads wait for a change of a key, e.g. a stack name, that another thread
+# announces with notify(). Waiters remember the version of the key they saw and wake up when it
+# moves on, so a change between reading the state and starting to wait is not missed.
+
+import threading
+import time
+
+class Notifier(object):
+    def __init__(self):
+        self.notifications = 0
+
+        self._versions = {}
+        self._waiters = {}
+        self._condition = threading.Condition()
+
+    def version(self, key):
+        with self._condition:
+            return self._versions.get(key, 0)
+
+    def notify(self, key):
+        with self._condition:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self.notifications += 1
+
+            if key in self._waiters:
+                self._condition.notify_all()
+
+    # Returns the version of key once it differs from `version`, or after `timeout` seconds.
+    def wait(self, key, version, timeout):
+        deadline = time.time() + timeout
+
+        with self._condition:
+            self._waiters[key] = self._waiters.get(key, 0) + 1
+
+            try:
+                while self._versions.get(key, 0) == version:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            finally:
+                self._waiters[key] -= 1
+                if not self._waiters[key]:
+                    del self._waiters[key]
+
+            return self._versions.get(key, 0)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'waiters': sum(self._waiters.values()),
+                'notifications': self.notifications,
+                }
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
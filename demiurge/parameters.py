@@ -0,0 +1,55 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Limits of the template parameters that demiurge passes values to. They are kept apart from
+# demiurge.aws, which builds the template when it is imported, so that configured values can be
+# checked against them when the server starts.
+
+MAX_LENGTHS = {
+    'KubernetesServiceNetwork': 18,
+    'KubernetesServiceNetworkMin': 15,
+    'KubernetesServiceNetworkMax': 15,
+    'FlannelNetwork': 18,
+    'FlannelSubnetMin': 15,
+    'FlannelSubnetMax': 15,
+    'Username': 32,
+    'Password': 32,
+    'ConsulDC': 32,
+    'ConsulJoin': 128,
+    # The lengths allow for rsa-2048 keys; rsa-4096 ones do not fit in the UserData. Apart from
+    # CAKey, the values are gzipped and base64 encoded PEM, which take up to 1784 characters for a
+    # key, 1004 for the CA certificate and 1228 for the API server certificate.
+    'CAKey': 1712,
+    'CACert': 1024,
+    'APIServerKey': 1824,
+    'APIServerCert': 1280,
+    }
+
+INSTANCE_TYPES = ['m4.large', 'm4.xlarge', 'm4.2xlarge', 'm4.4xlarge', 'm4.10xlarge']
+
+MAX_WORKERS = 100
+
+# Fails on a configured value that CloudFormation would only refuse when a stack is created.
+def check_length(parameter, value):
+    limit = MAX_LENGTHS[parameter]
+
+    if len(value) > limit:
+        raise ValueError('{} may be up to {} characters, not {}'.format(
+            parameter, limit, len(value)))
+
+    return value
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
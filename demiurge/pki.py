@@ -0,0 +1,115 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import logging
+import multiprocessing
+import threading
+import time
+from Queue import Empty, Queue
+
+from OpenSSL import crypto
+
+from .cert import create_cert, generate_key
+
+logger = logging.getLogger('pki')
+
+API_SERVER_SAN_LIST = [
+    'DNS:kubernetes',
+    'DNS:kubernetes.default',
+    'DNS:kubernetes.default.svc',
+    'DNS:kubernetes.default.svc.cluster.local',
+    'DNS:*.*.elb.amazonaws.com',
+    'DNS:*.*.compute.internal',
+    'DNS:*.ec2.internal',
+    ]
+
+def _generate_key_pem(algorithm):
+    return crypto.dump_privatekey(crypto.FILETYPE_PEM, generate_key(algorithm))
+
+# Bounded pool of pre-generated private keys. A process pool generates keys in the background so
+# that taking a key costs nothing as long as the pool keeps up; take() falls back to generating
+# the key inline when the pool is empty.
+class KeyPool(object):
+    def __init__(self, size, algorithm='rsa-2048', processes=None):
+        self.size = size
+        self.algorithm = algorithm
+        self.processes = processes
+
+        self.generated = 0
+        self.misses = 0
+        self.started = None
+
+        self._keys = Queue()
+        self._slots = threading.Semaphore(size)
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def start(self):
+        with self._lock:
+            if self._pool is not None or not self.size:
+                return
+
+            self._pool = multiprocessing.Pool(self.processes)
+            self.started = time.time()
+
+        thread = threading.Thread(target=self.__refill, name='key-pool')
+        thread.daemon = True
+        thread.start()
+
+    def __refill(self):
+        while True:
+            self._slots.acquire()
+            self._pool.apply_async(_generate_key_pem, (self.algorithm,), callback=self.__add)
+
+    def __add(self, pem):
+        self._keys.put(crypto.load_privatekey(crypto.FILETYPE_PEM, pem))
+
+        with self._lock:
+            self.generated += 1
+
+    def take(self):
+        try:
+            key = self._keys.get_nowait()
+        except Empty:
+            with self._lock:
+                self.misses += 1
+            return generate_key(self.algorithm)
+
+        self._slots.release()
+        return key
+
+    def stats(self):
+        with self._lock:
+            elapsed = time.time() - self.started if self.started else None
+
+            return {
+                'algorithm': self.algorithm,
+                'size': self.size,
+                'depth': self._keys.qsize(),
+                'generated': self.generated,
+                'misses': self.misses,
+                'refill_rate': self.generated / elapsed if elapsed else 0.0,
+                }
+
+def create_pki(keys, service_ip):
+    (ca_key_pem, ca_cert_pem, ca_key, ca_cert) = create_cert('kube-ca', key=keys.take())
+    (api_key_pem, api_cert_pem, _, _) = create_cert(
+        'kube-apiserver', san_list=API_SERVER_SAN_LIST + ['IP:' + service_ip],
+        sign_key=ca_key, sign_cert=ca_cert, key=keys.take())
+
+    return (ca_key_pem, ca_cert_pem, api_key_pem, api_cert_pem)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
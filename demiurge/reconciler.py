@@ -0,0 +1,305 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Follows stacks that are being created, updated or deleted through their events instead of
+# describing them. Each in-flight stack costs one describe_stack_events call per interval, which
+# only returns the events since the cursor, the newest event seen before. Status changes are
+# written to the stack index and passed to the listeners; a stack is dropped once its status is
+# final. Stacks that are only listed as in flight are confirmed in the index every interval, so
+# lookups of them are answered from memory.
+#
+# With a path, only one of the processes sharing it reads events: the leader, which holds a lock
+# on path.leader for as long as it lives. Every interval the leader publishes the stacks it follows
+# to path, and the stacks it finished with in the last few intervals. The other processes hand it
+# the stacks they were asked to watch through path, and pass the changes it published on to their
+# own index and listeners.
+
+import errno
+import fcntl
+import logging
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+from . import state
+from .stacks import describe_stack
+
+# Intervals for which a finished stack stays published, so that every follower sees it.
+FINISHED_INTERVALS = 3
+
+logger = logging.getLogger('reconciler')
+
+def in_progress(status):
+    return status.endswith('_IN_PROGRESS')
+
+def same_stack(stack, other):
+    return stack is not None and other is not None and \
+        stack.get('StackId') == other.get('StackId')
+
+class Reconciler(object):
+    def __init__(self, client, index, interval, path=None):
+        self.client = client
+        self.index = index
+        self.interval = interval
+        self.path = path
+
+        self.events = 0
+        self.transitions = 0
+        self.listeners = []
+
+        self._stacks = {}
+        self._cursors = {}
+        self._finished = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._leader = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            self._thread = threading.Thread(target=self.__run, name='reconciler')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def watch(self, stack):
+        if not in_progress(stack['StackStatus']):
+            return
+
+        with self._lock:
+            if stack['StackName'] not in self._stacks:
+                self._stacks[stack['StackName']] = stack
+                self._cursors.setdefault(stack['StackName'], None)
+
+        self.start()
+
+    def watching(self):
+        with self._lock:
+            return list(self._stacks)
+
+    def __run(self):
+        while True:
+            started = time.time()
+
+            try:
+                self.step()
+            except Exception: # pylint: disable=broad-except
+                logger.exception('Unable to share reconciled stacks')
+
+            time.sleep(max(0, self.interval - (time.time() - started)))
+
+    # One interval of the reconciler thread: reconciles every stack, as the leader if path is set,
+    # or passes on the changes the leader published.
+    def step(self):
+        if self.path is None or self.__lead():
+            self.__reconcile_all()
+            if self.path:
+                self.__publish()
+        else:
+            self.__follow()
+
+    def __reconcile_all(self):
+        for name in self.watching():
+            try:
+                self.reconcile(name)
+            except Exception: # pylint: disable=broad-except
+                logger.exception('Unable to reconcile %s', name)
+
+    # Whether this process is the leader. The lock is released when the process exits, so another
+    # one takes over within an interval.
+    def __lead(self):
+        if self._leader is None:
+            leader = open(self.path + '.leader', 'a')
+
+            try:
+                fcntl.flock(leader, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except IOError as exception:
+                leader.close()
+                if exception.errno in (errno.EAGAIN, errno.EACCES):
+                    return False
+                raise
+
+            logger.info('Reconciling stacks for every process sharing %s', self.path)
+            self._leader = leader
+
+        return True
+
+    def __publish(self):
+        now = time.time()
+
+        with state.locked(self.path):
+            shared = state.read_json(self.path) or {}
+
+            with self._lock:
+                for name, stack in shared.get('watch', {}).items():
+                    if name not in self._stacks and not same_stack(
+                            self._finished.get(name, (None, None))[0], stack):
+                        self._finished.pop(name, None)
+                        self._stacks[name] = stack
+                        self._cursors.setdefault(name, None)
+
+                for name, (stack, finished) in self._finished.items():
+                    if now - finished > FINISHED_INTERVALS * self.interval:
+                        del self._finished[name]
+
+                stacks = dict(self._stacks)
+                stacks.update((name, stack) for name, (stack, _) in self._finished.items())
+
+            state.write_json(self.path, {'watch': {}, 'stacks': stacks})
+
+    def __follow(self):
+        with self._lock:
+            watching = dict(self._stacks)
+
+        if not watching:
+            return
+
+        with state.locked(self.path):
+            shared = state.read_json(self.path) or {}
+            # A stack of the same name that was deleted before this one was created is not it.
+            published = dict((name, stack) for name, stack in shared.get('stacks', {}).items()
+                             if same_stack(stack, watching.get(name)))
+            watch = shared.setdefault('watch', {})
+            handed = [name for name in watching if name not in published and name not in watch]
+
+            if handed:
+                watch.update((name, watching[name]) for name in handed)
+                state.write_json(self.path, shared)
+
+        for name, stack in watching.items():
+            if name not in published:
+                continue
+
+            if published[name]['StackStatus'] != stack['StackStatus']:
+                stack = published[name]
+                self.transitions += 1
+                self.index.update(stack)
+
+                for listener in self.listeners:
+                    listener(stack)
+
+            if in_progress(stack['StackStatus']):
+                with self._lock:
+                    if name in self._stacks:
+                        self._stacks[name] = stack
+                self.index.confirm(name)
+            else:
+                self.__forget(name)
+
+    # Statuses the stack went through since the cursor, oldest first.
+    def __statuses(self, stack):
+        name = stack['StackName']
+        cursor = self._cursors.get(name)
+        events = []
+
+        # Stack IDs keep working after the stack is deleted, names do not.
+        kwargs = {'StackName': stack.get('StackId', name)}
+
+        while True:
+            response = self.client.describe_stack_events(**kwargs)
+            page = response['StackEvents']
+
+            for event in page:
+                if event['EventId'] == cursor:
+                    break
+                events.append(event)
+            else:
+                # Without a cursor, the first page is enough to tell the current status.
+                if cursor is not None and 'NextToken' in response:
+                    kwargs['NextToken'] = response['NextToken']
+                    continue
+
+            break
+
+        if events:
+            self._cursors[name] = events[0]['EventId']
+
+        self.events += len(events)
+
+        statuses = [(event['ResourceStatus'], event.get('ResourceStatusReason'))
+                    for event in reversed(events)
+                    if event['LogicalResourceId'] == name and
+                    event.get('ResourceType') == 'AWS::CloudFormation::Stack']
+
+        # Older events on the first read are history from before the stack was watched.
+        return statuses if cursor is not None else statuses[-1:]
+
+    def reconcile(self, name):
+        with self._lock:
+            stack = self._stacks.get(name)
+
+        if stack is None:
+            return
+
+        try:
+            statuses = self.__statuses(stack)
+        except ClientError as exception:
+            error = exception.response['Error']
+            if error['Code'] == 'ValidationError' and 'does not exist' in error['Message']:
+                self.__forget(name, dict(stack, StackStatus='DELETE_COMPLETE'))
+                return
+            raise
+
+        for status, reason in statuses:
+            if status == stack['StackStatus']:
+                continue
+
+            if in_progress(status):
+                stack = dict(stack, StackStatus=status)
+                if reason:
+                    stack['StackStatusReason'] = reason
+            else:
+                # The outputs of the final stack are needed, and a deleted stack can still be
+                # described by its ID.
+                stack = describe_stack(self.client, stack.get('StackId', name)) or dict(
+                    stack, StackStatus=status)
+
+            logger.info('%s: %s', name, stack['StackStatus'])
+            self.transitions += 1
+            self.index.update(stack)
+
+            for listener in self.listeners:
+                listener(stack)
+
+            if not in_progress(stack['StackStatus']):
+                self.__forget(name, stack)
+                return
+
+        with self._lock:
+            self._stacks[name] = stack
+
+        self.index.confirm(name)
+
+    # The final stack is published by a leader.
+    def __forget(self, name, stack=None):
+        with self._lock:
+            self._stacks.pop(name, None)
+            self._cursors.pop(name, None)
+
+            if self._leader is not None and stack is not None:
+                self._finished[name] = (stack, time.time())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'stacks': len(self._stacks),
+                'events': self.events,
+                'transitions': self.transitions,
+                }
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,166 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Local record of the clusters, kept in SQLite and reconciled with CloudFormation by sync(). The
+# clusters API reads it instead of deriving every cluster from its stack parameters, and it
+# survives restarts, so clusters can be listed before CloudFormation has been.
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger('registry')
+
+COLUMNS = ['cluster_name', 'stack_name', 'stack_id', 'status', 'last_updated', 'username',
+           'password', 'kubernetes_service_network', 'api_server', 'consul_http_api']
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS clusters (
+    cluster_name TEXT PRIMARY KEY,
+    stack_name TEXT NOT NULL,
+    stack_id TEXT,
+    status TEXT NOT NULL,
+    last_updated TEXT,
+    username TEXT,
+    password TEXT,
+    kubernetes_service_network TEXT,
+    api_server TEXT,
+    consul_http_api TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS clusters_status ON clusters (status);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+'''
+
+class Registry(object):
+    def __init__(self, path=':memory:'):
+        self.path = path
+
+        if path != ':memory:' and os.path.exists(path):
+            logger.info('Using the cluster registry in %s', path)
+        else:
+            logger.info('Creating the cluster registry in %s', path)
+
+        # It holds cluster passwords, so like the files of demiurge.state it is only readable by
+        # the owner. SQLite gives its journal files the mode of the database.
+        if path != ':memory:':
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT, 0o600))
+            os.chmod(path, 0o600)
+
+        # One connection shared by all threads; sqlite3 serializes its use, _lock keeps each
+        # method's statements together.
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+
+        with self._lock, self._connection:
+            if path != ':memory:':
+                # Lets worker processes sharing the file read while another one writes.
+                self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.executescript(SCHEMA)
+
+            # Registries created before clusters recorded the time their stack last changed.
+            if 'last_updated' not in [row[1] for row in
+                                      self._connection.execute('PRAGMA table_info(clusters)')]:
+                self._connection.execute('ALTER TABLE clusters ADD COLUMN last_updated TEXT')
+
+    # Time of the last complete sync() in any process using the registry, None before the first.
+    @property
+    def synced(self):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM meta WHERE key = 'synced'").fetchone()
+
+        return row[0] if row else None
+
+    # Records `clusters`, dicts with some or all of COLUMNS. With `started`, they are all of the
+    # clusters as listed at that time, and clusters not written since then are removed.
+    def sync(self, clusters, started=None):
+        now = time.time()
+        rows = [[cluster.get(column) for column in COLUMNS] + [now] for cluster in clusters]
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO clusters ({}, updated) VALUES ({})'.format(
+                    ', '.join(COLUMNS), ', '.join('?' * (len(COLUMNS) + 1))),
+                rows)
+
+            if started is not None:
+                self._connection.execute('DELETE FROM clusters WHERE updated < ?', (started,))
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('synced', ?)", (started,))
+
+    def mark(self, cluster_name, status):
+        with self._lock, self._connection:
+            self._connection.execute(
+                'UPDATE clusters SET status = ?, updated = ? WHERE cluster_name = ?',
+                (status, time.time(), cluster_name))
+
+    def remove(self, cluster_name):
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM clusters WHERE cluster_name = ?',
+                                     (cluster_name,))
+
+    def get(self, cluster_name):
+        with self._lock:
+            row = self._connection.execute('SELECT * FROM clusters WHERE cluster_name = ?',
+                                           (cluster_name,)).fetchone()
+
+        return dict(row) if row else None
+
+    # Clusters ordered by name, optionally only those in `statuses`, only the `limit` first after
+    # the name `after`, and only the `columns` asked for.
+    def clusters(self, statuses=None, after=None, limit=None, columns=None):
+        conditions = []
+        parameters = []
+
+        if statuses is not None:
+            conditions.append('status IN ({})'.format(', '.join('?' * len(statuses))))
+            parameters.extend(statuses)
+
+        if after is not None:
+            conditions.append('cluster_name > ?')
+            parameters.append(after)
+
+        query = 'SELECT {} FROM clusters'.format(
+            ', '.join(column for column in COLUMNS if column in columns) if columns else '*')
+
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+
+        query += ' ORDER BY cluster_name'
+
+        if limit is not None:
+            query += ' LIMIT ?'
+            parameters.append(limit)
+
+        with self._lock:
+            rows = self._connection.execute(query, parameters).fetchall()
+
+        return [dict(row) for row in rows]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'clusters': self._connection.execute('SELECT COUNT(*) FROM clusters').fetchone()[0],
+                }
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,72 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Serialization and compression of API responses.
+#
+# connexion serializes whatever a handler returns with json.dumps(data, indent=2), which the
+# standard library can only do with its pure-Python encoder. Handlers returning large bodies build
+# their response with json_response() instead, whose compact json.dumps uses the C encoder; it is
+# also faster than ujson 1.35 on cluster listings (see benchmarks/serialization.py).
+
+from cStringIO import StringIO
+import gzip
+import json
+
+from flask import Response
+
+from .metrics import Counter
+
+COMPRESSED_BYTES = Counter('demiurge_response_compressed_bytes_total',
+                           'Bytes of responses gzipped, before and after compression.',
+                           ['stage'])
+
+def dumps(data):
+    return json.dumps(data, separators=(',', ':'))
+
+def json_response(body, status=200, headers=None):
+    return Response(dumps(body) + '\n', status=status, headers=headers,
+                    mimetype='application/json')
+
+# Gzips a successful response of at least min_size bytes if the request accepts it. 0 turns
+# compression off.
+def compress(response, accept_encodings, min_size, level=6):
+    if (not min_size or response.status_code != 200 or response.direct_passthrough or
+            response.is_streamed or 'Content-Encoding' in response.headers):
+        return response
+
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    # Caches must not hand the gzipped body to a client that does not accept it, or vice versa.
+    response.vary.add('Accept-Encoding')
+
+    if not accept_encodings['gzip']:
+        return response
+
+    output = StringIO()
+    with gzip.GzipFile(mode='wb', compresslevel=level, fileobj=output) as compressed:
+        compressed.write(data)
+
+    response.set_data(output.getvalue())
+    response.headers['Content-Encoding'] = 'gzip'
+
+    COMPRESSED_BYTES.inc(len(data), stage='before')
+    COMPRESSED_BYTES.inc(response.content_length, stage='after')
+
+    return response
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,46 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Serves the application with gunicorn. Every worker process loads the application itself after
+# the fork, so the threads and process pools it starts belong to that worker.
+# SEE: http://docs.gunicorn.org/en/stable/custom.html
+
+from gunicorn.app.base import BaseApplication
+
+class Server(BaseApplication):
+    def __init__(self, load, options):
+        self.load_application = load
+        self.options = options
+        super(Server, self).__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.load_application()
+
+def run(load, port, workers, threads):
+    Server(load, {
+        'bind': '0.0.0.0:{}'.format(port),
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread' if threads > 1 else 'sync',
+        # Creating a cluster waits for CloudFormation, well past gunicorn's 30s default.
+        'timeout': 300,
+        }).run()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,67 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Request coalescing: while a call for an operation and key is in flight, identical calls wait
+# for it and share its result, or its exception, instead of making their own.
+# SEE: https://godoc.org/golang.org/x/sync/singleflight
+
+import threading
+
+from .metrics import Counter
+
+COALESCED = Counter('demiurge_coalesced_requests_total',
+                    'Calls that shared the result of an identical call in flight.', ['operation'])
+
+class _Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class Group(object):
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, operation, key, function, *args):
+        with self._lock:
+            call = self._calls.get((operation, key))
+            leader = call is None
+
+            if leader:
+                call = self._calls[(operation, key)] = _Call()
+
+        if not leader:
+            COALESCED.inc(operation=operation)
+            call.done.wait()
+
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args)
+        except Exception as exception:
+            call.error = exception
+            raise
+        finally:
+            with self._lock:
+                del self._calls[(operation, key)]
+            call.done.set()
+
+        return call.result
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,235 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import logging
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+from . import state
+from .singleflight import Group
+
+logger = logging.getLogger('stacks')
+
+def iter_stacks(client, **kwargs):
+    paginator = client.get_paginator('describe_stacks')
+
+    for page in paginator.paginate(**kwargs):
+        for stack in page['Stacks']:
+            yield stack
+
+# Fields of a stack kept by the index. Parameters and outputs can be cut down further to the ones
+# that are read: the keys and certificates passed to every stack make up most of its size.
+STACK_FIELDS = ('StackId', 'StackName', 'StackStatus', 'StackStatusReason', 'CreationTime',
+                'LastUpdatedTime', 'Parameters', 'Outputs')
+
+def summarize(stack, parameters=None, outputs=None):
+    summary = dict((field, stack[field]) for field in STACK_FIELDS if field in stack)
+
+    if parameters is not None and 'Parameters' in summary:
+        summary['Parameters'] = [parameter for parameter in summary['Parameters']
+                                 if parameter['ParameterKey'] in parameters]
+    if outputs is not None and 'Outputs' in summary:
+        summary['Outputs'] = [output for output in summary['Outputs']
+                              if output['OutputKey'] in outputs]
+
+    return summary
+
+def describe_stack(client, name):
+    try:
+        response = client.describe_stacks(StackName=name)
+    except ClientError as exception:
+        error = exception.response['Error']
+        if error['Code'] == 'ValidationError' and 'does not exist' in error['Message']:
+            return None
+        raise
+
+    for stack in response['Stacks']:
+        return stack
+
+# In-process view of the account's stacks keyed by stack name. A daemon thread refreshes it every
+# ttl/2 seconds, reads refresh synchronously once it is older than ttl, and update()/mark() write
+# through so creates and deletes are visible before the next refresh. lookup() answers for a single
+# name and goes to CloudFormation only when that name was last confirmed more than lookup_ttl ago.
+# Listeners are called with every stack and the time the listing started after each refresh.
+#
+# Stacks are indexed as summaries with only the given parameters and outputs, all of them if None.
+# A refresh summarizes each page of the listing as it arrives, so the full descriptions of at most
+# one page are held at a time.
+#
+# With a path, processes sharing it take turns to refresh: the listing is saved there, and a
+# process due for a refresh uses the saved one if it is less than ttl/2 old.
+class StackIndex(object):
+    def __init__(self, client, ttl, lookup_ttl, path=None, parameters=None, outputs=None):
+        self.client = client
+        self.ttl = ttl
+        self.lookup_ttl = lookup_ttl
+        self.path = path
+        self.parameters = parameters
+        self.outputs = outputs
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.refreshed = None
+        self.listeners = []
+
+        self._stacks = {}
+        self._seen = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._flights = Group()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            self._thread = threading.Thread(target=self.__run, name='stack-index')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def __run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception: # pylint: disable=broad-except
+                logger.exception('Unable to refresh the stack index')
+
+            time.sleep(self.ttl / 2.0)
+
+    # Concurrent refreshes share one listing.
+    def refresh(self):
+        self._flights.do('list_stacks', None, self.__refresh)
+
+    def __refresh(self):
+        if not self.path:
+            self.__apply(*self.__list())
+            return
+
+        with state.locked(self.path):
+            snapshot = state.read_json(self.path)
+
+            if (snapshot and snapshot['refreshed'] > (self.refreshed or 0) and
+                    time.time() - snapshot['refreshed'] < self.ttl / 2.0):
+                started, stacks = snapshot['refreshed'], snapshot['stacks']
+            else:
+                started, stacks = self.__list()
+                state.write_json(self.path, {'refreshed': started, 'stacks': stacks})
+
+        self.__apply(started, stacks)
+
+    def __list(self):
+        started = time.time()
+        return started, dict((stack['StackName'], self.__summarize(stack))
+                             for stack in iter_stacks(self.client))
+
+    def __summarize(self, stack):
+        return summarize(stack, self.parameters, self.outputs)
+
+    def __apply(self, started, stacks):
+        with self._lock:
+            # Keep whatever was written or looked up while describe_stacks was in flight.
+            for name, seen in self._seen.items():
+                if seen >= started:
+                    if name in self._stacks:
+                        stacks[name] = self._stacks[name]
+                    else:
+                        stacks.pop(name, None)
+                else:
+                    del self._seen[name]
+
+            self._stacks = stacks
+            self.refreshed = started
+
+        logger.debug('Stack index refreshed with %d stacks', len(stacks))
+
+        for listener in self.listeners:
+            listener(stacks.values(), started)
+
+    def ensure_fresh(self):
+        self.start()
+
+        if self.refreshed is None:
+            self.refresh()
+        elif time.time() - self.refreshed > self.ttl:
+            with self._lock:
+                self.stale += 1
+
+            try:
+                self.refresh()
+            except Exception: # pylint: disable=broad-except
+                logger.exception('Serving stale stack index')
+
+    def lookup(self, name):
+        self.start()
+        now = time.time()
+
+        with self._lock:
+            seen = max(self._seen.get(name, 0), self.refreshed or 0)
+
+            if now - seen <= self.lookup_ttl:
+                self.hits += 1
+                return self._stacks.get(name)
+
+            self.misses += 1
+
+        stack = self._flights.do('describe_stack', name, describe_stack, self.client, name)
+        if stack is not None:
+            stack = self.__summarize(stack)
+
+        with self._lock:
+            if stack is None:
+                self._stacks.pop(name, None)
+            else:
+                self._stacks[name] = stack
+            self._seen[name] = now
+
+        return stack
+
+    def update(self, stack):
+        stack = self.__summarize(stack)
+
+        with self._lock:
+            self._stacks[stack['StackName']] = stack
+            self._seen[stack['StackName']] = time.time()
+
+    # Records that the indexed stack is known to be current, e.g. because it has no new events.
+    def confirm(self, name):
+        with self._lock:
+            if name in self._stacks:
+                self._seen[name] = time.time()
+
+    def mark(self, name, status):
+        with self._lock:
+            stack = self._stacks.get(name)
+
+            if stack is not None:
+                self._stacks[name] = dict(stack, StackStatus=status)
+                self._seen[name] = time.time()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'stacks': len(self._stacks),
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'age': time.time() - self.refreshed if self.refreshed else None,
+                }
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
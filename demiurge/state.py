@@ -0,0 +1,65 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Helpers for state shared between the worker processes of one host through local files. Writers
+# take an exclusive flock() on a companion .lock file and replace the data file atomically, so
+# readers never see a partial write.
+
+from contextlib import contextmanager
+import errno
+import fcntl
+import json
+import os
+
+@contextmanager
+def locked(path):
+    with open(path + '.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+# Identifies the current contents of path, so that a process can tell whether another one has
+# written it since it last looked. None if path does not exist.
+def version(path):
+    try:
+        stat = os.stat(path)
+    except OSError as exception:
+        if exception.errno == errno.ENOENT:
+            return None
+        raise
+
+    return (stat.st_ino, stat.st_mtime, stat.st_size)
+
+def read_json(path):
+    try:
+        with open(path) as state:
+            return json.load(state)
+    except IOError as exception:
+        if exception.errno == errno.ENOENT:
+            return None
+        raise
+
+# State may hold cluster credentials, so it is only readable by the owner.
+def write_json(path, data):
+    descriptor = os.open(path + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(descriptor, 'w') as state:
+        # Only json.dumps() without indent and sort_keys uses the C encoder.
+        state.write(json.dumps(data, separators=(',', ':'), default=str))
+    os.rename(path + '.tmp', path)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
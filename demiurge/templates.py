@@ -0,0 +1,134 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Content-addressed storage of CloudFormation templates. A template is uploaded once under its
+# SHA-256 digest, and stacks are created from its TemplateURL instead of sending the whole body
+# with every create_stack call. This also raises the size limit of the template from 51,200 bytes
+# for a TemplateBody to 460,800 bytes.
+# SEE: http://docs.aws.amazon.com/AWSCloudFormation/latest/APIReference/API_CreateStack.html
+
+import logging
+import os
+import threading
+import urllib
+import urlparse
+
+import boto3
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger('templates')
+
+class S3Store(object):
+    def __init__(self, client, bucket, prefix=''):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def __key(self, name):
+        return self.prefix + name
+
+    def exists(self, name):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.__key(name))
+        except ClientError as exception:
+            if exception.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+        return True
+
+    def put(self, name, body):
+        self.client.put_object(Bucket=self.bucket, Key=self.__key(name), Body=body,
+                               ContentType='application/json')
+
+    def url(self, name):
+        return '{}/{}/{}'.format(self.client.meta.endpoint_url, self.bucket,
+                                 urllib.quote(self.__key(name)))
+
+# Stand-in for S3 that keeps templates in a local directory, for the offline benchmarks and tests.
+# Its file:// URLs are not readable by CloudFormation, so open_store() never returns one.
+class LocalStore(object):
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.path, name))
+
+    def put(self, name, body):
+        path = os.path.join(self.path, name)
+
+        with open(path + '.tmp', 'wb') as template:
+            template.write(body)
+        os.rename(path + '.tmp', path)
+
+    def url(self, name):
+        return 'file://' + urllib.pathname2url(os.path.join(self.path, name))
+
+# Store for a location of the form s3://bucket/prefix/. boto3 arguments are passed on to the S3
+# client.
+def open_store(location, **kwargs):
+    check_location(location)
+
+    url = urlparse.urlparse(location)
+    prefix = url.path.lstrip('/')
+    if prefix and not prefix.endswith('/'):
+        prefix += '/'
+
+    return S3Store(boto3.client('s3', **kwargs), url.netloc, prefix)
+
+def check_location(location):
+    url = urlparse.urlparse(location)
+
+    if url.scheme != 's3' or not url.netloc:
+        raise ValueError('Templates are stored in S3, as s3://bucket/prefix/, not {}'.format(
+            location))
+
+    return location
+
+# Uploads each template at most once per process, and only if the store does not have it yet, so
+# worker processes sharing a store upload it once between them in the common case. Without a store,
+# templates are sent inline.
+class Templates(object):
+    def __init__(self, store=None):
+        self.store = store
+
+        self._urls = {}
+        self._lock = threading.Lock()
+
+    def url(self, body, digest):
+        name = digest + '.json'
+
+        with self._lock:
+            if name not in self._urls:
+                if not self.store.exists(name):
+                    logger.info('Uploading template %s (%d bytes)', name, len(body))
+                    self.store.put(name, body)
+
+                self._urls[name] = self.store.url(name)
+
+            return self._urls[name]
+
+    # The TemplateBody or TemplateURL argument of create_stack.
+    def arguments(self, body, digest):
+        if self.store is None:
+            return {'TemplateBody': body}
+
+        return {'TemplateURL': self.url(body, digest)}
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,96 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Helpers for keeping the cloud-config UserData of the template within EC2's limit.
+#
+# coreos-cloudinit does not read multipart user data, and ours can only be gzipped as a whole once
+# CloudFormation has substituted the parameters, which it cannot do. Files whose content is static
+# are instead gzipped when the template is built, and the certificates and keys when a stack is
+# created, and they are decoded on the instance by write_files.
+# SEE: https://coreos.com/os/docs/latest/cloud-config.html#write_files
+
+import base64
+from cStringIO import StringIO
+import gzip
+
+from troposphere import Base64, GetAtt, If, Join, Ref
+
+# EC2 limit on the size of user data, before it is base64 encoded.
+# SEE: http://docs.aws.amazon.com/AWSEC2/latest/UserGuide/ec2-instance-metadata.html
+USER_DATA_LIMIT = 16384
+
+# Part of the limit kept free, so that components can still be added to the nodes.
+USER_DATA_HEADROOM = 1024
+
+# Size assumed for a pseudo parameter or an attribute of a resource, such as the DNS name of a load
+# balancer.
+DEFAULT_VALUE_SIZE = 128
+
+def gzip_base64(content):
+    output = StringIO()
+
+    # No file name and a fixed modification time, so that every build of the template, and with
+    # it TEMPLATE_DIGEST, is the same.
+    with gzip.GzipFile(filename='', mode='wb', compresslevel=9, fileobj=output,
+                       mtime=0) as compressed:
+        compressed.write(content)
+
+    return base64.b64encode(output.getvalue())
+
+# The largest size `value` can have once CloudFormation has resolved it. Parameters of `template`
+# referenced from it must be bounded by a MaxLength, or a MaxValue for numbers.
+def rendered_size(value, template):
+    if isinstance(value, basestring):
+        return len(value.encode('utf-8'))
+
+    if isinstance(value, Join):
+        delimiter, values = value.data['Fn::Join']
+        return (sum(rendered_size(item, template) for item in values) +
+                len(delimiter) * max(len(values) - 1, 0))
+
+    if isinstance(value, Base64):
+        return (rendered_size(value.data['Fn::Base64'], template) + 2) // 3 * 4
+
+    if isinstance(value, If):
+        return max(rendered_size(item, template) for item in value.data['Fn::If'][1:])
+
+    if isinstance(value, Ref) and value.data['Ref'] in template.parameters:
+        parameter = template.parameters[value.data['Ref']]
+
+        if parameter.properties['Type'] == 'Number' and 'MaxValue' in parameter.properties:
+            return len(str(parameter.properties['MaxValue']))
+        if 'MaxLength' in parameter.properties:
+            return int(parameter.properties['MaxLength'])
+
+        raise ValueError('Parameter {} has no MaxLength'.format(parameter.title))
+
+    if isinstance(value, (Ref, GetAtt)):
+        return DEFAULT_VALUE_SIZE
+
+    raise ValueError('Cannot size {!r}'.format(value))
+
+# Fails the build of a template whose UserData could leave less than `headroom` of `limit` bytes
+# free.
+def check_size(user_data, template, limit=USER_DATA_LIMIT, headroom=USER_DATA_HEADROOM):
+    size = rendered_size(user_data, template)
+
+    if size > limit - headroom:
+        raise ValueError('UserData may be up to {} bytes, leaving less than {} of the limit of {} '
+                         'bytes free'.format(size, headroom, limit))
+
+    return size
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
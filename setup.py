@@ -19,14 +19,17 @@ from setuptools import setup, find_packages
 setup(
     name='demiurge',
     version='0.8.3',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'tests']),
     install_requires=[
             'awacs==0.5.4',
             'boto3==1.3.1',
             'click==6.6',
             'connexion==1.0.103',
+            'cryptography',
             'fauxfactory==2.0.9',
             'Flask-HTTPAuth',
+            'futures',
+            'gunicorn==19.10.0',
             'troposphere==1.6.0',
             'pyopenssl',
             'cffi==1.7.0'
@@ -0,0 +1,69 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# The clusters API against an in-memory CloudFormation, shared by the tests of the API: demiurge
+# keeps its configuration and state in module globals, so it is only loaded once per process.
+#
+# Stacks of the fake take an hour to build, so they only change when a test sets their status. The
+# stack index and reconciler threads wait as long between runs, so they only run when a test calls
+# them and never while the interpreter shuts down.
+
+import base64
+import threading
+
+from benchmarks.fake_cloudformation import STACK_NAME, FakeCloudFormation
+from benchmarks.load import KEY_ALGORITHM, PASSWORD, USERNAME, create_app
+
+HEADERS = {'Authorization': 'Basic ' + base64.b64encode(USERNAME + ':' + PASSWORD)}
+
+_LOCK = threading.Lock()
+_LOADED = []
+
+# The test client of the API and the fake CloudFormation behind it.
+def load():
+    with _LOCK:
+        if not _LOADED:
+            fake = FakeCloudFormation(latency=0, build_time=3600)
+            application = create_app(fake, KEY_ALGORITHM=KEY_ALGORITHM, KEY_POOL_SIZE=0,
+                                     CLOUDFORMATION_RATE=0, STACK_CACHE_TTL=7200,
+                                     RECONCILE_INTERVAL=3600)
+            _LOADED.extend([application.test_client(), fake])
+
+        return _LOADED
+
+# Adds the stack of a cluster to the fake, and to the stack index and registry of the API.
+def add_stack(fake, cluster_name, status):
+    from demiurge.api import clusters
+
+    fake._add(cluster_name, status, [ # pylint: disable=protected-access
+        {'ParameterKey': 'ClusterName', 'ParameterValue': cluster_name},
+        {'ParameterKey': 'Username', 'ParameterValue': 'admin'},
+        {'ParameterKey': 'Password', 'ParameterValue': 'password'},
+        {'ParameterKey': 'VPC', 'ParameterValue': fake.vpc},
+        ])
+    clusters.STACKS.refresh()
+
+# Sets the status of the stack of a cluster in the fake, and lets the reconciler tell the API.
+def set_status(fake, cluster_name, status):
+    from demiurge.api import clusters
+
+    # pylint: disable=protected-access
+    with fake._lock:
+        fake._set_status(fake._stacks[STACK_NAME.format(cluster_name)], status)
+
+    clusters.RECONCILER.step()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
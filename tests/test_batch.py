@@ -0,0 +1,84 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import unittest
+
+from .api import HEADERS, add_stack, load
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        self.client, self.fake = load()
+
+        from demiurge.api import clusters
+        self.jobs = clusters.JOBS
+
+    def post(self, path, clusters):
+        response = self.client.post(path, headers=HEADERS, content_type='application/json',
+                                    data=json.dumps({'clusters': clusters}))
+        self.assertEqual(response.status_code, 200)
+
+        return dict((result['cluster_name'], result)
+                    for result in json.loads(response.data)['results'])
+
+    def test_create(self):
+        add_stack(self.fake, 'batch-existing', 'CREATE_COMPLETE')
+
+        results = self.post('/clusters:batch', [
+            {'cluster_name': 'batch-new', 'worker_count': 1},
+            {'cluster_name': 'batch-new', 'worker_count': 3},
+            {'cluster_name': 'batch-existing'},
+            {'cluster_name': 'batch-no-workers', 'worker_max_count': 2},
+            ])
+        self.jobs.join()
+
+        self.assertEqual(sorted(results), ['batch-existing', 'batch-new', 'batch-no-workers'])
+        self.assertEqual(results['batch-new']['status'], 202)
+        self.assertEqual(results['batch-new']['operation']['action'], 'create')
+        self.assertEqual(results['batch-existing']['status'], 409)
+        self.assertEqual(results['batch-no-workers']['status'], 400)
+
+        # The first entry of a cluster is the one created.
+        stack = self.fake.describe_stacks(StackName='TAP-Kubernetes-batch-new')['Stacks'][0]
+        self.assertIn({'ParameterKey': 'WorkerCount', 'ParameterValue': '1'},
+                      stack['Parameters'])
+
+    def test_create_again(self):
+        self.post('/clusters:batch', [{'cluster_name': 'batch-twice'}])
+
+        results = self.post('/clusters:batch', [{'cluster_name': 'batch-twice'}])
+
+        self.assertEqual(results['batch-twice']['status'], 409)
+
+    def test_delete(self):
+        add_stack(self.fake, 'batch-delete', 'CREATE_COMPLETE')
+
+        results = self.post('/clusters:batchDelete', [{'cluster_name': 'batch-delete'}] * 2)
+
+        self.assertEqual(results, {'batch-delete': {'cluster_name': 'batch-delete',
+                                                    'status': 204}})
+        self.assertEqual(self.client.get('/clusters/batch-delete', headers=HEADERS).status_code,
+                         404)
+
+    def test_invalid(self):
+        for body in ({}, {'clusters': []}, {'clusters': [{'worker_count': 1}]},
+                     {'clusters': [{'cluster_name': 'batch-{}'.format(index)}
+                                   for index in range(101)]}):
+            response = self.client.post('/clusters:batch', headers=HEADERS,
+                                        content_type='application/json', data=json.dumps(body))
+            self.assertEqual(response.status_code, 400)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,94 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import unittest
+
+from troposphere import Join, Ref, awsencode
+
+from demiurge.cloudconfig import CloudConfig, DropIn, File, Unit, gzipped, memoized
+
+def _json(value):
+    return json.loads(json.dumps(value, cls=awsencode))
+
+class CloudConfigTest(unittest.TestCase):
+    def test_render(self):
+        config = CloudConfig(
+            coreos=[('etcd2', [('listen-client-urls', 'http://0.0.0.0:2379')])],
+            units=[
+                Unit('etcd2.service', command='start', drop_ins=[
+                    DropIn('10-wait.conf', '[Unit]\nAfter=flanneld.service\n')]),
+                Unit('kubelet.service', content=['[Service]\n\nExecStart=kubelet --name=',
+                                                 Ref('ClusterName'), '\n']),
+                ],
+            write_files=[
+                File('/etc/hosts', '127.0.0.1 localhost\n'),
+                File('/etc/ca.pem', Ref('CACert'), '0600', 'gzip+base64'),
+                ])
+
+        self.assertEqual(_json(config.render()), _json(Join('', [
+            '#cloud-config\n\n'
+            'coreos:\n'
+            '  etcd2:\n'
+            '    listen-client-urls: http://0.0.0.0:2379\n'
+            '  units:\n'
+            '    - name: etcd2.service\n'
+            '      command: start\n'
+            '      drop-ins:\n'
+            '        - name: 10-wait.conf\n'
+            '          content: |\n'
+            '            [Unit]\n'
+            '            After=flanneld.service\n'
+            '    - name: kubelet.service\n'
+            '      content: |\n'
+            '        [Service]\n'
+            '\n'
+            '        ExecStart=kubelet --name=', Ref('ClusterName'), '\n'
+            'write_files:\n'
+            '  - path: /etc/hosts\n'
+            '    content: |\n'
+            '      127.0.0.1 localhost\n'
+            '  - path: /etc/ca.pem\n'
+            '    permissions: \'0600\'\n'
+            '    encoding: gzip+base64\n'
+            '    content: ', Ref('CACert'), '\n',
+            ])))
+
+    def test_rendered_once(self):
+        config = CloudConfig(units=[Unit('docker.service', command='start')])
+
+        self.assertIs(config.render(), config.render())
+
+    def test_gzipped(self):
+        entry = gzipped('/etc/motd', 'Kubernetes\n', '0644')
+
+        self.assertEqual(entry.encoding, 'gzip+base64')
+        self.assertTrue(isinstance(entry.content, str))
+
+class MemoizedTest(unittest.TestCase):
+    def test_once_per_arguments(self):
+        calls = []
+
+        @memoized
+        def build(role, workers=False):
+            calls.append((role, workers))
+            return object()
+
+        self.assertIs(build('master'), build('master'))
+        self.assertIsNot(build('master'), build('master', workers=True))
+        self.assertEqual(calls, [('master', False), ('master', True)])
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,150 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import unittest
+
+from botocore.exceptions import ClientError
+
+from demiurge import cloudformation
+from demiurge.cloudformation import RETRYABLE_CODES, TokenBucket, backoff
+
+# Stands in for the time module of demiurge.cloudformation: sleep() advances time() instantly.
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class ClockTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.time = cloudformation.time
+        cloudformation.time = self.clock
+
+    def tearDown(self):
+        cloudformation.time = self.time
+
+class TokenBucketTest(ClockTest):
+    def test_burst(self):
+        bucket = TokenBucket(2, 3)
+
+        self.assertEqual([bucket.acquire() for _ in range(3)], [0.0] * 3)
+        self.assertEqual(bucket.acquire(), 0.5)
+        self.assertEqual(bucket.acquire(), 0.5)
+
+    def test_refill(self):
+        bucket = TokenBucket(2, 3)
+        for _ in range(3):
+            bucket.acquire()
+
+        self.clock.now += 1
+
+        self.assertEqual([bucket.acquire() for _ in range(2)], [0.0] * 2)
+        self.assertEqual(bucket.acquire(), 0.5)
+
+    def test_refill_up_to_burst(self):
+        bucket = TokenBucket(2, 3)
+
+        self.clock.now += 60
+
+        self.assertEqual([bucket.acquire() for _ in range(3)], [0.0] * 3)
+        self.assertEqual(bucket.acquire(), 0.5)
+
+    def test_rate(self):
+        bucket = TokenBucket(5, 1)
+
+        for _ in range(51):
+            bucket.acquire()
+
+        self.assertAlmostEqual(self.clock.now - 1000.0, 10.0)
+
+class BackoffTest(unittest.TestCase):
+    def test_bounds(self):
+        for attempt in range(10):
+            limit = min(5.0, 0.1 * 2 ** attempt)
+
+            for _ in range(100):
+                self.assertTrue(0 <= backoff(attempt) <= limit)
+
+    def test_cap(self):
+        self.assertTrue(all(backoff(30, cap=1.0) <= 1.0 for _ in range(100)))
+
+def _error(code):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'DescribeStacks')
+
+class _Events(object):
+    def unregister(self, *args, **kwargs):
+        pass
+
+class _Meta(object):
+    events = _Events()
+
+    class service_model(object): # pylint: disable=invalid-name
+        endpoint_prefix = 'cloudformation'
+
+# Fails with each of `errors` in turn, then succeeds.
+class _Boto(object):
+    meta = _Meta()
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def describe_stacks(self, **kwargs):
+        self.calls += 1
+
+        if self.errors:
+            raise _error(self.errors.pop(0))
+        return kwargs
+
+class ClientTest(ClockTest):
+    def test_retries_throttled(self):
+        boto = _Boto('Throttling', 'ServiceUnavailable')
+
+        self.assertEqual(cloudformation.Client(boto).describe_stacks(StackName='a'),
+                         {'StackName': 'a'})
+        self.assertEqual(boto.calls, 3)
+        self.assertEqual(len(self.clock.sleeps), 2)
+
+    def test_gives_up(self):
+        boto = _Boto(*['Throttling'] * 5)
+
+        self.assertRaises(ClientError, cloudformation.Client(boto, max_attempts=3).describe_stacks)
+        self.assertEqual(boto.calls, 3)
+
+    def test_does_not_retry_other_errors(self):
+        boto = _Boto('ValidationError')
+
+        self.assertNotIn('ValidationError', RETRYABLE_CODES)
+        self.assertRaises(ClientError, cloudformation.Client(boto).describe_stacks)
+        self.assertEqual(boto.calls, 1)
+
+    def test_rate_limit(self):
+        boto = _Boto()
+        client = cloudformation.Client(boto, rate=10, burst=2)
+
+        for _ in range(4):
+            client.describe_stacks()
+
+        self.assertAlmostEqual(self.clock.now - 1000.0, 0.2)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,72 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import unittest
+
+from .api import HEADERS, add_stack, load
+
+class ConditionalGetTest(unittest.TestCase):
+    def setUp(self):
+        self.client, self.fake = load()
+
+    def get(self, path, etag=None):
+        headers = dict(HEADERS)
+        if etag:
+            headers['If-None-Match'] = etag
+
+        return self.client.get(path, headers=headers)
+
+    def test_cluster(self):
+        add_stack(self.fake, 'etag-cluster', 'CREATE_COMPLETE')
+        response = self.get('/clusters/etag-cluster')
+        etag = response.headers['ETag']
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(etag.startswith('W/'))
+
+        response = self.get('/clusters/etag-cluster', etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(response.data, '')
+
+        self.assertEqual(self.get('/clusters/etag-cluster', 'W/"other", ' + etag).status_code,
+                         304)
+        self.assertEqual(self.get('/clusters/etag-cluster', 'W/"other"').status_code, 200)
+
+    def test_changed_cluster(self):
+        add_stack(self.fake, 'etag-changed', 'CREATE_COMPLETE')
+        etag = self.get('/clusters/etag-changed').headers['ETag']
+
+        add_stack(self.fake, 'etag-changed', 'UPDATE_COMPLETE')
+
+        response = self.get('/clusters/etag-changed', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_clusters(self):
+        add_stack(self.fake, 'etag-listed', 'CREATE_COMPLETE')
+        etag = self.get('/clusters').headers['ETag']
+
+        self.assertEqual(self.get('/clusters', etag).status_code, 304)
+        self.assertEqual(self.get('/clusters?fields=cluster_name', etag).status_code, 200)
+
+        add_stack(self.fake, 'etag-new', 'CREATE_COMPLETE')
+        self.assertEqual(self.get('/clusters', etag).status_code, 200)
+
+    def test_not_found(self):
+        self.assertEqual(self.get('/clusters/etag-unknown', '*').status_code, 404)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
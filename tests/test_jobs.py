@@ -0,0 +1,144 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+from demiurge import state
+from demiurge.jobs import FAILED, RUNNING, SUCCEEDED, JobQueue, Operation, OperationError
+
+class QueueTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.queue = JobQueue(2)
+        self.other = None
+        self.finish = threading.Event()
+
+    # Operations still running write their status once they finish.
+    def tearDown(self):
+        self.finish.set()
+        for queue in (self.queue, self.other):
+            if queue is not None:
+                queue.join()
+
+        shutil.rmtree(self.directory)
+
+    def blocked(self, operation):
+        self.assertTrue(self.finish.wait(5))
+
+    def run_operation(self, target, queue=None):
+        queue = queue or self.queue
+        operation = queue.submit(Operation('create', 'a'), target)
+        queue.join()
+        return operation
+
+class JobQueueTest(QueueTest):
+    def test_succeeds(self):
+        calls = []
+        operation = self.queue.submit(Operation('create', 'a', network='10.3.1.0/24'),
+                                      lambda operation, value: calls.append(value), 1)
+        self.queue.join()
+
+        self.assertEqual(calls, [1])
+        self.assertIs(self.queue.get(operation.operation_id), operation)
+        self.assertEqual(operation.to_dict(), {
+            'operation_id': operation.operation_id,
+            'action': 'create',
+            'cluster_name': 'a',
+            'status': SUCCEEDED,
+            })
+
+    def test_fails(self):
+        def target(operation):
+            raise OperationError('No service network left')
+
+        operation = self.run_operation(target)
+
+        self.assertEqual(operation.status, FAILED)
+        self.assertEqual(operation.to_dict()['error'], 'No service network left')
+
+    def test_listeners(self):
+        statuses = []
+        self.queue.listeners.append(lambda operation: statuses.append(operation.status))
+
+        self.run_operation(lambda operation: None)
+
+        self.assertEqual(statuses, [RUNNING, SUCCEEDED])
+
+    def test_active(self):
+        operation = self.queue.submit(Operation('create', 'a'), self.blocked)
+
+        self.assertEqual(self.queue.active('create'), [operation])
+        self.assertEqual(self.queue.active('delete'), [])
+
+        self.finish.set()
+        self.queue.join()
+        self.assertEqual(self.queue.active(), [])
+
+    def test_expires_finished_operations(self):
+        operation = self.run_operation(lambda operation: None)
+        operation.updated -= 3601
+
+        self.run_operation(lambda operation: None)
+
+        self.assertIsNone(self.queue.get(operation.operation_id))
+
+    def test_unknown_operation(self):
+        self.assertIsNone(self.queue.get('0123456789abcdef'))
+        self.assertIsNone(JobQueue(1, path=self.directory).get('../jobs'))
+
+class SharedJobQueueTest(QueueTest):
+    def setUp(self):
+        super(SharedJobQueueTest, self).setUp()
+        self.queue = JobQueue(2, path=self.directory)
+        self.other = JobQueue(2, path=self.directory)
+
+    def test_shares_operations(self):
+        running = self.other.submit(Operation('create', 'b'), self.blocked)
+        operation = self.run_operation(lambda operation: None)
+
+        self.assertEqual(self.other.get(operation.operation_id).status, SUCCEEDED)
+        self.assertEqual([shared.operation_id for shared in self.queue.active()],
+                         [running.operation_id])
+
+    def test_expires_operations_of_other_processes(self):
+        operation = self.run_operation(lambda operation: None, self.other)
+        operation.updated -= 3601
+        path = os.path.join(self.directory, operation.operation_id + '.json')
+        state.write_json(path, operation.to_state())
+
+        self.run_operation(lambda operation: None)
+
+        self.assertFalse(os.path.exists(path))
+        self.assertIsNone(self.queue.get(operation.operation_id))
+
+    def test_interrupted(self):
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+
+        running = Operation('create', 'a')
+        running.status = RUNNING
+        running.pid = process.pid
+
+        self.assertEqual(Operation.from_state(running.to_state()).to_dict()['error'],
+                         'Interrupted')
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,124 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from demiurge import state
+from demiurge.network import NetworkAllocator
+
+class NetworkAllocatorTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'networks.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_allocate_until_exhausted(self):
+        allocator = NetworkAllocator('10.3.0.0/22', 24)
+
+        # The first and the last subnet are never handed out.
+        self.assertEqual(allocator.allocate('a'), '10.3.1.0/24')
+        self.assertEqual(allocator.allocate('b'), '10.3.2.0/24')
+        self.assertIsNone(allocator.allocate('c'))
+        self.assertEqual(allocator.stats(), {'size': 2, 'reserved': 2})
+
+    def test_allocate_twice(self):
+        allocator = NetworkAllocator('10.3.0.0/16', 24)
+
+        self.assertEqual(allocator.allocate('a'), allocator.allocate('a'))
+        self.assertEqual(allocator.stats()['reserved'], 1)
+
+    def test_release_and_reuse(self):
+        allocator = NetworkAllocator('10.3.0.0/22', 24)
+        allocator.allocate('a')
+        allocator.allocate('b')
+
+        allocator.release('a')
+        allocator.release('unknown')
+
+        self.assertEqual(allocator.allocate('c'), '10.3.1.0/24')
+        # Allocating again returns the owner's network, so it checks what is reserved.
+        self.assertEqual(allocator.allocate('b'), '10.3.2.0/24')
+        self.assertEqual(allocator.stats()['reserved'], 2)
+
+    def test_allocate_all(self):
+        allocator = NetworkAllocator('10.3.0.0/22', 24)
+
+        networks = allocator.allocate_all(['a', 'b', 'c'])
+
+        self.assertEqual(sorted(network for network in networks.values() if network),
+                         ['10.3.1.0/24', '10.3.2.0/24'])
+        self.assertEqual(networks.values().count(None), 1)
+
+    def test_reserve_foreign_network(self):
+        allocator = NetworkAllocator('10.3.0.0/22', 24)
+
+        allocator.reserve('a', '10.3.1.0/24')
+
+        self.assertEqual(allocator.allocate('b'), '10.3.2.0/24')
+        self.assertIsNone(allocator.allocate('c'))
+
+    def test_reserve_taken_or_outside(self):
+        allocator = NetworkAllocator('10.3.0.0/22', 24)
+        allocator.reserve('a', '10.3.1.0/24')
+
+        allocator.reserve('b', '10.3.1.0/24')
+        allocator.reserve('c', '10.4.1.0/24')
+        allocator.reserve('d', '10.3.2.0/25')
+
+        self.assertEqual(allocator.allocate('a'), '10.3.1.0/24')
+        self.assertEqual(allocator.stats()['reserved'], 1)
+
+    def test_reserve_moves_owner(self):
+        allocator = NetworkAllocator('10.3.0.0/22', 24)
+        allocator.allocate('a')
+
+        allocator.reserve('a', '10.3.2.0/24')
+
+        self.assertEqual(allocator.allocate('b'), '10.3.1.0/24')
+        self.assertEqual(allocator.allocate('a'), '10.3.2.0/24')
+        self.assertEqual(allocator.stats()['reserved'], 2)
+
+    def test_prefix_outside_supernet(self):
+        self.assertRaises(ValueError, NetworkAllocator, '10.3.0.0/16', 8)
+
+    def test_reload_after_another_process_writes(self):
+        first = NetworkAllocator('10.3.0.0/16', 24, self.path)
+        second = NetworkAllocator('10.3.0.0/16', 24, self.path)
+
+        self.assertEqual(first.allocate('a'), '10.3.1.0/24')
+        self.assertEqual(second.allocate('b'), '10.3.2.0/24')
+        self.assertEqual(first.allocate('b'), '10.3.2.0/24')
+        self.assertEqual(state.read_json(self.path), {'a': '10.3.1.0/24', 'b': '10.3.2.0/24'})
+
+        first.release('b')
+        self.assertEqual(second.allocate('c'), '10.3.2.0/24')
+        self.assertEqual(state.read_json(self.path), {'a': '10.3.1.0/24', 'c': '10.3.2.0/24'})
+
+    def test_restart(self):
+        NetworkAllocator('10.3.0.0/16', 24, self.path).allocate('a')
+
+        allocator = NetworkAllocator('10.3.0.0/16', 24, self.path)
+
+        self.assertEqual(allocator.stats()['reserved'], 1)
+        self.assertEqual(allocator.allocate('a'), '10.3.1.0/24')
+        self.assertEqual(allocator.allocate('b'), '10.3.2.0/24')
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,221 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import itertools
+import os
+import shutil
+import tempfile
+import unittest
+
+from botocore.exceptions import ClientError
+
+from demiurge.reconciler import Reconciler
+
+# Stacks and their events, newest first, keyed by stack ID.
+class _CloudFormation(object):
+    def __init__(self):
+        self.stacks = {}
+        self.events = {}
+        self.calls = 0
+        self._ids = itertools.count()
+
+    def add(self, name, status):
+        stack = {'StackId': 'id-' + name, 'StackName': name, 'StackStatus': status}
+        self.stacks[stack['StackId']] = stack
+        self.events[stack['StackId']] = []
+        self.event(name, status)
+        return dict(stack)
+
+    def event(self, name, status, logical_id=None):
+        stack_id = 'id-' + name
+        if logical_id is None:
+            self.stacks[stack_id]['StackStatus'] = status
+
+        self.events[stack_id].insert(0, {
+            'EventId': str(next(self._ids)),
+            'LogicalResourceId': logical_id or name,
+            'ResourceType': 'AWS::CloudFormation::Stack' if logical_id is None else 'AWS::EC2::VPC',
+            'ResourceStatus': status,
+            })
+
+    def describe_stack_events(self, **kwargs):
+        self.calls += 1
+
+        if kwargs['StackName'] not in self.events:
+            raise ClientError({'Error': {
+                'Code': 'ValidationError',
+                'Message': 'Stack [{}] does not exist'.format(kwargs['StackName']),
+                }}, 'DescribeStackEvents')
+
+        return {'StackEvents': list(self.events[kwargs['StackName']])}
+
+    def describe_stacks(self, **kwargs):
+        self.calls += 1
+        return {'Stacks': [dict(self.stacks[kwargs['StackName']])]}
+
+# Records what the reconciler writes to the stack index.
+class _Index(object):
+    def __init__(self):
+        self.updates = []
+        self.confirmed = []
+
+    def update(self, stack):
+        self.updates.append((stack['StackName'], stack['StackStatus']))
+
+    def confirm(self, name):
+        self.confirmed.append(name)
+
+# The tests call step() instead of running the reconciler thread.
+class _Reconciler(Reconciler):
+    def start(self):
+        pass
+
+class ReconcilerTest(unittest.TestCase):
+    def setUp(self):
+        self.cloudformation = _CloudFormation()
+        self.index = _Index()
+        self.reconciler = _Reconciler(self.cloudformation, self.index, 5)
+        self.changes = []
+        self.reconciler.listeners.append(
+            lambda stack: self.changes.append((stack['StackName'], stack['StackStatus'])))
+
+    def test_follows_stack_until_final(self):
+        self.reconciler.watch(self.cloudformation.add('a', 'CREATE_IN_PROGRESS'))
+
+        self.reconciler.step()
+        self.assertEqual(self.index.confirmed, ['a'])
+        self.assertEqual(self.changes, [])
+
+        self.cloudformation.event('a', 'CREATE_COMPLETE')
+        self.reconciler.step()
+
+        self.assertEqual(self.index.updates, [('a', 'CREATE_COMPLETE')])
+        self.assertEqual(self.changes, [('a', 'CREATE_COMPLETE')])
+        self.assertEqual(self.reconciler.watching(), [])
+        self.assertEqual(self.reconciler.stats()['transitions'], 1)
+
+    def test_passes_every_status_in_order(self):
+        self.reconciler.watch(self.cloudformation.add('a', 'UPDATE_IN_PROGRESS'))
+        self.reconciler.step()
+
+        self.cloudformation.event('a', 'UPDATE_COMPLETE_CLEANUP_IN_PROGRESS')
+        self.cloudformation.event('a', 'UPDATE_COMPLETE')
+        self.reconciler.step()
+
+        self.assertEqual(self.changes, [('a', 'UPDATE_COMPLETE_CLEANUP_IN_PROGRESS'),
+                                        ('a', 'UPDATE_COMPLETE')])
+
+    def test_reads_only_new_events(self):
+        self.reconciler.watch(self.cloudformation.add('a', 'CREATE_IN_PROGRESS'))
+        self.cloudformation.event('a', 'CREATE_IN_PROGRESS', 'VPC')
+        self.reconciler.step()
+
+        self.cloudformation.event('a', 'CREATE_COMPLETE', 'VPC')
+        self.reconciler.step()
+
+        self.assertEqual(self.reconciler.stats()['events'], 3)
+        self.assertEqual(self.changes, [])
+
+    def test_ignores_final_stacks(self):
+        self.reconciler.watch(self.cloudformation.add('a', 'CREATE_COMPLETE'))
+        self.reconciler.step()
+
+        self.assertEqual(self.reconciler.watching(), [])
+        self.assertEqual(self.cloudformation.calls, 0)
+
+    def test_stack_gone(self):
+        self.reconciler.watch({'StackId': 'id-a', 'StackName': 'a',
+                               'StackStatus': 'DELETE_IN_PROGRESS'})
+
+        self.reconciler.step()
+
+        self.assertEqual(self.reconciler.watching(), [])
+
+# Two processes sharing the reconciler state, the first of which to step is the leader.
+class SharedReconcilerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, 'reconciler.json')
+
+        self.cloudformation = _CloudFormation()
+        self.leader_index = _Index()
+        self.follower_index = _Index()
+        self.leader = _Reconciler(self.cloudformation, self.leader_index, 5, path)
+        self.follower = _Reconciler(_CloudFormation(), self.follower_index, 5, path)
+
+        self.changes = []
+        self.follower.listeners.append(
+            lambda stack: self.changes.append((stack['StackName'], stack['StackStatus'])))
+
+        self.leader.step()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_follower_hands_stacks_to_leader(self):
+        self.follower.watch(self.cloudformation.add('a', 'CREATE_IN_PROGRESS'))
+
+        self.follower.step()
+        self.leader.step()
+
+        self.assertEqual(self.leader.watching(), ['a'])
+        self.assertEqual(self.follower.client.calls, 0)
+
+    def test_follower_gets_changes_from_leader(self):
+        self.follower.watch(self.cloudformation.add('a', 'CREATE_IN_PROGRESS'))
+        self.follower.step()
+        self.leader.step()
+
+        self.follower.step()
+        self.assertEqual(self.follower_index.confirmed, ['a'])
+
+        self.cloudformation.event('a', 'CREATE_COMPLETE')
+        self.leader.step()
+        self.follower.step()
+
+        self.assertEqual(self.leader_index.updates, [('a', 'CREATE_COMPLETE')])
+        self.assertEqual(self.follower_index.updates, [('a', 'CREATE_COMPLETE')])
+        self.assertEqual(self.changes, [('a', 'CREATE_COMPLETE')])
+        self.assertEqual(self.follower.watching(), [])
+
+    def test_finished_stacks_stay_published(self):
+        self.follower.watch(self.cloudformation.add('a', 'CREATE_IN_PROGRESS'))
+        self.follower.step()
+        self.leader.step()
+        self.cloudformation.event('a', 'CREATE_COMPLETE')
+        self.leader.step()
+
+        # The follower missed the interval in which the stack finished.
+        self.leader.step()
+        self.follower.step()
+
+        self.assertEqual(self.changes, [('a', 'CREATE_COMPLETE')])
+
+    def test_ignores_published_stack_of_the_same_name(self):
+        self.leader.watch(self.cloudformation.add('a', 'DELETE_IN_PROGRESS'))
+        self.leader.step()
+        self.cloudformation.event('a', 'DELETE_COMPLETE')
+        self.leader.step()
+
+        # A new stack named a, created after the old one was deleted.
+        self.follower.watch({'StackId': 'id-a-2', 'StackName': 'a',
+                             'StackStatus': 'CREATE_IN_PROGRESS'})
+        self.follower.step()
+
+        self.assertEqual(self.changes, [])
+        self.assertEqual(self.follower.watching(), ['a'])
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
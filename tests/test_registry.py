@@ -0,0 +1,115 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from demiurge.registry import Registry
+
+def _cluster(name, status='CREATE_COMPLETE', **columns):
+    return dict(columns, cluster_name=name, stack_name='TAP-Kubernetes-' + name, status=status)
+
+class RegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def names(self, **kwargs):
+        return [cluster['cluster_name'] for cluster in self.registry.clusters(**kwargs)]
+
+    def test_sync_records_clusters(self):
+        self.registry.sync([_cluster('b', username='admin'), _cluster('a')])
+
+        self.assertEqual(self.names(), ['a', 'b'])
+        self.assertEqual(self.registry.get('b')['username'], 'admin')
+        self.assertIsNone(self.registry.get('a')['username'])
+        self.assertIsNone(self.registry.get('c'))
+        self.assertIsNone(self.registry.synced)
+
+    def test_sync_replaces_clusters(self):
+        self.registry.sync([_cluster('a', 'CREATE_IN_PROGRESS')])
+        self.registry.sync([_cluster('a', api_server='https://a.elb')])
+
+        cluster = self.registry.get('a')
+        self.assertEqual(cluster['status'], 'CREATE_COMPLETE')
+        self.assertEqual(cluster['api_server'], 'https://a.elb')
+
+    def test_partial_sync_keeps_other_clusters(self):
+        self.registry.sync([_cluster('a'), _cluster('b')])
+        self.registry.sync([_cluster('c')])
+
+        self.assertEqual(self.names(), ['a', 'b', 'c'])
+
+    def test_full_sync_removes_missing_clusters(self):
+        self.registry.sync([_cluster('a'), _cluster('b')])
+        time.sleep(0.01)
+        started = time.time()
+
+        # Written while the listing ran, e.g. by a create.
+        self.registry.sync([_cluster('c')])
+        self.registry.sync([_cluster('a')], started)
+
+        self.assertEqual(self.names(), ['a', 'c'])
+        self.assertEqual(self.registry.synced, started)
+
+    def test_clusters(self):
+        self.registry.sync([_cluster('a'), _cluster('b', 'CREATE_IN_PROGRESS'), _cluster('c'),
+                            _cluster('d')])
+
+        self.assertEqual(self.names(statuses=['CREATE_COMPLETE']), ['a', 'c', 'd'])
+        self.assertEqual(self.names(after='a', limit=2), ['b', 'c'])
+        self.assertEqual(self.registry.clusters(limit=1, columns=['cluster_name', 'status']),
+                         [{'cluster_name': 'a', 'status': 'CREATE_COMPLETE'}])
+
+    def test_mark_and_remove(self):
+        self.registry.sync([_cluster('a'), _cluster('b')])
+
+        self.registry.mark('a', 'DELETE_IN_PROGRESS')
+        self.registry.remove('b')
+
+        self.assertEqual(self.registry.get('a')['status'], 'DELETE_IN_PROGRESS')
+        self.assertEqual(self.registry.stats(), {'clusters': 1})
+
+class PersistedRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'registry.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_shared_and_restarted(self):
+        first = Registry(self.path)
+        second = Registry(self.path)
+
+        first.sync([_cluster('a')], 1.0)
+
+        self.assertEqual(second.get('a')['status'], 'CREATE_COMPLETE')
+        self.assertEqual(Registry(self.path).synced, 1.0)
+
+    def test_only_readable_by_owner(self):
+        with open(self.path, 'w'):
+            pass
+        os.chmod(self.path, 0o644)
+
+        Registry(self.path).sync([_cluster('a')])
+
+        for name in os.listdir(self.directory):
+            self.assertEqual(os.stat(os.path.join(self.directory, name)).st_mode & 0o777, 0o600)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,69 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import base64
+import json
+import unittest
+
+from .api import HEADERS, add_stack, load
+
+class SearchTest(unittest.TestCase):
+    def setUp(self):
+        self.client, self.fake = load()
+
+        for index in range(5):
+            add_stack(self.fake, 'search-{}'.format(index), 'CREATE_COMPLETE')
+        add_stack(self.fake, 'search-building', 'CREATE_IN_PROGRESS')
+
+    def search(self, query=''):
+        return self.client.get('/clusters?' + query, headers=HEADERS)
+
+    def test_clusters_by_name(self):
+        names = [cluster['cluster_name'] for cluster in json.loads(self.search().data)]
+
+        self.assertEqual(names, sorted(names))
+        self.assertIn('search-0', names)
+        self.assertNotIn('search-building', names)
+
+    def test_pages(self):
+        clusters = json.loads(self.search().data)
+        pages = []
+        query = 'limit=2'
+
+        while True:
+            response = self.search(query)
+            self.assertEqual(response.status_code, 200)
+            pages.append(json.loads(response.data))
+
+            if 'X-Next-Cursor' not in response.headers:
+                break
+            query = 'limit=2&cursor=' + response.headers['X-Next-Cursor']
+
+        self.assertTrue(all(len(page) == 2 for page in pages[:-1]))
+        self.assertEqual([cluster for page in pages for cluster in page], clusters)
+
+    def test_fields(self):
+        clusters = json.loads(self.search('fields=cluster_name,username').data)
+
+        self.assertEqual(set(tuple(sorted(cluster)) for cluster in clusters),
+                         set([('cluster_name', 'username')]))
+
+    def test_invalid(self):
+        for query in ('limit=0', 'limit=1001', 'fields=stack_id', 'cursor=!!!',
+                      'cursor=' + base64.urlsafe_b64encode('search-0') + '!'):
+            self.assertEqual(self.search(query).status_code, 400, query)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,102 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import threading
+import time
+import unittest
+
+from demiurge.singleflight import COALESCED, Group
+
+class GroupTest(unittest.TestCase):
+    def setUp(self):
+        self.group = Group()
+        self.started = threading.Event()
+        self.finish = threading.Event()
+        self.calls = []
+
+    def function(self, value):
+        self.calls.append(value)
+        self.started.set()
+        self.finish.wait(5)
+
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    # Starts `count` threads calling do(), the first of which is in flight once this returns.
+    def call(self, count, key, value):
+        results = []
+
+        def target():
+            try:
+                results.append(self.group.do('test', key, self.function, value))
+            except Exception as exception: # pylint: disable=broad-except
+                results.append(exception)
+
+        threads = [threading.Thread(target=target) for _ in range(count)]
+        threads[0].start()
+        self.assertTrue(self.started.wait(5))
+
+        coalesced = COALESCED.value(operation='test')
+        for thread in threads[1:]:
+            thread.start()
+
+        # The leader only finishes once the others are waiting for it.
+        deadline = time.time() + 5
+        while COALESCED.value(operation='test') < coalesced + count - 1:
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.001)
+
+        return threads, results
+
+    def join(self, threads):
+        self.finish.set()
+
+        for thread in threads:
+            thread.join(5)
+
+    def test_coalesces_identical_calls(self):
+        threads, results = self.call(4, 'key', 'result')
+        self.join(threads)
+
+        self.assertEqual(self.calls, ['result'])
+        self.assertEqual(results, ['result'] * 4)
+
+    def test_shares_exception(self):
+        error = ValueError('failed')
+        threads, results = self.call(3, 'key', error)
+        self.join(threads)
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(results, [error] * 3)
+
+    def test_separate_keys(self):
+        self.finish.set()
+
+        self.assertEqual(self.group.do('test', 'a', self.function, 1), 1)
+        self.assertEqual(self.group.do('test', 'b', self.function, 2), 2)
+        self.assertEqual(self.group.do('other', 'a', self.function, 3), 3)
+        self.assertEqual(self.calls, [1, 2, 3])
+
+    def test_call_after_completion(self):
+        self.finish.set()
+
+        self.group.do('test', 'key', self.function, 1)
+        self.group.do('test', 'key', self.function, 2)
+
+        self.assertEqual(self.calls, [1, 2])
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,206 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import unittest
+
+from botocore.exceptions import ClientError
+
+from demiurge import stacks
+from demiurge.stacks import StackIndex
+
+from .test_cloudformation import Clock
+
+def _stack(name, status='CREATE_COMPLETE'):
+    return {'StackName': name, 'StackStatus': status, 'Parameters': [], 'Outputs': []}
+
+# The describe_stacks paginator and calls of a CloudFormation client with the stacks in `stacks`.
+class _CloudFormation(object):
+    def __init__(self, *names):
+        self.stacks = dict((name, _stack(name)) for name in names)
+        self.listings = 0
+        self.describes = 0
+        self.error = None
+        self.during_listing = None
+
+    def get_paginator(self, operation):
+        assert operation == 'describe_stacks'
+        return self
+
+    def paginate(self):
+        self.listings += 1
+
+        if self.error:
+            raise self.error
+        if self.during_listing:
+            self.during_listing()
+
+        yield {'Stacks': list(self.stacks.values())}
+
+    def describe_stacks(self, **kwargs):
+        self.describes += 1
+
+        if kwargs['StackName'] not in self.stacks:
+            raise ClientError({'Error': {
+                'Code': 'ValidationError',
+                'Message': 'Stack with id {} does not exist'.format(kwargs['StackName']),
+                }}, 'DescribeStacks')
+
+        return {'Stacks': [self.stacks[kwargs['StackName']]]}
+
+# The refresh thread is left out, so that refreshes only happen when the tests read.
+class _Index(StackIndex):
+    def start(self):
+        pass
+
+class IndexTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.time = stacks.time
+        stacks.time = self.clock
+
+        self.cloudformation = _CloudFormation('a', 'b')
+        self.index = _Index(self.cloudformation, 30, 5)
+
+    def tearDown(self):
+        stacks.time = self.time
+
+class StackIndexTest(IndexTest):
+    def test_first_read_refreshes(self):
+        self.index.ensure_fresh()
+
+        self.assertEqual(self.cloudformation.listings, 1)
+        self.assertEqual(self.index.stats()['stacks'], 2)
+
+    def test_fresh_within_ttl(self):
+        self.index.ensure_fresh()
+        self.clock.now += 30
+
+        self.index.ensure_fresh()
+
+        self.assertEqual(self.cloudformation.listings, 1)
+        self.assertEqual(self.index.stats()['age'], 30)
+
+    def test_refreshes_once_stale(self):
+        self.index.ensure_fresh()
+        del self.cloudformation.stacks['a']
+        self.clock.now += 31
+
+        self.index.ensure_fresh()
+
+        self.assertEqual(self.cloudformation.listings, 2)
+        self.assertEqual(self.index.stats()['stale'], 1)
+        self.assertEqual(self.index.stats()['stacks'], 1)
+
+    def test_serves_stale_index_when_refresh_fails(self):
+        self.index.ensure_fresh()
+        self.cloudformation.error = ClientError({'Error': {'Code': 'Throttling',
+                                                           'Message': 'Rate exceeded'}},
+                                                'DescribeStacks')
+        self.clock.now += 31
+
+        self.index.ensure_fresh()
+
+        self.assertEqual(self.cloudformation.listings, 2)
+        self.assertEqual(self.index.stats()['stacks'], 2)
+
+    def test_refresh_keeps_writes_made_while_listing(self):
+        self.cloudformation.during_listing = lambda: self.index.update(
+            _stack('a', 'DELETE_IN_PROGRESS'))
+
+        self.index.ensure_fresh()
+
+        self.assertEqual(self.index.stats()['stacks'], 2)
+        self.index.mark('b', 'UPDATE_IN_PROGRESS')
+        self.assertEqual(self.index.lookup('a')['StackStatus'], 'DELETE_IN_PROGRESS')
+        self.assertEqual(self.index.lookup('b')['StackStatus'], 'UPDATE_IN_PROGRESS')
+
+    def test_listeners_get_every_stack(self):
+        listened = []
+        self.index.listeners.append(lambda stacks, started: listened.append(
+            (sorted(stack['StackName'] for stack in stacks), started)))
+
+        self.index.ensure_fresh()
+
+        self.assertEqual(listened, [(['a', 'b'], self.clock.now)])
+
+    def test_summaries(self):
+        self.cloudformation.stacks['a']['Parameters'] = [
+            {'ParameterKey': key, 'ParameterValue': key} for key in ('ClusterName', 'CAKey')]
+        self.cloudformation.stacks['a']['Description'] = 'Kubernetes'
+        index = _Index(self.cloudformation, 30, 5, parameters=('ClusterName',), outputs=())
+
+        index.ensure_fresh()
+
+        self.assertEqual(index.lookup('a'), {
+            'StackName': 'a', 'StackStatus': 'CREATE_COMPLETE',
+            'Parameters': [{'ParameterKey': 'ClusterName', 'ParameterValue': 'ClusterName'}],
+            'Outputs': [],
+            })
+
+class LookupTest(IndexTest):
+    def test_hit_within_lookup_ttl_of_refresh(self):
+        self.index.ensure_fresh()
+        self.clock.now += 5
+
+        self.assertEqual(self.index.lookup('a')['StackName'], 'a')
+        self.assertIsNone(self.index.lookup('c'))
+        self.assertEqual(self.cloudformation.describes, 0)
+        self.assertEqual(self.index.stats()['hits'], 2)
+
+    def test_describes_after_lookup_ttl(self):
+        self.index.ensure_fresh()
+        self.cloudformation.stacks['a']['StackStatus'] = 'DELETE_IN_PROGRESS'
+        self.clock.now += 6
+
+        self.assertEqual(self.index.lookup('a')['StackStatus'], 'DELETE_IN_PROGRESS')
+        self.assertEqual(self.index.lookup('a')['StackStatus'], 'DELETE_IN_PROGRESS')
+        self.assertEqual(self.cloudformation.describes, 1)
+        self.assertEqual(self.index.stats()['misses'], 1)
+        self.assertEqual(self.cloudformation.listings, 1)
+
+    def test_new_stack(self):
+        self.index.ensure_fresh()
+        self.cloudformation.stacks['c'] = _stack('c', 'CREATE_IN_PROGRESS')
+        self.clock.now += 6
+
+        self.assertEqual(self.index.lookup('c')['StackStatus'], 'CREATE_IN_PROGRESS')
+        self.assertEqual(self.index.stats()['stacks'], 3)
+
+    def test_deleted_stack(self):
+        self.index.ensure_fresh()
+        del self.cloudformation.stacks['a']
+        self.clock.now += 6
+
+        self.assertIsNone(self.index.lookup('a'))
+        self.assertEqual(self.index.stats()['stacks'], 1)
+
+    def test_confirm(self):
+        self.index.ensure_fresh()
+        self.clock.now += 6
+
+        self.index.confirm('a')
+        self.index.confirm('c')
+
+        self.assertIsNotNone(self.index.lookup('a'))
+        self.assertEqual(self.cloudformation.describes, 0)
+        self.assertIsNone(self.index.lookup('c'))
+        self.assertEqual(self.cloudformation.describes, 1)
+
+    def test_without_refresh(self):
+        self.assertEqual(self.index.lookup('a')['StackName'], 'a')
+        self.assertEqual(self.cloudformation.listings, 0)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,85 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import base64
+from cStringIO import StringIO
+import gzip
+import unittest
+
+from troposphere import Base64, GetAtt, If, Join, Parameter, Ref, Template
+
+from demiurge.userdata import (DEFAULT_VALUE_SIZE, USER_DATA_HEADROOM, USER_DATA_LIMIT,
+                               check_size, gzip_base64, rendered_size)
+
+def _gunzip(content):
+    return gzip.GzipFile(fileobj=StringIO(base64.b64decode(content))).read()
+
+class GzipTest(unittest.TestCase):
+    def test_round_trip(self):
+        self.assertEqual(_gunzip(gzip_base64('[Unit]\nDescription=kubelet\n')),
+                         '[Unit]\nDescription=kubelet\n')
+
+    def test_same_for_every_build(self):
+        self.assertEqual(gzip_base64('content'), gzip_base64('content'))
+
+class RenderedSizeTest(unittest.TestCase):
+    def setUp(self):
+        self.template = Template()
+        self.name = self.template.add_parameter(Parameter('Name', Type='String', MaxLength='32'))
+        self.count = self.template.add_parameter(Parameter('Count', Type='Number', MaxValue=100))
+        self.unbounded = self.template.add_parameter(Parameter('Unbounded', Type='String'))
+
+    def test_strings(self):
+        self.assertEqual(rendered_size('abc', self.template), 3)
+        self.assertEqual(rendered_size(u'caf\xe9', self.template), 5)
+
+    def test_parameters(self):
+        self.assertEqual(rendered_size(Ref(self.name), self.template), 32)
+        self.assertEqual(rendered_size(Ref(self.count), self.template), 3)
+        self.assertRaises(ValueError, rendered_size, Ref(self.unbounded), self.template)
+
+    def test_pseudo_parameters_and_attributes(self):
+        self.assertEqual(rendered_size(Ref('AWS::Region'), self.template), DEFAULT_VALUE_SIZE)
+        self.assertEqual(rendered_size(GetAtt('LoadBalancer', 'DNSName'), self.template),
+                         DEFAULT_VALUE_SIZE)
+
+    def test_functions(self):
+        self.assertEqual(rendered_size(Join(', ', ['a', Ref(self.name), 'b']), self.template),
+                         38)
+        self.assertEqual(rendered_size(Base64(Join('', ['abcd', Ref(self.name)])),
+                                       self.template), 48)
+        self.assertEqual(rendered_size(If('HasName', Ref(self.name), 'none'), self.template), 32)
+
+class CheckSizeTest(unittest.TestCase):
+    def setUp(self):
+        self.template = Template()
+
+    def test_within_headroom(self):
+        user_data = 'x' * (USER_DATA_LIMIT - USER_DATA_HEADROOM)
+        self.assertEqual(check_size(user_data, self.template), len(user_data))
+
+    def test_in_headroom(self):
+        user_data = 'x' * (USER_DATA_LIMIT - USER_DATA_HEADROOM + 1)
+        self.assertRaises(ValueError, check_size, user_data, self.template)
+        self.assertEqual(check_size(user_data, self.template, headroom=0), len(user_data))
+
+    def test_cluster_user_data(self):
+        from demiurge.aws import USER_DATA_SIZE, WORKER_USER_DATA_SIZE
+
+        for size in (USER_DATA_SIZE, WORKER_USER_DATA_SIZE):
+            self.assertLessEqual(size, USER_DATA_LIMIT - USER_DATA_HEADROOM)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
@@ -0,0 +1,70 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import threading
+import time
+import unittest
+
+from .api import HEADERS, add_stack, load, set_status
+
+class WatchTest(unittest.TestCase):
+    def setUp(self):
+        self.client, self.fake = load()
+
+    def watch(self, cluster_name, query):
+        started = time.time()
+        response = self.client.get('/clusters/{}?{}'.format(cluster_name, query), headers=HEADERS)
+        return response.status_code, time.time() - started
+
+    def test_returns_once_stack_completes(self):
+        add_stack(self.fake, 'watch-complete', 'CREATE_IN_PROGRESS')
+        timer = threading.Timer(0.2, set_status,
+                                [self.fake, 'watch-complete', 'CREATE_COMPLETE'])
+        timer.start()
+
+        status, elapsed = self.watch('watch-complete', 'watch=true&timeout=10')
+        timer.join()
+
+        self.assertEqual(status, 200)
+        self.assertLess(elapsed, 5)
+
+    def test_times_out(self):
+        add_stack(self.fake, 'watch-timeout', 'CREATE_IN_PROGRESS')
+
+        status, elapsed = self.watch('watch-timeout', 'watch=True&timeout=1')
+
+        self.assertEqual(status, 204)
+        self.assertGreaterEqual(elapsed, 1)
+
+    def test_without_watch(self):
+        add_stack(self.fake, 'watch-false', 'CREATE_IN_PROGRESS')
+
+        for query in ('', 'watch=false', 'watch=False&timeout=10'):
+            status, elapsed = self.watch('watch-false', query)
+            self.assertEqual(status, 204)
+            self.assertLess(elapsed, 1)
+
+    def test_unknown_cluster(self):
+        status, elapsed = self.watch('watch-unknown', 'watch=true&timeout=10')
+
+        self.assertEqual(status, 404)
+        self.assertLess(elapsed, 1)
+
+    def test_invalid(self):
+        for query in ('watch=yes', 'watch=true&timeout=0', 'watch=true&timeout=61'):
+            self.assertEqual(self.watch('watch-invalid', query)[0], 400)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100
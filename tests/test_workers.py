@@ -0,0 +1,76 @@
+# pylint: disable=missing-docstring
+# Copyright (c) 2016 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import unittest
+
+from botocore.exceptions import ClientError
+
+from .api import HEADERS, load
+
+class WorkersTest(unittest.TestCase):
+    def setUp(self):
+        self.client, self.fake = load()
+
+        from demiurge.api import clusters
+        self.jobs = clusters.JOBS
+
+    def put(self, cluster_name, body=None):
+        if body is None:
+            return self.client.put('/clusters/' + cluster_name, headers=HEADERS)
+
+        return self.client.put('/clusters/' + cluster_name, headers=HEADERS,
+                               content_type='application/json', data=json.dumps(body))
+
+    def parameters(self, cluster_name):
+        self.jobs.join()
+        stack = self.fake.describe_stacks(StackName='TAP-Kubernetes-' + cluster_name)['Stacks'][0]
+
+        return dict((parameter['ParameterKey'], parameter['ParameterValue'])
+                    for parameter in stack['Parameters']
+                    if parameter['ParameterKey'].startswith('Worker'))
+
+    def test_workers(self):
+        response = self.put('workers-three', {'worker_count': 3, 'worker_max_count': 5,
+                                              'worker_instance_type': 'm4.xlarge'})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.parameters('workers-three'), {
+            'WorkerCount': '3', 'WorkerMaxCount': '5', 'WorkerInstanceType': 'm4.xlarge'})
+
+    def test_defaults(self):
+        self.assertEqual(self.put('workers-default').status_code, 202)
+        self.assertEqual(self.parameters('workers-default'), {
+            'WorkerCount': '0', 'WorkerMaxCount': '0', 'WorkerInstanceType': 'm4.large'})
+
+        self.assertEqual(self.put('workers-two', {'worker_count': 2}).status_code, 202)
+        self.assertEqual(self.parameters('workers-two')['WorkerMaxCount'], '2')
+
+    def test_invalid(self):
+        for body in ({'worker_count': 3, 'worker_max_count': 1}, {'worker_max_count': 5},
+                     {'worker_count': 101}, {'worker_count': -1},
+                     {'worker_instance_type': 't2.nano'}):
+            self.assertEqual(self.put('workers-invalid', body).status_code, 400, body)
+
+        self.jobs.join()
+        self.assertRaises(ClientError, self.fake.describe_stacks,
+                          StackName='TAP-Kubernetes-workers-invalid')
+
+    def test_other_workers_conflict(self):
+        self.assertEqual(self.put('workers-conflict', {'worker_count': 1}).status_code, 202)
+        self.assertEqual(self.put('workers-conflict', {'worker_count': 2}).status_code, 409)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4 colorcolumn=100